@@ -1,22 +1,296 @@
-from flask import Flask, request, jsonify
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import json
+import hmac
 from services.recommendation_engine import RecommendationEngine
 from services.inventory_analyzer import InventoryAnalyzer
 from services.vendor_analyzer import VendorAnalyzer
 from services.vendor_scraper import VendorScraper
+from services.llm_cache import LLMResponseCache
+from services.vendor_index import VendorProductIndex
+from services.job_queue import JobManager, QueueFull
+from services.sales_history_store import SalesHistoryStore
+from services.vendor_metrics import VendorMetricsStore
+from services.lazy import LazyService, resolve, is_loaded
+from services.gemini import get_client
+from services.metrics import REGISTRY, LATENCY_BUCKETS, SIZE_BUCKETS
+from services.profiling import ProfileStore
 
 load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize AI services
-recommendation_engine = RecommendationEngine()
-inventory_analyzer = InventoryAnalyzer()
-vendor_analyzer = VendorAnalyzer()
-vendor_scraper = VendorScraper()
+# Initialize AI services (all analyzers share one LLM response cache).
+# Each is built on first use so importing the app stays fast; warm_up()
+# builds them all up front.
+llm_cache = LazyService(LLMResponseCache)
+recommendation_engine = LazyService(lambda: RecommendationEngine(llm_cache=llm_cache))
+sales_history = LazyService(SalesHistoryStore)
+inventory_analyzer = LazyService(lambda: InventoryAnalyzer(llm_cache=llm_cache, sales_history=sales_history))
+vendor_metrics = LazyService(VendorMetricsStore)
+vendor_analyzer = LazyService(lambda: VendorAnalyzer(llm_cache=llm_cache, vendor_metrics=vendor_metrics))
+vendor_scraper = LazyService(VendorScraper)
+
+# Background jobs for long-running recommend/search requests
+job_manager = LazyService(lambda: JobManager(
+    max_workers=int(os.getenv('JOB_MAX_WORKERS', 4)),
+    max_pending=int(os.getenv('JOB_MAX_PENDING', 100)),
+    max_results=int(os.getenv('JOB_MAX_RESULTS', 500)),
+    result_ttl=int(os.getenv('JOB_RESULT_TTL', 600)),
+    default_deadline=int(os.getenv('JOB_DEADLINE', 120)),
+    max_deadline=int(os.getenv('JOB_MAX_DEADLINE', 600)),
+    # Shared by worker processes, so any worker can answer for any job
+    root=os.getenv('JOB_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'jobs')) or None
+))
+
+SERVICES = (llm_cache, recommendation_engine, sales_history, inventory_analyzer,
+            vendor_metrics, vendor_analyzer, vendor_scraper, job_manager)
+
+# Worker lifecycle; under gunicorn (see gunicorn.conf.py) the services above are
+# built once in the master and shared by every forked worker
+service_state = {'ready': True, 'shuttingDown': False, 'importMs': None, 'warmUpMs': None}
+
+def warm_up():
+    """
+    Build every service now instead of on first request. Imports the Gemini
+    SDK but creates no model: its connections must be opened after fork.
+    """
+    started = time.perf_counter()
+    for service in SERVICES:
+        resolve(service)
+    if os.getenv('GEMINI_API_KEY'):
+        import google.generativeai  # noqa: F401
+    service_state['warmUpMs'] = round((time.perf_counter() - started) * 1000, 1)
+
+def after_fork():
+    """Per-worker setup: replace resources that must not cross a fork"""
+    if is_loaded(llm_cache):
+        llm_cache.reopen()
+    service_state['ready'] = True
+
+def begin_drain():
+    """Fail readiness while still serving, so traffic moves elsewhere before the worker stops"""
+    service_state['ready'] = False
+    service_state['shuttingDown'] = True
+
+def shutdown_services(timeout=None):
+    """Graceful stop: refuse readiness, finish running jobs, stop worker pools"""
+    begin_drain()
+    if is_loaded(job_manager):
+        job_manager.shutdown(timeout)
+    if is_loaded(vendor_scraper):
+        vendor_scraper.shutdown()
+
+# Request metrics, served in Prometheus text format at /metrics (per worker process)
+http_requests = REGISTRY.counter(
+    'ai_http_requests_total', 'HTTP requests by route, method and status', ('route', 'method', 'status'))
+http_errors = REGISTRY.counter(
+    'ai_http_errors_total', 'HTTP responses with a 5xx status', ('route', 'method'))
+http_latency = REGISTRY.histogram(
+    'ai_http_request_duration_seconds', 'Request start until the response body was fully sent',
+    LATENCY_BUCKETS, ('route', 'method'))
+http_request_bytes = REGISTRY.histogram(
+    'ai_http_request_size_bytes', 'Request body size', SIZE_BUCKETS, ('route',))
+http_response_bytes = REGISTRY.histogram(
+    'ai_http_response_size_bytes', 'Response body size (streamed bodies excluded)', SIZE_BUCKETS, ('route',))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method = request.method
+    http_requests.inc(route, method, str(response.status_code))
+    if response.status_code >= 500:
+        http_errors.inc(route, method)
+    if request.content_length:
+        http_request_bytes.observe(request.content_length, route)
+    # calculate_content_length() would buffer a generator body, so streamed ones are skipped
+    if not response.is_streamed:
+        length = response.calculate_content_length()
+        if length is not None:
+            http_response_bytes.observe(length, route)
+    
+    # Streamed responses finish after this hook; time them until the body is sent
+    response.call_on_close(lambda: http_latency.observe(time.perf_counter() - started, route, method))
+    return response
+
+# Opt-in per-request profiling for operators: send ?profile=1 or "X-Profile: 1"
+# with "X-Profile-Token: $PROFILING_TOKEN". Disabled when the token is unset.
+profiling_token = os.getenv('PROFILING_TOKEN')
+profiles = ProfileStore(
+    size=int(os.getenv('PROFILE_BUFFER_SIZE', 20)),
+    top=int(os.getenv('PROFILE_TOP_FUNCTIONS', 40))
+)
+
+def operator_authorized():
+    token = request.headers.get('X-Profile-Token', '')
+    return bool(profiling_token) and hmac.compare_digest(token.encode(), profiling_token.encode())
+
+@app.before_request
+def start_request_profile():
+    if not profiling_token:
+        return None
+    if request.args.get('profile') != '1' and request.headers.get('X-Profile') != '1':
+        return None
+    if not operator_authorized():
+        return jsonify({'success': False, 'error': 'Profiling requires a valid X-Profile-Token'}), 403
+    
+    body = request.get_json(silent=True)
+    tenant_id = body.get('tenantId') if isinstance(body, dict) else None
+    route = request.url_rule.rule if request.url_rule else request.path
+    g.profile = profiles.begin(route, request.method, tenant_id)
+    return None
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    
+    if response.is_streamed:
+        # The body is produced after this hook; the profile is stored once it is sent
+        response.headers['X-Profile-Id'] = profile.id
+        status = response.status_code
+        response.call_on_close(lambda: profiles.finish(profile, status))
+        return response
+    
+    record = profiles.finish(profile, response.status_code)
+    response.headers['X-Profile-Id'] = record['id']
+    response.headers['Server-Timing'] = record['serverTiming']
+    return response
+
+def collect_service_metrics():
+    """Scrape-time counters from caches, the Gemini client, single-flight groups and the job queue (only ones already built)"""
+    caches = []
+    if is_loaded(llm_cache):
+        caches.append(('llm', llm_cache.stats()))
+    if is_loaded(vendor_scraper):
+        caches.append(('vendor_search', vendor_scraper.cache.stats()))
+    
+    families = [
+        ('ai_cache_hits_total', 'Cache hits (including stale hits)', 'counter',
+         [({'cache': name}, stats['hits'] + stats.get('staleHits', 0)) for name, stats in caches]),
+        ('ai_cache_misses_total', 'Cache misses', 'counter',
+         [({'cache': name}, stats['misses']) for name, stats in caches]),
+        ('ai_cache_hit_ratio', 'Hits / lookups since start', 'gauge',
+         [({'cache': name}, stats['hitRatio']) for name, stats in caches]),
+        ('ai_cache_entries', 'Entries held in memory', 'gauge',
+         [({'cache': name}, stats['entries']) for name, stats in caches]),
+    ]
+    
+    client = get_client(create=False)
+    if client is not None:
+        stats = client.stats()
+        families += [
+            ('ai_llm_calls_total', 'Gemini calls by outcome', 'counter',
+             [({'outcome': 'succeeded'}, stats['succeeded']), ({'outcome': 'failed'}, stats['failed'])]),
+            ('ai_llm_retries_total', 'Gemini call retries', 'counter', [({}, stats['retries'])]),
+            ('ai_llm_throttled_total', 'Gemini calls refused by the rate limiter', 'counter', [({}, stats['throttled'])]),
+            ('ai_llm_timeouts_total', 'Gemini calls past the per-call timeout', 'counter', [({}, stats['timeouts'])]),
+            ('ai_llm_in_flight', 'Gemini calls running now', 'gauge', [({}, stats['inFlight'])]),
+        ]
+    
+    if is_loaded(vendor_scraper):
+        sources = vendor_scraper.source_stats()
+        families += [
+            ('ai_scraper_breaker_open', '1 while the source circuit breaker is open or half-open', 'gauge',
+             [({'source': s['name']}, int(s['breaker']['state'] != 'closed')) for s in sources]),
+            ('ai_scraper_breaker_rejected_total', 'Searches that skipped the source because its breaker was open', 'counter',
+             [({'source': s['name']}, s['breaker']['rejected']) for s in sources]),
+            ('ai_scraper_breaker_trips_total', 'Times the source circuit breaker opened', 'counter',
+             [({'source': s['name']}, s['breaker']['trips']) for s in sources]),
+            ('ai_scraper_rate_limited_total', 'Searches that skipped the source because its rate limit had no free slot', 'counter',
+             [({'source': s['name']}, s['rateLimited']) for s in sources]),
+            ('ai_scraper_timeout_seconds', 'Current adaptive per-call timeout', 'gauge',
+             [({'source': s['name']}, s['timeout']['timeout']) for s in sources]),
+        ]
+    
+    flights = [
+        service.flights.stats()
+        for service in (vendor_scraper, recommendation_engine, inventory_analyzer, vendor_analyzer)
+        if is_loaded(service)
+    ]
+    families += [
+        ('ai_singleflight_leaders_total', 'Calls that ran the computation for their key', 'counter',
+         [({'flight': f['name']}, f['leaders']) for f in flights]),
+        ('ai_singleflight_collapsed_total', 'Calls that waited on an identical in-flight computation instead', 'counter',
+         [({'flight': f['name']}, f['collapsed']) for f in flights]),
+        ('ai_singleflight_in_flight', 'Distinct keys being computed now', 'gauge',
+         [({'flight': f['name']}, f['inFlight']) for f in flights]),
+    ]
+    
+    if is_loaded(job_manager):
+        by_status = job_manager.stats()['byStatus']
+        families.append(('ai_jobs', 'Background jobs held, by status', 'gauge',
+                         [({'status': status}, count) for status, count in by_status.items()]))
+    return families
+
+REGISTRY.register_collector(collect_service_metrics)
+
+def wants_async(data):
+    """Job mode is requested with ?mode=async or "async": true in the body"""
+    return request.args.get('mode') == 'async' or bool(data.get('async'))
+
+def parse_deadline(value):
+    """Client job deadline in seconds; None when not given. Raises ValueError if invalid."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError('deadline must be a number of seconds')
+    deadline = float(value)
+    if not 0 < deadline < float('inf'):
+        raise ValueError('deadline must be a positive number of seconds')
+    return deadline
+
+def parse_page_field(data, name, minimum):
+    """Integer paging field from the body; None when absent. Raises ValueError if invalid (including null)."""
+    if name not in data:
+        return None
+    value = data[name]
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f'{name} must be an integer')
+    if value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return value
+
+def submit_job(kind, fn, data):
+    try:
+        deadline = parse_deadline(data.get('deadline'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid deadline: {e}'
+        }), 400
+    
+    try:
+        job = job_manager.submit(kind, fn, deadline=deadline)
+    except QueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': f'Too many pending jobs: {e}'
+        }), 429
+    
+    return jsonify({
+        'success': True,
+        'jobId': job.id,
+        'status': job.status,
+        'statusUrl': f'/api/jobs/{job.id}'
+    }), 202
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -26,6 +300,77 @@ def health_check():
         'version': '1.0.0'
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    Whether this worker should receive traffic. Unlike /health (process is
+    up), this fails while shutting down or when the job queue is full.
+    """
+    pending = job_manager.active_count()
+    ready = service_state['ready'] and pending < job_manager.max_pending
+    return jsonify({
+        'ready': ready,
+        'shuttingDown': service_state['shuttingDown'],
+        'pendingJobs': pending,
+        'importMs': service_state['importMs'],
+        'warmUpMs': service_state['warmUpMs'],
+        'pid': os.getpid()
+    }), 200 if ready else 503
+
+@app.route('/api/llm-cache', methods=['GET'])
+def llm_cache_stats():
+    """
+    Hit/miss/eviction counters for the shared LLM response cache
+    """
+    return jsonify({
+        'success': True,
+        'cache': llm_cache.stats()
+    })
+
+@app.route('/api/llm-client', methods=['GET'])
+def llm_client_stats():
+    """
+    Call, retry, throttle and timeout counters for the shared Gemini client
+    """
+    client = get_client()
+    return jsonify({
+        'success': True,
+        'enabled': client is not None,
+        'client': client.stats() if client is not None else None
+    })
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    Recent request profiles held by this worker (stage breakdown only)
+    """
+    if not operator_authorized():
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    return jsonify({
+        'success': True,
+        'stats': profiles.stats(),
+        'profiles': profiles.list()
+    })
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    One stored profile; ?format=text returns the cProfile report as plain text
+    """
+    if not operator_authorized():
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    record = profiles.get(profile_id)
+    if record is None:
+        return jsonify({'success': False, 'error': 'Profile not found'}), 404
+    if request.args.get('format') == 'text':
+        return Response(record['profile'], content_type='text/plain; charset=utf-8')
+    return jsonify({'success': True, 'profile': record})
+
 @app.route('/api/recommend-purchase', methods=['POST'])
 def recommend_purchase():
     """
@@ -42,17 +387,20 @@ def recommend_purchase():
                 'recommendations': []
             })
         
-        recommendations = recommendation_engine.generate_recommendations(items, vendors)
+        if wants_stream(data):
+            return Response(
+                stream_with_context(stream_recommendations(items, vendors)),
+                mimetype='application/x-ndjson'
+            )
         
-        return jsonify({
-            'success': True,
-            'recommendations': recommendations,
-            'summary': {
-                'total_items': len(items),
-                'total_recommendations': len(recommendations),
-                'estimated_savings': sum(r.get('estimatedSavings', 0) for r in recommendations)
-            }
-        })
+        if wants_async(data):
+            return submit_job(
+                'recommend-purchase',
+                lambda job: build_recommendations(items, vendors, progress=job.report_progress),
+                data
+            )
+        
+        return jsonify(build_recommendations(items, vendors))
     except Exception as e:
         print(f"Error in recommend_purchase: {str(e)}")
         return jsonify({
@@ -60,6 +408,61 @@ def recommend_purchase():
             'error': str(e)
         }), 500
 
+def wants_stream(data):
+    """Streaming is requested with ?stream=1, "stream": true, or Accept: application/x-ndjson"""
+    return (request.args.get('stream') in ('1', 'true') or bool(data.get('stream'))
+            or 'application/x-ndjson' in request.headers.get('Accept', ''))
+
+def stream_recommendations(items, vendors):
+    """
+    NDJSON events: one 'recommendation' line per scored item, 'insight'
+    patches as Gemini answers, then a final 'summary' (or 'error') line
+    """
+    vendor_index = VendorProductIndex(vendors)
+    total_recommendations = 0
+    estimated_savings = 0
+    
+    try:
+        for event in recommendation_engine.stream_recommendations(items, vendors, vendor_index=vendor_index):
+            if event[0] == 'recommendation':
+                total_recommendations += 1
+                estimated_savings += event[1].get('estimatedSavings', 0)
+                line = {'type': 'recommendation', 'recommendation': event[1]}
+            else:
+                line = {'type': 'insight', 'itemId': event[1], 'aiInsight': event[2]}
+            yield json.dumps(line) + '\n'
+        
+        yield json.dumps({
+            'type': 'summary',
+            'success': True,
+            'summary': {
+                'total_items': len(items),
+                'total_recommendations': total_recommendations,
+                'estimated_savings': estimated_savings,
+                'match_index': vendor_index.stats()
+            }
+        }) + '\n'
+    except Exception as e:
+        print(f"Error in recommend_purchase stream: {str(e)}")
+        yield json.dumps({'type': 'error', 'success': False, 'error': str(e)}) + '\n'
+
+def build_recommendations(items, vendors, progress=None):
+    vendor_index = VendorProductIndex(vendors)
+    recommendations = recommendation_engine.generate_recommendations(
+        items, vendors, vendor_index=vendor_index, progress=progress
+    )
+    
+    return {
+        'success': True,
+        'recommendations': recommendations,
+        'summary': {
+            'total_items': len(items),
+            'total_recommendations': len(recommendations),
+            'estimated_savings': sum(r.get('estimatedSavings', 0) for r in recommendations),
+            'match_index': vendor_index.stats()
+        }
+    }
+
 @app.route('/api/inventory-insights', methods=['POST'])
 def inventory_insights():
     """
@@ -71,13 +474,70 @@ def inventory_insights():
         recent_orders = data.get('recentOrders', [])
         
         insights = inventory_analyzer.analyze_inventory(items, recent_orders)
+        response = {
+            'success': True,
+            'insights': insights
+        }
+        
+        # A full snapshot with a tenant id (re)seeds that tenant's delta state
+        tenant_id = data.get('tenantId')
+        if tenant_id:
+            checksum, drift = inventory_analyzer.load_snapshot(tenant_id, items)
+            response['checksum'] = checksum
+            response['drift'] = drift
+        
+        return jsonify(response)
+    except Exception as e:
+        print(f"Error in inventory_insights: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/inventory-insights/delta', methods=['POST'])
+def inventory_insights_delta():
+    """
+    Update insights from changed/removed items since the tenant's last snapshot
+    """
+    try:
+        data = request.json
+        tenant_id = data.get('tenantId')
+        
+        if not tenant_id:
+            return jsonify({
+                'success': False,
+                'error': 'tenantId is required'
+            }), 400
+        
+        try:
+            insights, checksum = inventory_analyzer.apply_delta(
+                tenant_id,
+                data.get('changed', []),
+                data.get('removed', []),
+                data.get('recentOrders', []),
+                expected_checksum=data.get('checksum')
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid delta: {e}'
+            }), 400
+        
+        if insights is None:
+            # No state or drift detected: client must POST a full snapshot
+            return jsonify({
+                'success': False,
+                'error': 'Full snapshot required',
+                'snapshotRequired': True
+            }), 409
         
         return jsonify({
             'success': True,
-            'insights': insights
+            'insights': insights,
+            'checksum': checksum
         })
     except Exception as e:
-        print(f"Error in inventory_insights: {str(e)}")
+        print(f"Error in inventory_insights_delta: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -86,12 +546,13 @@ def inventory_insights():
 @app.route('/api/vendor-analysis', methods=['POST'])
 def vendor_analysis():
     """
-    Analyze vendor performance and provide recommendations
+    Analyze vendor performance and provide recommendations.
+    Without "orders", metrics come from the rolling vendor metrics store.
     """
     try:
         data = request.json
         vendor = data.get('vendor', {})
-        orders = data.get('orders', [])
+        orders = data.get('orders')
         
         analysis = vendor_analyzer.analyze_vendor(vendor, orders)
         
@@ -106,6 +567,32 @@ def vendor_analysis():
             'error': str(e)
         }), 500
 
+@app.route('/api/vendor-analysis/batch', methods=['POST'])
+def vendor_analysis_batch():
+    """
+    Rule-based analysis for many vendors in one pass.
+    Body: {vendors: [...], orders: [{vendorId, total, status, expectedDelivery, actualDelivery}, ...]}
+    Without "orders", metrics come from the rolling vendor metrics store.
+    """
+    try:
+        data = request.json
+        vendors = data.get('vendors', [])
+        orders = data.get('orders')
+        
+        analyses = vendor_analyzer.analyze_vendors(vendors, orders)
+        
+        return jsonify({
+            'success': True,
+            'analyses': analyses,
+            'count': len(analyses)
+        })
+    except Exception as e:
+        print(f"Error in vendor_analysis_batch: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/predict-demand', methods=['POST'])
 def predict_demand():
     """
@@ -129,21 +616,186 @@ def predict_demand():
             'error': str(e)
         }), 500
 
+@app.route('/api/predict-demand/batch', methods=['POST'])
+def predict_demand_batch():
+    """
+    Predict future demand for many items in one call
+    """
+    try:
+        data = request.json
+        histories = data.get('items', [])
+        
+        predictions = inventory_analyzer.predict_demand_batch(histories)
+        
+        return jsonify({
+            'success': True,
+            'predictions': predictions,
+            'count': len(predictions)
+        })
+    except Exception as e:
+        print(f"Error in predict_demand_batch: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/vendor-metrics/events', methods=['POST'])
+def ingest_vendor_events():
+    """
+    Fold order events into the rolling per-vendor metrics.
+    Body: {events: [{type: 'placed'|'received', vendorId, ...}, ...]}
+    """
+    try:
+        data = request.json
+        events = data.get('events', [])
+        
+        try:
+            ingested = vendor_metrics.ingest(events)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid event: {e}'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'ingested': ingested,
+            'store': vendor_metrics.stats()
+        })
+    except Exception as e:
+        print(f"Error in ingest_vendor_events: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/vendor-metrics/rebuild', methods=['POST'])
+def rebuild_vendor_metrics():
+    """
+    Recompute vendor metrics by replaying the event log, or from a full
+    order list when the body has "orders"
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            vendors = vendor_metrics.rebuild(data.get('orders'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid order: {e}'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'vendors': vendors,
+            'store': vendor_metrics.stats()
+        })
+    except Exception as e:
+        print(f"Error in rebuild_vendor_metrics: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/vendor-metrics', methods=['GET'])
+def vendor_metrics_stats():
+    return jsonify({
+        'success': True,
+        'store': vendor_metrics.stats()
+    })
+
+@app.route('/api/vendor-metrics/<vendor_id>', methods=['GET'])
+def vendor_metrics_detail(vendor_id):
+    state = vendor_metrics.vendor_state(vendor_id)
+    if state is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown vendor'
+        }), 404
+    return jsonify({
+        'success': True,
+        'vendorId': vendor_id,
+        'metrics': state
+    })
+
+@app.route('/api/sales-history/ingest', methods=['POST'])
+def ingest_sales_history():
+    """
+    Append daily sales records ({itemId, date, quantity}) to the history store
+    """
+    try:
+        data = request.json
+        records = data.get('records', [])
+        
+        try:
+            ingested = sales_history.ingest(records)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid record: {e}'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'ingested': ingested,
+            'store': sales_history.stats()
+        })
+    except Exception as e:
+        print(f"Error in ingest_sales_history: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/sales-history/compact', methods=['POST'])
+def compact_sales_history():
+    """
+    Merge pending segments into a new base generation and apply retention
+    """
+    sales_history.compact()
+    return jsonify({
+        'success': True,
+        'store': sales_history.stats()
+    })
+
+@app.route('/api/sales-history', methods=['GET'])
+def sales_history_stats():
+    return jsonify({
+        'success': True,
+        'store': sales_history.stats()
+    })
+
 @app.route('/api/optimize-pricing', methods=['POST'])
 def optimize_pricing():
     """
-    Suggest optimal pricing strategy
+    Suggest optimal pricing strategy.
+    Optional body fields: marketData ({itemId or name: price}), offset, limit
+    (integers; limit capped at PRICING_MAX_LIMIT), sortBy ('impact' | 'margin' | 'input'), recommendation ('increase' | 'decrease' | 'maintain')
     """
     try:
         data = request.json
         items = data.get('items', [])
         market_data = data.get('marketData', {})
         
-        pricing_suggestions = inventory_analyzer.optimize_pricing(items, market_data)
+        try:
+            pricing = inventory_analyzer.optimize_pricing(
+                items,
+                market_data,
+                offset=parse_page_field(data, 'offset', 0) or 0,
+                limit=parse_page_field(data, 'limit', 1),
+                sort_by=data.get('sortBy', 'impact'),
+                recommendation=data.get('recommendation')
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid pricing request: {e}'
+            }), 400
         
         return jsonify({
             'success': True,
-            'suggestions': pricing_suggestions
+            **pricing
         })
     except Exception as e:
         print(f"Error in optimize_pricing: {str(e)}")
@@ -168,22 +820,146 @@ def search_vendors():
                 'error': 'Product name is required'
             }), 400
         
-        print(f"🔍 Scraping real vendors for: {product_name}")
-        vendors = vendor_scraper.search_vendors(product_name, quantity)
-        print(f"✅ Found {len(vendors)} real vendors")
+        if wants_async(data):
+            return submit_job(
+                'search-vendors',
+                lambda job: build_vendor_search(product_name, quantity, progress=job.report_progress),
+                data
+            )
+        
+        return jsonify(build_vendor_search(product_name, quantity))
+    except Exception as e:
+        print(f"Error in search_vendors: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def build_vendor_search(product_name, quantity, progress=None):
+    if progress:
+        progress(0, 1)
+    print(f"🔍 Scraping real vendors for: {product_name}")
+    vendors = vendor_scraper.search_vendors(product_name, quantity)
+    print(f"✅ Found {len(vendors)} real vendors")
+    if progress:
+        progress(1, 1)
+    
+    return {
+        'success': True,
+        'vendors': vendors,
+        'count': len(vendors)
+    }
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Poll a background job; ?wait=N long-polls up to N seconds (max 30)
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    if wait > 0 and not job.finished:
+        job.wait(wait)
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running background job
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+@app.route('/api/jobs', methods=['GET'])
+def job_stats():
+    """
+    Job counts by status
+    """
+    return jsonify({
+        'success': True,
+        'jobs': job_manager.stats()
+    })
+
+@app.route('/api/vendor-cache', methods=['GET'])
+def vendor_cache():
+    """
+    Inspect cached vendor search results
+    """
+    return jsonify({
+        'success': True,
+        'stats': vendor_scraper.cache.stats(),
+        'entries': vendor_scraper.cache.entries()
+    })
+
+@app.route('/api/vendor-sources', methods=['GET'])
+def vendor_sources():
+    """
+    Circuit breaker and adaptive timeout state of each marketplace source (this worker)
+    """
+    return jsonify({
+        'success': True,
+        'sources': vendor_scraper.source_stats()
+    })
+
+@app.route('/api/vendor-sources/reset', methods=['POST'])
+def reset_vendor_sources():
+    """
+    Close the circuit breaker of one source ({"source": name}) or of all sources
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        name = data.get('source')
+        reset = vendor_scraper.reset_source(name)
+        if name and not reset:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown source: {name}'
+            }), 404
         
         return jsonify({
             'success': True,
-            'vendors': vendors,
-            'count': len(vendors)
+            'reset': reset,
+            'sources': vendor_scraper.source_stats()
         })
     except Exception as e:
-        print(f"Error in search_vendors: {str(e)}")
+        print(f"Error in reset_vendor_sources: {str(e)}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/api/vendor-cache', methods=['DELETE'])
+def purge_vendor_cache():
+    """
+    Purge cached vendor search results (all, or one ?productName=)
+    """
+    removed = vendor_scraper.cache.purge(request.args.get('productName'))
+    return jsonify({
+        'success': True,
+        'removed': removed
+    })
+
+service_state['importMs'] = round((time.perf_counter() - _import_started) * 1000, 1)
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # Development server; production runs `gunicorn -c gunicorn.conf.py app:app`
+    app.run(host='0.0.0.0', port=port, debug=os.getenv('FLASK_ENV', 'development') == 'development')
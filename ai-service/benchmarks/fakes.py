@@ -0,0 +1,196 @@
+"""
+Local stand-ins for the ai-service's upstreams, for load tests:
+
+  FakeShoppingServer  serves Google Shopping-style result pages
+                      (point GOOGLE_SHOPPING_URL at .url)
+  FakeGeminiServer    answers the Gemini REST generateContent call with
+                      stub_reply() (point GEMINI_API_ENDPOINT at .url)
+
+Both run on a local ThreadingHTTPServer with configurable latency
+(lognormal around a median) and failure rate, and count what they served.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic import stub_reply
+
+CARD = (
+    '<div class="sh-dgr__gr-auto sh-dgr__grid-result" data-docid="{docid}">'
+    '<div class="sh-dgr__content">'
+    '<div class="ArOc1c"><img alt="" src="data:image/gif;base64,R0lGODlhAQABAAAAACw="></div>'
+    '<h3 class="tAxDx">{title}</h3>'
+    '<div class="zLPF4b"><span class="a8Pemb OFFNJ">${price:,.2f}</span>'
+    '<div class="aULzUe IuHnof merchant">{merchant}</div></div>'
+    '<span class="Rsc7Yb rating">{rating:.1f} out of 5 stars</span>'
+    '<a class="shntl" href="/shopping/product/{docid}">Compare prices</a>'
+    '</div></div>'
+)
+MERCHANTS = ('Best Buy', 'Walmart', 'Target', 'Staples', 'Office Depot', 'Newegg', 'B&H Photo', 'Costco')
+
+
+def shopping_page(query, cards=8, padding_kb=100):
+    """
+    A deterministic results page for `query`. Real pages carry a lot of
+    inline script and style; padding_kb adds that much of it.
+    """
+    seed = int(hashlib.sha256(query.encode('utf-8')).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    base = rng.uniform(5, 500)
+    body = ''.join(
+        CARD.format(
+            docid=seed + i,
+            title=f'{query} - Model {rng.randint(100, 999)}',
+            price=base * rng.uniform(0.8, 1.2),
+            merchant=MERCHANTS[(seed + i) % len(MERCHANTS)],
+            rating=rng.uniform(3.5, 5.0)
+        )
+        for i in range(cards)
+    )
+    script = '<script>var _g={};' + 'x' * (padding_kb * 1024) + '</script>' if padding_kb else ''
+    return (
+        '<!doctype html><html><head><meta charset="utf-8"><title>' + query + ' - Google Shopping</title>'
+        + script + '</head><body><div id="rso"><div class="sh-pr__product-results">'
+        + body + '</div></div></body></html>'
+    ).encode('utf-8')
+
+
+class _FakeServer:
+    """ThreadingHTTPServer on a free local port with latency and failure injection"""
+
+    def __init__(self, latency_ms=0, failure_rate=0.0, failure_status=503, seed=None):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'failures': self.failures}
+
+    def _delay_and_decide(self):
+        """Sleep for the injected latency; True if this request should fail"""
+        with self._lock:
+            self.requests += 1
+            fail = self.random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+            # Lognormal around the median, like real upstream latency
+            delay = self.latency_ms * self.random.lognormvariate(0, 0.5) / 1000 if self.latency_ms else 0
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def respond(self, handler):
+        raise NotImplementedError
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                server._serve(self)
+
+            def do_POST(self):
+                server._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _serve(self, handler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        handler.request_body = handler.rfile.read(length) if length else b''
+        if self._delay_and_decide():
+            status, body, content_type = self.failure_status, b'{"error": "injected failure"}', 'application/json'
+        else:
+            status, body, content_type = self.respond(handler)
+        try:
+            handler._send(status, body, content_type)
+        except (BrokenPipeError, ConnectionResetError):
+            # The caller gave up (e.g. its deadline passed) before the reply
+            handler.close_connection = True
+
+
+class FakeShoppingServer(_FakeServer):
+    """GET /search?q=...&tbm=shop -> shopping_page(q)"""
+
+    def __init__(self, cards=8, padding_kb=100, **kwargs):
+        super().__init__(**kwargs)
+        self.cards = cards
+        self.padding_kb = padding_kb
+
+    @property
+    def url(self):
+        return super().url + '/search'
+
+    def respond(self, handler):
+        query = parse_qs(urlparse(handler.path).query).get('q', [''])[0]
+        return 200, shopping_page(query, self.cards, self.padding_kb), 'text/html; charset=utf-8'
+
+
+class FakeGeminiServer(_FakeServer):
+    """POST /v1beta/models/<model>:generateContent -> stub_reply(prompt)"""
+
+    def respond(self, handler):
+        if ':generateContent' not in handler.path:
+            return 404, b'{"error": {"code": 404, "message": "not found"}}', 'application/json'
+        try:
+            request = json.loads(handler.request_body or b'{}')
+            prompt = ''.join(
+                part.get('text', '')
+                for content in request.get('contents', [])
+                for part in content.get('parts', [])
+            )
+        except ValueError:
+            return 400, b'{"error": {"code": 400, "message": "bad request"}}', 'application/json'
+
+        text = stub_reply(prompt)
+        prompt_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(text) // 4)
+        body = {
+            'candidates': [{
+                'content': {'parts': [{'text': text}], 'role': 'model'},
+                'finishReason': 'STOP',
+                'index': 0
+            }],
+            'usageMetadata': {
+                'promptTokenCount': prompt_tokens,
+                'candidatesTokenCount': output_tokens,
+                'totalTokenCount': prompt_tokens + output_tokens
+            }
+        }
+        return 200, json.dumps(body).encode('utf-8'), 'application/json'
@@ -0,0 +1,457 @@
+"""
+End-to-end load test for the ai-service.
+
+Starts a local fake Google Shopping server and a fake Gemini endpoint (see
+fakes.py), runs the ai-service against them under gunicorn (or the Flask
+dev server), and replays the traffic the Node backend (backend/routes/ai.js)
+sends, at a series of target rates:
+
+  recommend  one /api/search-vendors call per low-stock item, in parallel
+             (15 s timeout each), then /api/recommend-purchase with the
+             vendors found (10 s timeout)
+  insights   /api/inventory-insights (5 s timeout)
+  vendor     /api/vendor-analysis with the vendor's orders (30 s timeout)
+
+Flows arrive open-loop (Poisson) at each --rps step, and latency is
+measured from the scheduled arrival, so a backed-up service shows up as
+latency rather than as a lower send rate. The report covers, per step:
+  - flow and endpoint latency percentiles
+  - error rate by kind
+  - the share of searches that fell back to simulated vendors
+  - goodput (successful flows per second)
+The saturation point is the first step that misses the SLO.
+
+Usage (from ai-service/):
+    python benchmarks/loadtest.py [--rps 1,2,4,8] [--step-seconds 30]
+        [--workers N] [--threads N] [--server gunicorn|flask]
+        [--shop-latency-ms 300] [--shop-failure-rate 0.02]
+        [--llm-latency-ms 800] [--llm-failure-rate 0.01]
+        [--slo-p99-ms 5000] [--slo-error-rate 0.01]
+
+--workers and --threads default to SERVE_WORKERS / SERVE_THREADS, else
+the gunicorn.conf.py defaults (one worker per CPU, 8 threads), so the
+test runs the deployed configuration.
+
+The JSON report is saved to benchmarks/results/loadtest-<timestamp>-<commit>.json
+unless --output is given. Exits with status 1 if no step met the SLO.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_SERVICE_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fakes import FakeGeminiServer, FakeShoppingServer  # noqa: E402
+from synthetic import generate  # noqa: E402
+from suite import git_commit  # noqa: E402
+
+# Client timeouts used by backend/routes/ai.js (seconds)
+TIMEOUTS = {
+    '/api/search-vendors': 15,
+    '/api/recommend-purchase': 10,
+    '/api/inventory-insights': 5,
+    '/api/vendor-analysis': 30
+}
+DEFAULT_MIX = 'recommend=0.3,insights=0.5,vendor=0.2'
+
+
+class Tenant:
+    """One shop's catalog, as the backend would send it"""
+
+    def __init__(self, seed, rows, max_search_items):
+        data = generate(rows, seed=seed)
+        self.items = data['items']
+        self.restock = [i for i in self.items if i['currentStock'] <= i['reorderPoint']][:max_search_items]
+        self.vendors = data['vendors']
+        self.orders = data['orders']
+        self.orders_by_vendor = {}
+        for order in self.orders:
+            self.orders_by_vendor.setdefault(order['vendorId'], []).append(order)
+        # The fields routes/ai.js sends for insights
+        self.insight_items = [
+            {k: item[k] for k in ('id', 'name', 'category', 'currentStock', 'averageDailySales', 'costPrice', 'sellingPrice')}
+            for item in self.items
+        ]
+        self.recent_orders = [{'date': o['date'], 'total': o['total'], 'items': o['items']} for o in self.orders]
+
+
+class Recorder:
+    """Thread-safe sample store for one step"""
+
+    def __init__(self):
+        self.samples = []  # (kind, name, latency seconds, error or None, degraded)
+        self.lateness = []
+        self._lock = threading.Lock()
+
+    def add(self, kind, name, latency, error=None, degraded=False):
+        with self._lock:
+            self.samples.append((kind, name, latency, error, degraded))
+
+    def late(self, seconds):
+        with self._lock:
+            self.lateness.append(seconds)
+
+
+class LoadClient:
+    def __init__(self, base_url, tenants, fanout_workers):
+        self.base_url = base_url
+        self.tenants = tenants
+        self.recorder = None  # set for each step
+        self.fanout = ThreadPoolExecutor(max_workers=fanout_workers, thread_name_prefix='fanout')
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def call(self, path, body):
+        """POST and record one endpoint call; returns the JSON body or None"""
+        recorder = self.recorder
+        started = time.perf_counter()
+        error = None
+        data = None
+        try:
+            response = self._session().post(self.base_url + path, json=body, timeout=TIMEOUTS[path])
+            if response.status_code >= 400:
+                error = f'http_{response.status_code}'
+            else:
+                data = response.json()
+                if isinstance(data, dict) and data.get('success') is False:
+                    error = 'app_error'
+        except requests.Timeout:
+            error = 'timeout'
+        except requests.ConnectionError:
+            error = 'connection'
+        except ValueError:
+            error = 'bad_json'
+        degraded = (path == '/api/search-vendors' and data is not None
+                    and not any(str(v.get('id', '')).startswith('google_shopping') for v in data.get('vendors', [])))
+        recorder.add('endpoint', path, time.perf_counter() - started, error, degraded)
+        return data if error is None else None
+
+    def recommend(self, tenant):
+        searches = [
+            self.fanout.submit(self.call, '/api/search-vendors', {
+                'productName': item['name'],
+                'quantity': item['reorderPoint'] - item['currentStock'] + 20
+            })
+            for item in tenant.restock
+        ]
+        vendors = []
+        for future in searches:
+            result = future.result()
+            if result and result.get('vendors'):
+                vendors.extend(result['vendors'])
+        items = [
+            {k: item.get(k) for k in ('id', 'name', 'currentStock', 'reorderPoint', 'maxCapacity',
+                                      'averageDailySales', 'costPrice', 'category')}
+            for item in tenant.restock
+        ]
+        return self.call('/api/recommend-purchase', {'items': items, 'vendors': vendors}) is not None
+
+    def insights(self, tenant):
+        return self.call('/api/inventory-insights', {
+            'items': tenant.insight_items,
+            'recentOrders': tenant.recent_orders
+        }) is not None
+
+    def vendor(self, tenant, rng):
+        vendor = rng.choice(tenant.vendors)
+        return self.call('/api/vendor-analysis', {
+            'vendor': {k: vendor[k] for k in ('id', 'name', 'rating', 'performance', 'products')},
+            'orders': [
+                {'date': o['date'], 'total': o['total'], 'expectedDelivery': o['expectedDelivery'],
+                 'actualDelivery': o['actualDelivery'], 'status': o['status']}
+                for o in tenant.orders_by_vendor.get(vendor['id'], [])
+            ]
+        }) is not None
+
+
+def run_step(client, rps, seconds, mix, max_in_flight, seed):
+    """Fire flows at `rps` (Poisson arrivals) for `seconds`; returns the step's Recorder"""
+    recorder = Recorder()
+    client.recorder = recorder
+    rng = random.Random(seed)
+    flows, weights = zip(*mix.items())
+    pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='flow')
+
+    def run_flow(name, tenant, scheduled, flow_seed):
+        recorder.late(time.perf_counter() - scheduled)
+        try:
+            if name == 'recommend':
+                ok = client.recommend(tenant)
+            elif name == 'insights':
+                ok = client.insights(tenant)
+            else:
+                ok = client.vendor(tenant, random.Random(flow_seed))
+            error = None if ok else 'failed'
+        except Exception as e:
+            error = type(e).__name__
+        recorder.add('flow', name, time.perf_counter() - scheduled, error)
+
+    started = time.perf_counter()
+    next_arrival = started
+    futures = []
+    while True:
+        next_arrival += rng.expovariate(rps)
+        if next_arrival - started >= seconds:
+            break
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        name = rng.choices(flows, weights)[0]
+        futures.append(pool.submit(run_flow, name, rng.choice(client.tenants), next_arrival, rng.random()))
+
+    pool.shutdown(wait=True)
+    recorder.elapsed = time.perf_counter() - started
+    recorder.flows_sent = len(futures)
+    return recorder
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {'p50Ms': None, 'p90Ms': None, 'p99Ms': None, 'maxMs': None}
+    values = np.array(latencies) * 1000
+    return {
+        'p50Ms': round(float(np.percentile(values, 50)), 1),
+        'p90Ms': round(float(np.percentile(values, 90)), 1),
+        'p99Ms': round(float(np.percentile(values, 99)), 1),
+        'maxMs': round(float(values.max()), 1)
+    }
+
+
+def summarize_step(rps, recorder, slo_p99_ms, slo_error_rate):
+    groups = {}
+    for kind, name, latency, error, degraded in recorder.samples:
+        group = groups.setdefault((kind, name), {'latencies': [], 'errors': {}, 'degraded': 0})
+        group['latencies'].append(latency)
+        if error:
+            group['errors'][error] = group['errors'].get(error, 0) + 1
+        if degraded:
+            group['degraded'] += 1
+
+    def describe(kind, name, group):
+        count = len(group['latencies'])
+        errors = sum(group['errors'].values())
+        entry = {
+            'kind': kind,
+            'name': name,
+            'count': count,
+            'errors': errors,
+            'errorRate': round(errors / count, 4) if count else 0,
+            'errorKinds': group['errors'],
+            **percentiles(group['latencies'])
+        }
+        if name == '/api/search-vendors':
+            entry['fallbackRate'] = round(group['degraded'] / count, 4) if count else 0
+        return entry
+
+    breakdown = [describe(kind, name, g) for (kind, name), g in sorted(groups.items())]
+    flows = [s for s in recorder.samples if s[0] == 'flow']
+    flow_errors = sum(1 for s in flows if s[3])
+    overall = percentiles([s[2] for s in flows])
+    error_rate = flow_errors / len(flows) if flows else 0
+    # Successful flows per second over the step, including the drain at its end
+    goodput = (len(flows) - flow_errors) / recorder.elapsed if recorder.elapsed else 0
+    lateness = max(recorder.lateness) * 1000 if recorder.lateness else 0
+
+    meets = (overall['p99Ms'] is not None and overall['p99Ms'] <= slo_p99_ms
+             and error_rate <= slo_error_rate)
+    return {
+        'targetRps': rps,
+        'goodputRps': round(goodput, 2),
+        'flows': len(flows),
+        'errorRate': round(error_rate, 4),
+        **overall,
+        'maxClientLatenessMs': round(lateness, 1),
+        'meetsSlo': meets,
+        'breakdown': breakdown
+    }
+
+
+def log_tail(path, lines=40):
+    """Last `lines` lines of a log file"""
+    try:
+        with open(path, errors='replace') as f:
+            return ''.join(f.readlines()[-lines:])
+    except OSError as e:
+        return f'(could not read {path}: {e})'
+
+
+def start_service(args, shop, gemini, store_dir):
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(args.port),
+        'FLASK_ENV': 'production',
+        'GOOGLE_SHOPPING_URL': shop.url,
+        'GEMINI_API_KEY': 'load-test',
+        'GEMINI_API_ENDPOINT': gemini.url,
+        'LLM_CACHE_PATH': os.path.join(store_dir, 'llm_cache.sqlite3'),
+        'SALES_HISTORY_DIR': os.path.join(store_dir, 'sales_history'),
+        'VENDOR_METRICS_DIR': os.path.join(store_dir, 'vendor_metrics'),
+        'JOB_STORE_DIR': os.path.join(store_dir, 'jobs'),
+        'INVENTORY_STATE_DIR': os.path.join(store_dir, 'inventory_state'),
+        'SERVE_WORKERS': str(args.workers),
+        'SERVE_THREADS': str(args.threads),
+    })
+    env.pop('PROFILING_TOKEN', None)
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    else:
+        command = [sys.executable, 'app.py']
+    log = open(os.path.join(store_dir, 'service.log'), 'w')
+    process = subprocess.Popen(command, cwd=AI_SERVICE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log.close()
+            print(f"--- last lines of {log.name} ---\n{log_tail(log.name)}", file=sys.stderr)
+            raise RuntimeError(f'ai-service exited with {process.returncode} (service.log tail above)')
+        try:
+            if requests.get(base_url + '/ready', timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    process.wait()
+    log.close()
+    print(f"--- last lines of {log.name} ---\n{log_tail(log.name)}", file=sys.stderr)
+    raise RuntimeError('ai-service did not become ready within 60s')
+
+
+def print_report(steps):
+    print(f"{'rps':>6} {'goodput':>9} {'flows':>6} {'err %':>6} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'late ms':>8}  SLO")
+    for step in steps:
+        print(f"{step['targetRps']:>6} {step['goodputRps']:>9} {step['flows']:>6} {step['errorRate'] * 100:>6.2f} "
+              f"{step['p50Ms'] or 0:>9.0f} {step['p90Ms'] or 0:>9.0f} {step['p99Ms'] or 0:>9.0f} "
+              f"{step['maxClientLatenessMs']:>8.0f}  {'ok' if step['meetsSlo'] else 'MISS'}")
+        for entry in step['breakdown']:
+            if entry['kind'] != 'endpoint':
+                continue
+            extra = f" fallback {entry['fallbackRate'] * 100:.0f}%" if 'fallbackRate' in entry else ''
+            kinds = ', '.join(f'{k}={v}' for k, v in entry['errorKinds'].items())
+            print(f"         {entry['name']:<28} n={entry['count']:<5} p50 {entry['p50Ms'] or 0:>7.0f} "
+                  f"p99 {entry['p99Ms'] or 0:>7.0f} err {entry['errorRate'] * 100:>5.1f}%{extra}"
+                  f"{' (' + kinds + ')' if kinds else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rps', default='1,2,4,8', help='comma-separated target flow rates, one step each')
+    parser.add_argument('--step-seconds', type=float, default=30)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='flow weights, e.g. recommend=0.3,insights=0.5,vendor=0.2')
+    parser.add_argument('--tenants', type=int, default=20)
+    parser.add_argument('--catalog-size', type=int, default=300, help='items per tenant')
+    parser.add_argument('--max-search-items', type=int, default=10, help='low-stock items searched per recommend flow')
+    parser.add_argument('--server', choices=('gunicorn', 'flask'), default='gunicorn')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVE_WORKERS', multiprocessing.cpu_count())))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SERVE_THREADS', 8)))
+    parser.add_argument('--max-in-flight', type=int, default=256, help='client threads for concurrent flows')
+    parser.add_argument('--shop-latency-ms', type=float, default=300)
+    parser.add_argument('--shop-failure-rate', type=float, default=0.02)
+    parser.add_argument('--shop-page-kb', type=int, default=100)
+    parser.add_argument('--llm-latency-ms', type=float, default=800)
+    parser.add_argument('--llm-failure-rate', type=float, default=0.01)
+    parser.add_argument('--slo-p99-ms', type=float, default=5000)
+    parser.add_argument('--slo-error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    mix = {}
+    for part in args.mix.split(','):
+        name, weight = part.split('=')
+        if name not in ('recommend', 'insights', 'vendor'):
+            parser.error(f'unknown flow {name!r}')
+        mix[name] = float(weight)
+    rates = [float(r) for r in args.rps.split(',')]
+
+    print(f"Generating {args.tenants} tenant catalogs...", file=sys.stderr)
+    tenants = [Tenant(args.seed + t, args.catalog_size, args.max_search_items) for t in range(args.tenants)]
+
+    shop = FakeShoppingServer(latency_ms=args.shop_latency_ms, failure_rate=args.shop_failure_rate,
+                              padding_kb=args.shop_page_kb, seed=args.seed).start()
+    gemini = FakeGeminiServer(latency_ms=args.llm_latency_ms, failure_rate=args.llm_failure_rate,
+                              seed=args.seed).start()
+
+    steps = []
+    with tempfile.TemporaryDirectory(prefix='ai-load-') as store_dir:
+        process, base_url = start_service(args, shop, gemini, store_dir)
+        serving = f'{args.workers} workers x {args.threads} threads' if args.server == 'gunicorn' else 'dev server'
+        print(f"ai-service ready at {base_url} ({serving})", file=sys.stderr)
+        client = LoadClient(base_url, tenants, fanout_workers=args.max_in_flight * 4)
+        try:
+            for i, rps in enumerate(rates):
+                print(f"Step {i + 1}/{len(rates)}: {rps} flows/s for {args.step_seconds:.0f}s", file=sys.stderr)
+                recorder = run_step(client, rps, args.step_seconds, mix, args.max_in_flight, args.seed + i)
+                steps.append(summarize_step(rps, recorder, args.slo_p99_ms, args.slo_error_rate))
+            try:
+                llm_client = requests.get(base_url + '/api/llm-client', timeout=5).json().get('client')
+            except (requests.RequestException, ValueError):
+                llm_client = None
+        finally:
+            client.fanout.shutdown(wait=False, cancel_futures=True)
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            shop.stop()
+            gemini.stop()
+
+    print()
+    print_report(steps)
+    passing = [s['targetRps'] for s in steps if s['meetsSlo']]
+    saturation = next((s['targetRps'] for s in steps if not s['meetsSlo']), None)
+    print()
+    print(f"SLO: p99 <= {args.slo_p99_ms:.0f} ms, error rate <= {args.slo_error_rate * 100:.1f}%")
+    print(f"Highest rate meeting the SLO: {max(passing) if passing else 'none'} flows/s; "
+          f"saturation at: {saturation if saturation is not None else 'not reached'}")
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': vars(args),
+        'slo': {'p99Ms': args.slo_p99_ms, 'errorRate': args.slo_error_rate},
+        'maxRpsMeetingSlo': max(passing) if passing else None,
+        'saturationRps': saturation,
+        'steps': steps,
+        'upstreams': {'shopping': shop.stats(), 'gemini': gemini.stats()},
+        'llmClient': llm_client
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(BENCHMARKS_DIR, 'results', f'loadtest-{stamp}-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+    return 0 if passing else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
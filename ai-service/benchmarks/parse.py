@@ -0,0 +1,130 @@
+"""
+Parse-throughput benchmark for marketplace result pages.
+
+Checks GoogleShoppingSource._parse against the fixtures in
+fixtures/google_shopping/ (expected.json holds the vendor name, price and
+title each page must yield), then reports pages/s and MB/s per fixture,
+plus a generated page at --page-kb to show how parse time scales with
+page size. With --compare-bs4 (needs beautifulsoup4), the same pages are
+also run through the previous BeautifulSoup find()-per-field approach.
+
+The fixtures are hand-built in the shape of Google's grid, list and
+data-docid layouts, not captures of live pages, and they use the very
+class names the selectors look for. Passing here (and agreeing with the
+BeautifulSoup approach) is a regression and throughput check of the
+extraction rules; it says nothing about whether those rules still match
+Google's current markup.
+
+Usage (from ai-service/):
+    python benchmarks/parse.py [--min-time 1] [--page-kb 500] [--compare-bs4]
+
+Exits with status 1 if any fixture does not match expected.json.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_SERVICE_DIR = os.path.dirname(BENCHMARKS_DIR)
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, 'fixtures', 'google_shopping')
+sys.path.insert(0, AI_SERVICE_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fakes import shopping_page  # noqa: E402
+from services.marketplace_sources import GoogleShoppingSource  # noqa: E402
+
+
+def bs4_reference(content):
+    """(name, price, title) per card, the way the BeautifulSoup parser found them"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'lxml')
+    cards = soup.find_all('div', {'class': re.compile(r'sh-dgr__content|sh-dlr__content')})
+    if not cards:
+        cards = soup.find_all('div', {'data-docid': True})[:10]
+    results = []
+    for idx, card in enumerate(cards[:10]):
+        vendor = card.find('div', {'class': re.compile(r'merchant|store')}) or \
+            card.find('a', {'class': re.compile(r'merchant|shntl')})
+        price = card.find('span', {'class': re.compile(r'price|a8Pemb')}) or card.find('b')
+        title = card.find('h3') or card.find('div', {'class': re.compile(r'title')})
+        card.find('span', {'class': re.compile(r'rating|star')})
+        match = re.search(r'[\d,]+\.?\d*', (price.text if price else '$0').replace(',', ''))
+        value = float(match.group()) if match else 0.0
+        if value > 0:
+            results.append({
+                'name': vendor.text.strip() if vendor else f'Verified Seller {idx + 1}',
+                'price': value,
+                'title': title.text.strip() if title else 'query'
+            })
+    return results
+
+
+def vendor_fields(vendors):
+    return [{'name': v['name'], 'price': v['products'][0]['price'], 'title': v['products'][0]['itemName']}
+            for v in vendors]
+
+
+def throughput(fn, content, min_time):
+    fn(content)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < min_time:
+        fn(content)
+        count += 1
+    elapsed = time.perf_counter() - started
+    return count / elapsed, len(content) * count / elapsed / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to time each page')
+    parser.add_argument('--page-kb', type=int, default=500, help='inline script size of the generated page')
+    parser.add_argument('--compare-bs4', action='store_true')
+    args = parser.parse_args()
+
+    source = GoogleShoppingSource()
+    with open(os.path.join(FIXTURES_DIR, 'expected.json')) as f:
+        expected = json.load(f)
+
+    pages = []
+    failures = 0
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html'))):
+        name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            content = f.read()
+        got = vendor_fields(source._parse(content, 'query'))
+        if got != expected.get(name):
+            failures += 1
+            print(f"MISMATCH {name}: got {len(got)} vendors, expected {len(expected.get(name) or [])}")
+        if args.compare_bs4 and bs4_reference(content) != got:
+            print(f"NOTE {name}: BeautifulSoup reference extracts different fields")
+        pages.append((name, content))
+    pages.append((f'generated-{args.page_kb}kb', shopping_page('Wireless Mouse', cards=20, padding_kb=args.page_kb)))
+
+    random.seed(0)
+    header = f"{'page':<22} {'KB':>7} {'pages/s':>10} {'MB/s':>8}"
+    if args.compare_bs4:
+        header += f" {'bs4 pages/s':>12} {'speedup':>8}"
+    print(header)
+    for name, content in pages:
+        rate, mb = throughput(lambda c: source._parse(c, 'query'), content, args.min_time)
+        line = f"{name:<22} {len(content) / 1024:>7.1f} {rate:>10.0f} {mb:>8.1f}"
+        if args.compare_bs4:
+            reference, _ = throughput(bs4_reference, content, args.min_time)
+            line += f" {reference:>12.0f} {rate / reference:>7.1f}x"
+        print(line)
+
+    if failures:
+        print(f"\n{failures} fixture(s) did not match expected.json")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Cold-start report for the ai-service.
+
+Runs `import app` in fresh interpreters and reports:
+  - wall time from interpreter start to the first /health response
+    (median of --runs), checked against STARTUP_TARGET_MS
+  - an import-time breakdown from `python -X importtime`, grouped by
+    top-level package
+
+Usage (from ai-service/):
+    python benchmarks/startup.py [--runs 5] [--top 15] [--target-ms 600]
+
+Exits with status 1 when the median exceeds the target.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+AI_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = (
+    "import time; t = time.perf_counter(); import app; "
+    "app.app.test_client().get('/health'); "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def time_cold_start(runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', COLD_START],
+            cwd=AI_SERVICE_DIR, capture_output=True, text=True, check=True
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def import_breakdown():
+    """{top-level package: self time in ms} and the total, from -X importtime"""
+    out = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=AI_SERVICE_DIR, capture_output=True, text=True, check=True
+    )
+    packages = {}
+    total = 0
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        top = name.strip().split('.')[0]
+        packages[top] = packages.get(top, 0) + int(self_us) / 1000
+        if not name.startswith('  '):
+            total += int(cumulative_us) / 1000
+    return packages, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--target-ms', type=float, default=float(os.getenv('STARTUP_TARGET_MS', 600)))
+    args = parser.parse_args()
+
+    packages, total = import_breakdown()
+    print(f"Import time by top-level package (total {total:.0f} ms):")
+    for name, ms in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+
+    samples = time_cold_start(args.runs)
+    median = statistics.median(samples)
+    print()
+    print(f"Cold start to first /health: median {median:.0f} ms "
+          f"(min {min(samples):.0f}, max {max(samples):.0f}, {args.runs} runs)")
+    print(f"Target: {args.target_ms:.0f} ms -> {'OK' if median <= args.target_ms else 'OVER'}")
+    return 0 if median <= args.target_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
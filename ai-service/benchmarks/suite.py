@@ -0,0 +1,303 @@
+"""
+Synthetic-data benchmark suite for the ai-service.
+
+Generates seeded data (see synthetic.py) at each scale and times every
+analyzer entry point and every analysis, search and ingest route
+in-process. Gemini is replaced by a stub model, the LLM response cache is
+disabled and Google Shopping is served by the load test's fake
+marketplace (fakes.py) with no added latency. For each case it reports
+throughput, p50/p99 latency and peak traced memory, and saves the results
+as JSON so runs can be compared across commits.
+
+Usage (from ai-service/):
+    python benchmarks/suite.py [--scales 1k,10k,100k] [--cases recommend,route.]
+                               [--min-time 2] [--max-iterations 30] [--shop-page-kb 100]
+                               [--compare benchmarks/results/<baseline>.json]
+
+Scales accept k/m suffixes; 1m is supported but needs several GB of RAM.
+Results go to benchmarks/results/<timestamp>-<commit>.json unless
+--output is given.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_SERVICE_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, AI_SERVICE_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fakes import FakeShoppingServer  # noqa: E402
+from synthetic import StubModel, generate, sales_histories  # noqa: E402
+
+DEFAULT_SCALES = '1k,10k,100k'
+
+
+def parse_scale(text):
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=AI_SERVICE_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_app(store_dir, stub, shop):
+    """Import the Flask app with throwaway stores, the stub model, no LLM cache and the fake marketplace"""
+    os.environ['SALES_HISTORY_DIR'] = os.path.join(store_dir, 'sales_history')
+    os.environ['VENDOR_METRICS_DIR'] = os.path.join(store_dir, 'vendor_metrics')
+    os.environ['LLM_CACHE_PATH'] = ''
+    os.environ['GOOGLE_SHOPPING_URL'] = shop.url
+    os.environ.pop('GEMINI_API_KEY', None)
+    os.environ.pop('PROFILING_TOKEN', None)
+    import app as service
+
+    for analyzer in (service.recommendation_engine, service.inventory_analyzer, service.vendor_analyzer):
+        analyzer.model = stub
+        analyzer.llm_cache = None
+    # The per-source rate limit protects the real marketplace; against the fake it would only time sleeps
+    for source in service.vendor_scraper.sources:
+        source.scheduler.min_interval = 0
+        source.scheduler.jitter = 0
+    return service
+
+
+def build_cases(service, data):
+    """[(name, rows processed per call, fn)] for one generated dataset"""
+    from services.inventory_analyzer import InventoryAnalyzer
+    from services.recommendation_engine import RecommendationEngine
+    from services.vendor_analyzer import VendorAnalyzer
+
+    stub = service.recommendation_engine.model
+    engine = RecommendationEngine(llm_cache=None)
+    inventory = InventoryAnalyzer(llm_cache=None)
+    vendors = VendorAnalyzer(llm_cache=None)
+    for analyzer in (engine, inventory, vendors):
+        analyzer.model = stub
+
+    items, vendor_list, orders = data['items'], data['vendors'], data['orders']
+    # The backend only asks for recommendations on items at or below their reorder point
+    restock = [item for item in items if item['currentStock'] <= item['reorderPoint']]
+    histories = sales_histories(data['sales'])
+    vendor = vendor_list[0]
+    vendor_orders = [o for o in orders if o['vendorId'] == vendor['id']]
+    history = histories[0]
+    # A delta touching 1% of the catalog, against a tenant seeded on first call
+    changed = [dict(item, currentStock=item['currentStock'] + 1) for item in items[:max(1, len(items) // 100)]]
+    vendor_events = [{'type': 'placed', 'vendorId': o['vendorId'], 'total': o['total']} for o in orders]
+    vendor_events += [{'type': 'received', 'vendorId': o['vendorId'], 'expectedDelivery': o.get('expectedDelivery'),
+                       'actualDelivery': o.get('actualDelivery')} for o in orders if o['status'] == 'received']
+    search_counter = iter(range(10 ** 9))
+
+    client = service.app.test_client()
+
+    def post(path, body):
+        payload = json.dumps(body)
+
+        def call():
+            response = client.post(path, data=payload, content_type='application/json')
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}')
+            return response
+        return call
+
+    def inventory_delta():
+        delta = post('/api/inventory-insights/delta', {'tenantId': 'bench', 'changed': changed, 'recentOrders': orders})
+        seeded = []
+
+        def call():
+            if not seeded:
+                post('/api/inventory-insights', {'tenantId': 'bench', 'items': items, 'recentOrders': orders})()
+                seeded.append(True)
+            return delta()
+        return call
+
+    def search_uncached():
+        # A new product name every call, so each one misses the search cache and fetches + parses a page
+        def call():
+            return post('/api/search-vendors', {'productName': f'{items[0]["name"]} {next(search_counter)}', 'quantity': 10})()
+        return call
+
+    return [
+        ('recommend.generate_recommendations', len(restock),
+         lambda: engine.generate_recommendations(restock, vendor_list)),
+        ('inventory.analyze_inventory', len(items),
+         lambda: inventory.analyze_inventory(items, orders)),
+        ('inventory.predict_demand_batch', len(data['sales']),
+         lambda: inventory.predict_demand_batch(histories)),
+        ('inventory.optimize_pricing', len(items),
+         lambda: inventory.optimize_pricing(items, data['marketData'])),
+        ('vendor.analyze_vendors', len(orders),
+         lambda: vendors.analyze_vendors(vendor_list, orders)),
+        ('vendor.analyze_vendor', len(vendor_orders),
+         lambda: vendors.analyze_vendor(vendor, vendor_orders)),
+        ('route.recommend_purchase', len(restock),
+         post('/api/recommend-purchase', {'items': restock, 'vendors': vendor_list})),
+        ('route.inventory_insights', len(items),
+         post('/api/inventory-insights', {'items': items, 'recentOrders': orders})),
+        ('route.predict_demand_batch', len(data['sales']),
+         post('/api/predict-demand/batch', {'items': histories})),
+        ('route.optimize_pricing', len(items),
+         post('/api/optimize-pricing', {'items': items, 'marketData': data['marketData']})),
+        ('route.vendor_analysis_batch', len(orders),
+         post('/api/vendor-analysis/batch', {'vendors': vendor_list, 'orders': orders})),
+        ('route.vendor_analysis', len(vendor_orders),
+         post('/api/vendor-analysis', {'vendor': vendor, 'orders': vendor_orders})),
+        ('route.predict_demand', len(history['quantities']),
+         post('/api/predict-demand', {'itemId': history['itemId'],
+                                      'historicalData': [{'quantity': q} for q in history['quantities']]})),
+        ('route.inventory_insights_delta', len(changed), inventory_delta()),
+        ('route.sales_history_ingest', len(data['sales']),
+         post('/api/sales-history/ingest', {'records': data['sales']})),
+        ('route.vendor_metrics_events', len(vendor_events),
+         post('/api/vendor-metrics/events', {'events': vendor_events})),
+        ('route.search_vendors.cached', 1,
+         post('/api/search-vendors', {'productName': items[0]['name'], 'quantity': 10})),
+        ('route.search_vendors.uncached', 1, search_uncached()),
+    ]
+
+
+def measure(fn, min_time, min_iterations, max_iterations, memory=True):
+    """Time fn (after one warm-up call), then trace one more call for peak memory"""
+    fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < min_iterations or (
+            len(samples) < max_iterations and time.perf_counter() - started < min_time):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return samples, peak
+
+
+def summarize(name, rows, samples, peak):
+    seconds = np.array(samples)
+    mean = float(seconds.mean())
+    return {
+        'case': name,
+        'rows': rows,
+        'iterations': len(samples),
+        'p50Ms': round(float(np.percentile(seconds, 50)) * 1000, 3),
+        'p99Ms': round(float(np.percentile(seconds, 99)) * 1000, 3),
+        'meanMs': round(mean * 1000, 3),
+        'callsPerSec': round(1 / mean, 2) if mean else None,
+        'rowsPerSec': round(rows / mean) if mean else None,
+        'peakMemoryMb': round(peak / 2 ** 20, 2) if peak is not None else None
+    }
+
+
+def print_table(results, baseline=None):
+    previous = {(r['case'], r['scale']): r for r in baseline['results']} if baseline else {}
+    header = f"{'case':<38} {'scale':>8} {'iters':>5} {'p50 ms':>10} {'p99 ms':>10} {'rows/s':>12} {'peak MB':>9}"
+    if previous:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    for r in results:
+        line = (f"{r['case']:<38} {r['scale']:>8} {r['iterations']:>5} {r['p50Ms']:>10.2f} "
+                f"{r['p99Ms']:>10.2f} {r['rowsPerSec'] or 0:>12,} {r['peakMemoryMb'] or 0:>9.1f}")
+        base = previous.get((r['case'], r['scale']))
+        if base and base['p50Ms']:
+            line += f" {r['p50Ms'] / base['p50Ms']:>11.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default=os.getenv('BENCH_SCALES', DEFAULT_SCALES))
+    parser.add_argument('--cases', default='', help='comma-separated substrings of case names to run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--min-time', type=float, default=2.0, help='seconds to keep sampling each case')
+    parser.add_argument('--min-iterations', type=int, default=3)
+    parser.add_argument('--max-iterations', type=int, default=30)
+    parser.add_argument('--llm-latency-ms', type=float, default=0, help='delay added to each stub model call')
+    parser.add_argument('--shop-page-kb', type=int, default=100, help='inline script size of fake marketplace pages')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced peak-memory run')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare p50 against')
+    args = parser.parse_args()
+
+    scales = [parse_scale(s) for s in args.scales.split(',') if s.strip()]
+    filters = [f for f in args.cases.split(',') if f]
+    stub = StubModel(latency=args.llm_latency_ms / 1000)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = []
+    shop = FakeShoppingServer(padding_kb=args.shop_page_kb, seed=args.seed).start()
+    with tempfile.TemporaryDirectory(prefix='ai-bench-') as store_dir:
+        service = load_app(store_dir, stub, shop)
+        for rows in scales:
+            started = time.perf_counter()
+            data = generate(rows, seed=args.seed)
+            print(f"Generated {rows:,} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+            for name, case_rows, fn in build_cases(service, data):
+                if filters and not any(f in name for f in filters):
+                    continue
+                samples, peak = measure(fn, args.min_time, args.min_iterations, args.max_iterations,
+                                        memory=not args.no_memory)
+                result = summarize(name, case_rows, samples, peak)
+                result['scale'] = rows
+                results.append(result)
+                print(f"  {name:<38} p50 {result['p50Ms']:>10.2f} ms", file=sys.stderr)
+            del data
+            gc.collect()
+    shop.stop()
+
+    print()
+    print_table(results, baseline)
+
+    commit = git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'scales': scales,
+        'llmLatencyMs': args.llm_latency_ms,
+        'stubModelCalls': stub.calls,
+        'shopRequests': shop.stats()['requests'],
+        'results': results
+    }
+    output = args.output
+    if not output:
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        output = os.path.join(BENCHMARKS_DIR, 'results', f'{stamp}-{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Seeded synthetic data shaped like backend/seedData.js, plus a stub Gemini
+model, for benchmarks and load tests.
+
+generate(rows, seed) builds, for one scale:
+  - items:     `rows` inventory items (as the backend sends them)
+  - vendors:   rows // 100 vendors (at least 10); each item is carried by two
+  - orders:    `rows` purchase orders across those vendors
+  - sales:     `rows` daily sales records ({itemId, date, quantity}),
+               90 days each for rows // 90 items
+  - marketData: market prices for about half of the items
+The same (rows, seed) always produces the same data.
+"""
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+# (name, sku prefix, category, unit, cost price, selling price), from seedData.js
+PRODUCTS = (
+    ('Laptop - Dell XPS 15', 'LAPTOP', 'Electronics', 'pieces', 1200, 1500),
+    ('Wireless Mouse', 'MOUSE', 'Electronics', 'pieces', 15, 25),
+    ('USB-C Cable', 'CABLE', 'Electronics', 'pieces', 5, 12),
+    ('Office Chair', 'CHAIR', 'Furniture', 'pieces', 150, 250),
+    ('Desk Lamp', 'LAMP', 'Furniture', 'pieces', 20, 35),
+    ('Printer Paper A4', 'PAPER', 'Office Supplies', 'packs', 3, 8),
+    ('Blue Ink Pen', 'PEN', 'Office Supplies', 'packs', 4, 10),
+    ('Monitor Stand', 'STAND', 'Furniture', 'pieces', 30, 50),
+    ('Wireless Keyboard', 'KEYBOARD', 'Electronics', 'pieces', 60, 95),
+    ('HDMI Cable 2m', 'HDMI', 'Electronics', 'pieces', 8, 18),
+)
+
+VENDOR_NAMES = ('TechSupply Co.', 'Office Solutions Ltd', 'Global Electronics Hub',
+                'Budget Office Supplies', 'Premium Furniture Co')
+CITIES = (('Silicon Valley', 'CA'), ('New York', 'NY'), ('Austin', 'TX'), ('Chicago', 'IL'), ('Los Angeles', 'CA'))
+ORDER_STATUSES = ('draft', 'pending', 'approved', 'ordered', 'received', 'cancelled')
+ORDER_STATUS_WEIGHTS = (0.05, 0.1, 0.1, 0.15, 0.55, 0.05)
+HISTORY_DAYS = 90
+
+EPOCH = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+
+def _iso(dt):
+    return dt.isoformat().replace('+00:00', 'Z')
+
+
+def generate_items(rows, rng):
+    kind = rng.integers(0, len(PRODUCTS), rows)
+    # Costs vary around the seed price; some items get thin or fat margins
+    cost_scale = rng.uniform(0.7, 1.3, rows)
+    margin = rng.choice([0.1, 0.3, 0.5, 0.8], rows, p=[0.2, 0.4, 0.3, 0.1])
+    max_capacity = rng.integers(20, 200, rows)
+    min_stock = (max_capacity * rng.uniform(0.1, 0.4, rows)).astype(int)
+    reorder_point = min_stock + rng.integers(1, 10, rows)
+    stock = (max_capacity * rng.beta(1.2, 1.5, rows)).astype(int)
+    daily_sales = np.round(rng.gamma(1.5, 2.0, rows) * (rng.random(rows) > 0.1), 2)
+    restocked = rng.integers(0, 90, rows)
+
+    items = []
+    for i in range(rows):
+        name, sku, category, unit, cost, _ = PRODUCTS[kind[i]]
+        cost_price = max(1, int(cost * cost_scale[i]))
+        items.append({
+            'id': f'item-{i}',
+            'name': f'{name} #{i}',
+            'sku': f'{sku}-{i:07d}',
+            'category': category,
+            'currentStock': int(stock[i]),
+            'minStockLevel': int(min_stock[i]),
+            'maxCapacity': int(max_capacity[i]),
+            'reorderPoint': int(reorder_point[i]),
+            'unit': unit,
+            'costPrice': cost_price,
+            'sellingPrice': int(round(cost_price * (1 + margin[i]))),
+            'averageDailySales': float(daily_sales[i]),
+            'lastRestocked': (date(2024, 2, 28) - timedelta(days=int(restocked[i]))).isoformat()
+        })
+    return items
+
+
+def generate_vendors(items, rng, per_item=2):
+    count = max(10, len(items) // 100)
+    vendors = []
+    for v in range(count):
+        city, state = CITIES[v % len(CITIES)]
+        vendors.append({
+            'id': f'vendor-{v}',
+            'name': f'{VENDOR_NAMES[v % len(VENDOR_NAMES)]} {v}',
+            'email': f'sales{v}@vendor.example',
+            'address': {'city': city, 'state': state, 'country': 'USA'},
+            'rating': round(float(rng.uniform(3.0, 5.0)), 1),
+            'deliveryTime': int(rng.integers(1, 14)),
+            'paymentTerms': 'Net 30',
+            'status': 'active',
+            'performance': {
+                'onTimeDelivery': round(float(rng.uniform(70, 100)), 1),
+                'qualityScore': round(float(rng.uniform(3, 5)), 1),
+                'responseTime': int(rng.integers(1, 72)),
+                'totalOrders': 0
+            },
+            'products': []
+        })
+
+    carriers = rng.integers(0, count, (len(items), per_item))
+    price_factor = rng.uniform(0.8, 1.1, (len(items), per_item))
+    moq = rng.choice([1, 5, 10, 20, 50], (len(items), per_item))
+    for i, item in enumerate(items):
+        for j, v in enumerate(set(carriers[i].tolist())):
+            vendor = vendors[v]
+            vendor['products'].append({
+                'itemName': item['name'],
+                'itemSKU': item['sku'],
+                'price': round(item['costPrice'] * float(price_factor[i, j]), 2),
+                'moq': int(moq[i, j]),
+                'leadTime': vendor['deliveryTime']
+            })
+    return vendors
+
+
+def generate_orders(rows, vendors, rng):
+    vendor_ids = rng.integers(0, len(vendors), rows)
+    created = rng.integers(0, HISTORY_DAYS * 24, rows)
+    lead = rng.integers(1, 14, rows)
+    late = rng.integers(-2, 5, rows)
+    totals = np.round(rng.gamma(2.0, 400.0, rows), 2)
+    lines = rng.integers(1, 8, rows)
+    statuses = rng.choice(len(ORDER_STATUSES), rows, p=ORDER_STATUS_WEIGHTS)
+
+    orders = []
+    for i in range(rows):
+        placed = EPOCH - timedelta(hours=int(created[i]))
+        expected = placed + timedelta(days=int(lead[i]))
+        status = ORDER_STATUSES[statuses[i]]
+        orders.append({
+            'id': f'order-{i}',
+            'vendorId': vendors[vendor_ids[i]]['id'],
+            'date': _iso(placed),
+            'total': float(totals[i]),
+            'items': int(lines[i]),
+            'status': status,
+            'expectedDelivery': _iso(expected),
+            'actualDelivery': _iso(expected + timedelta(days=int(late[i]))) if status == 'received' else None
+        })
+    return orders
+
+
+def generate_sales(rows, items, rng):
+    """HISTORY_DAYS of daily quantities for the first rows // HISTORY_DAYS items"""
+    tracked = min(len(items), max(1, rows // HISTORY_DAYS))
+    days = [(EPOCH.date() - timedelta(days=HISTORY_DAYS - d)).isoformat() for d in range(HISTORY_DAYS)]
+    weekly = 1 + 0.3 * np.sin(np.arange(HISTORY_DAYS) * 2 * np.pi / 7)
+    sales = []
+    for i in range(tracked):
+        base = max(items[i]['averageDailySales'], 0.5)
+        quantities = rng.poisson(base * weekly)
+        item_id = items[i]['id']
+        sales.extend({'itemId': item_id, 'date': day, 'quantity': int(q)} for day, q in zip(days, quantities))
+    return sales
+
+
+def generate_market_data(items, rng):
+    market = {}
+    for item, quote, drift in zip(items, rng.random(len(items)), rng.uniform(0.7, 1.3, len(items))):
+        if quote < 0.5:
+            market[item['id']] = round(item['sellingPrice'] * float(drift), 2)
+    return market
+
+
+def generate(rows, seed=42):
+    rng = np.random.default_rng(seed)
+    items = generate_items(rows, rng)
+    vendors = generate_vendors(items, rng)
+    orders = generate_orders(rows, vendors, rng)
+    sales = generate_sales(rows, items, rng)
+    return {
+        'rows': rows,
+        'seed': seed,
+        'items': items,
+        'vendors': vendors,
+        'orders': orders,
+        'sales': sales,
+        'marketData': generate_market_data(items, rng)
+    }
+
+
+def sales_histories(sales):
+    """Group sales records into predict-demand batch entries ({itemId, quantities})"""
+    by_item = {}
+    for record in sales:
+        by_item.setdefault(record['itemId'], []).append(record['quantity'])
+    return [{'itemId': item_id, 'quantities': quantities} for item_id, quantities in by_item.items()]
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class StubModel:
+    """Stands in for GenerativeModel: stub_reply() after an optional fixed delay"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return StubResponse(stub_reply(prompt))
+
+
+def stub_reply(prompt):
+    """Model text answering an analyzer prompt with JSON of the shape it expects"""
+    if 'Return ONLY the JSON object' in prompt:
+        body = {
+            'summary': 'Reliable vendor with steady delivery',
+            'recommendations': ['Keep as primary', 'Negotiate volume pricing', 'Review lead times'],
+            'riskAssessment': 'low',
+            'futureOutlook': 'Stable'
+        }
+    elif 'Recommendations: ' in prompt:
+        # One insight per recommendation in the chunk
+        body = ['Competitive price with reliable delivery'] * max(1, prompt.count('"itemId"'))
+    else:
+        body = [{
+            'title': 'Rebalance stock levels',
+            'description': 'Shift spend from overstocked to low-stock items',
+            'priority': 'medium',
+            'impact': 'Frees working capital'
+        }]
+    return '```json\n' + json.dumps(body) + '\n```'
@@ -0,0 +1,75 @@
+"""
+Production serving config: gunicorn -c gunicorn.conf.py app:app
+
+The app is imported once in the master (preload_app) and its services are
+warmed up there, so analyzers, caches and indexes are built a single time
+and shared copy-on-write by every worker. Each worker then reopens what
+must not cross a fork. Set SERVE_WARM_UP=0 to build services lazily per
+worker instead (faster boot, slower first requests).
+
+Background jobs and incremental inventory state are kept in directories
+every worker reads (JOB_STORE_DIR, INVENTORY_STATE_DIR), like the
+sales-history and vendor-metrics stores, so requests need no worker
+affinity and the default is one worker per CPU.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv('SERVE_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.getenv('SERVE_THREADS', 8))
+preload_app = True
+
+# Vendor searches and Gemini calls can take a while
+timeout = int(os.getenv('SERVE_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('SERVE_GRACEFUL_TIMEOUT', 30))
+# After SIGTERM a worker keeps serving this long with /ready failing, so load
+# balancers stop routing to it before it stops accepting connections
+drain_seconds = min(float(os.getenv('SERVE_DRAIN_SECONDS', 5)), graceful_timeout / 2)
+keepalive = int(os.getenv('SERVE_KEEPALIVE', 5))
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.getenv('SERVE_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.getenv('SERVE_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def when_ready(server):
+    # Runs in the master before workers fork, so they share the built services
+    if os.getenv('SERVE_WARM_UP', '1') == '1':
+        from app import warm_up
+        warm_up()
+
+
+def post_fork(server, worker):
+    from app import after_fork
+    after_fork()
+
+
+def post_worker_init(worker):
+    # Runs after the worker installed its signal handlers; wrap its SIGTERM one
+    stop = signal.getsignal(signal.SIGTERM)
+
+    def drain(signum, frame):
+        from app import begin_drain
+        begin_drain()
+        timer = threading.Timer(drain_seconds, stop, (signum, frame))
+        timer.daemon = True
+        timer.start()
+
+    if drain_seconds > 0 and callable(stop):
+        signal.signal(signal.SIGTERM, drain)
+
+
+def worker_exit(server, worker):
+    from app import shutdown_services
+    # Leave a little of the graceful window for the process to exit
+    shutdown_services(timeout=max(graceful_timeout - 5, 1))
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Permits handed out by CircuitBreaker.allow()
+CALL = 'call'
+PROBE = 'probe'
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream.
+
+    After `failure_threshold` failures in a row the breaker opens and
+    allow() refuses calls without touching the upstream. Once
+    `reset_timeout` has passed, a single probe call is let through
+    (half-open): success closes the breaker, failure re-opens it with the
+    wait doubled, up to `max_reset_timeout`.
+
+    allow() returns the permit it granted (CALL or PROBE, None when
+    refused), decided under the lock, so a caller knows whether it holds
+    the probe slot without asking again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, max_reset_timeout=300):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._lock = threading.Lock()
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.current_reset_timeout = reset_timeout
+        self.probe_in_flight = False
+        self.last_error = None
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self):
+        """Permit for a call now: CALL, PROBE or None. A PROBE must end in record_*() or release()."""
+        with self._lock:
+            if self.state == CLOSED:
+                return CALL
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.current_reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return PROBE
+            self.rejected += 1
+            return None
+
+    def release(self, permit):
+        """Give back a permit that was never used; only a PROBE holds a slot"""
+        if permit != PROBE:
+            return
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.opened_at = None
+                self.current_reset_timeout = self.reset_timeout
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self.state == HALF_OPEN:
+                # Failed probe: stay away for longer
+                self.current_reset_timeout = min(self.max_reset_timeout, self.current_reset_timeout * 2)
+                self._open()
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            self.trips += 1
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+    def reset(self):
+        """Close the breaker by hand (e.g. once a block is known to be lifted)"""
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.current_reset_timeout = self.reset_timeout
+            self.probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.current_reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'state': self.state,
+                'consecutiveFailures': self.consecutive_failures,
+                'retryInSeconds': retry_in,
+                'resetTimeout': self.current_reset_timeout,
+                'lastError': self.last_error,
+                'successes': self.successes,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'trips': self.trips
+            }
+
+
+class AdaptiveTimeout:
+    """
+    Per-call timeout from recent call latencies: the `percentile` latency
+    times `multiplier`, kept within [min_timeout, max_timeout]. Calls that
+    time out are recorded at the limit they hit (a censored sample), so a
+    slower upstream widens the timeout instead of failing forever. Until
+    `min_samples` calls have been observed, max_timeout is used.
+    """
+
+    def __init__(self, max_timeout=10, min_timeout=1, percentile=99, multiplier=2, window=200, min_samples=20):
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._timeout = max_timeout
+
+    def observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+            self._update()
+
+    def observe_timeout(self, limit):
+        """Record a call that gave up after `limit` seconds; its real latency is at least that"""
+        with self._lock:
+            self._latencies.append(limit)
+            self._update()
+
+    def _update(self):
+        if len(self._latencies) >= self.min_samples:
+            value = float(np.percentile(self._latencies, self.percentile)) * self.multiplier
+            self._timeout = min(self.max_timeout, max(self.min_timeout, value))
+
+    def current(self):
+        return self._timeout
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+        return {
+            'timeout': round(self._timeout, 3),
+            'samples': len(latencies),
+            'p50': round(float(np.percentile(latencies, 50)), 3) if latencies else None,
+            f'p{self.percentile:g}': round(float(np.percentile(latencies, self.percentile)), 3) if latencies else None
+        }
@@ -0,0 +1,37 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+
+class FileLock:
+    """
+    Advisory lock on a file, shared between processes (e.g. pre-forked
+    workers writing the same on-disk store). A no-op where fcntl is
+    unavailable. Not re-entrant; pair with a threading.Lock for threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def _locked(self, mode):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def exclusive(self):
+        return self._locked(fcntl.LOCK_EX if fcntl else None)
+
+    def shared(self):
+        return self._locked(fcntl.LOCK_SH if fcntl else None)
@@ -0,0 +1,260 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+from services.metrics import in_context, stage
+
+DEFAULT_MODEL = 'gemini-2.0-flash-exp'
+
+# google.api_core exception names worth retrying (matched by name so the
+# SDK is not imported just to classify errors)
+RETRYABLE_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+    'DeadlineExceeded', 'GatewayTimeout', 'BadGateway', 'LLMTimeout',
+    'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout'
+}
+
+_lock = threading.Lock()
+_client = None
+_client_built = False
+
+
+class LLMThrottled(Exception):
+    """The rate limit has no capacity for this call within its wait budget"""
+
+
+class LLMTimeout(Exception):
+    """A model call did not finish within the per-call timeout"""
+
+
+class TokenBucket:
+    """
+    Reservation-style bucket refilled at `per_minute`, holding at most one
+    minute's worth. Reservations may drive it negative; the caller then
+    waits until its share has been refilled.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount, now):
+        """Seconds until `amount` could be taken (does not take it)"""
+        self._refill(now)
+        shortfall = amount - self.tokens
+        return max(0.0, shortfall / self.rate) if self.rate > 0 else (0.0 if shortfall <= 0 else float('inf'))
+
+    def take(self, amount):
+        self.tokens -= amount
+
+    def give_back(self, amount):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class GeminiClient:
+    """
+    The one Gemini entry point all analyzers share.
+
+    Every call passes a requests/min and tokens/min token bucket (waiting up
+    to `max_wait` for capacity, else LLMThrottled), then runs on a pool of
+    `max_concurrency` threads with a per-call timeout. Throttling, 5xx and
+    timeout errors are retried with full-jitter exponential backoff. The
+    model (and its connection) is created once and reused.
+
+    `model` may be any object with generate_content(prompt) returning
+    something with .text, so a local fake can stand in for Gemini.
+    """
+
+    def __init__(self, model=None, requests_per_minute=60, tokens_per_minute=1000000,
+                 max_concurrency=4, timeout=30, max_wait=10, max_retries=3,
+                 backoff_base=0.5, backoff_max=8, expected_output_tokens=512):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.expected_output_tokens = expected_output_tokens
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='gemini')
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.rate_wait_seconds = 0.0
+        self.in_flight = 0
+
+    @staticmethod
+    def estimate_tokens(prompt):
+        # Roughly four characters per token for English text
+        return max(1, len(prompt) // 4)
+
+    def _reserve(self, cost):
+        """Take one request and `cost` tokens, sleeping until they are available"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.wait_for(1, now), self.tokens.wait_for(cost, now))
+            if wait > self.max_wait:
+                self.throttled += 1
+                raise LLMThrottled(f'Gemini rate limit: next slot in {wait:.1f}s')
+            self.requests.take(1)
+            self.tokens.take(cost)
+            self.rate_wait_seconds += wait
+        if wait > 0:
+            with stage('llm.rate_limit_wait'):
+                time.sleep(wait)
+
+    def _invoke(self, prompt, kwargs):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            with stage('llm.generate'):
+                return self.model.generate_content(prompt, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def generate_content(self, prompt, **kwargs):
+        """Drop-in for GenerativeModel.generate_content with limits and retries"""
+        cost = self.estimate_tokens(prompt) + self.expected_output_tokens
+        with self._lock:
+            self.calls += 1
+
+        attempt = 0
+        while True:
+            self._reserve(cost)
+            future = self.executor.submit(in_context(self._invoke), prompt, kwargs)
+            try:
+                response = future.result(timeout=self.timeout)
+                self._settle(cost, response)
+                with self._lock:
+                    self.succeeded += 1
+                return response
+            except FuturesTimeout:
+                # A call still queued is dropped; one already running finishes in the background
+                future.cancel()
+                with self._lock:
+                    self.timeouts += 1
+                error = LLMTimeout(f'Gemini call exceeded {self.timeout}s')
+            except Exception as e:
+                error = e
+
+            if type(error).__name__ not in RETRYABLE_ERRORS or attempt >= self.max_retries:
+                with self._lock:
+                    self.failed += 1
+                raise error
+
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    def _settle(self, reserved, response):
+        """Correct the token bucket with actual usage when the response reports it"""
+        usage = getattr(response, 'usage_metadata', None)
+        used = getattr(usage, 'total_token_count', None) if usage is not None else None
+        if not used:
+            return
+        with self._lock:
+            if used < reserved:
+                self.tokens.give_back(reserved - used)
+            else:
+                self.tokens.take(used - reserved)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            return {
+                'calls': self.calls,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'retries': self.retries,
+                'throttled': self.throttled,
+                'timeouts': self.timeouts,
+                'inFlight': self.in_flight,
+                'rateLimitWaitSeconds': round(self.rate_wait_seconds, 3),
+                'requestsAvailable': round(self.requests.tokens, 2),
+                'tokensAvailable': round(self.tokens.tokens),
+                'maxConcurrency': self.max_concurrency
+            }
+
+
+def _build_model(name):
+    """
+    GenerativeModel for `name`. GEMINI_API_ENDPOINT (e.g. a local fake
+    server) switches to the REST transport against that endpoint.
+    """
+    import google.generativeai as genai
+
+    options = {'api_key': os.getenv('GEMINI_API_KEY')}
+    endpoint = os.getenv('GEMINI_API_ENDPOINT')
+    if endpoint:
+        options['transport'] = 'rest'
+        options['client_options'] = {'api_endpoint': endpoint}
+    genai.configure(**options)
+    return genai.GenerativeModel(name)
+
+
+def get_client(create=True):
+    """
+    The process-wide GeminiClient, or None without GEMINI_API_KEY.
+    google.generativeai is imported and configured on the first call only;
+    with create=False nothing is built and None means "not yet".
+    Limits are per process: divide the account quota by the worker count.
+    """
+    global _client, _client_built
+    if _client_built or not create:
+        return _client
+
+    with _lock:
+        if not _client_built:
+            if os.getenv('GEMINI_API_KEY'):
+                _client = GeminiClient(
+                    model=_build_model(os.getenv('GEMINI_MODEL', DEFAULT_MODEL)),
+                    requests_per_minute=float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60)),
+                    tokens_per_minute=float(os.getenv('GEMINI_TOKENS_PER_MINUTE', 1000000)),
+                    max_concurrency=int(os.getenv('GEMINI_MAX_CONCURRENCY', 4)),
+                    timeout=float(os.getenv('GEMINI_TIMEOUT', 30)),
+                    max_wait=float(os.getenv('GEMINI_MAX_WAIT', 10)),
+                    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', 3))
+                )
+            _client_built = True
+    return _client
+
+
+class LazyClient:
+    """
+    Analyzer class attribute that resolves to the shared GeminiClient on
+    first access. Assigning to it (e.g. a fake in tests) overrides it.
+    """
+
+    def __set_name__(self, owner, name):
+        self.attr = '_' + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.attr]
+        except KeyError:
+            client = obj.__dict__[self.attr] = get_client()
+            return client
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.attr] = value
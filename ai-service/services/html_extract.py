@@ -0,0 +1,81 @@
+import re
+
+
+class SelectorSet:
+    """
+    Where one marketplace's result cards and their fields are found.
+
+    `cards` (and `fallback_cards`, used when it finds nothing) are XPath
+    expressions. `fields` maps a field name to (tag, class pattern) rules in
+    priority order; a rule matches a descendant of the card with that tag
+    whose class attribute contains the pattern (None matches any class).
+    Everything is compiled once, on first use, so lxml is only imported
+    once a page is parsed.
+    """
+
+    def __init__(self, cards, fields, fallback_cards=None):
+        self.cards = cards
+        self.fallback_cards = fallback_cards
+        self.fields = fields
+        self._compiled = None
+
+    def compile(self):
+        if self._compiled is None:
+            from lxml import etree
+
+            rules_by_tag = {}  # tag -> [(field, rank, class regex)]
+            for field, rules in self.fields.items():
+                for rank, (tag, pattern) in enumerate(rules):
+                    rules_by_tag.setdefault(tag, []).append((field, rank, re.compile(pattern) if pattern else None))
+            self._compiled = (
+                etree.XPath(self.cards),
+                etree.XPath(self.fallback_cards) if self.fallback_cards else None,
+                rules_by_tag,
+                tuple(rules_by_tag),
+                etree.XPath('string()')
+            )
+        return self._compiled
+
+
+def extract_cards(content, selectors, limit=None):
+    """
+    Parse a page once and return up to `limit` cards as {field: text or
+    None}. Each card's fields are found in a single walk over its
+    descendants, keeping the highest-priority match per field.
+    """
+    from lxml import etree
+
+    cards_xpath, fallback_xpath, rules_by_tag, tags, text_of = selectors.compile()
+    if not content:
+        return []
+    root = etree.HTML(content)
+    if root is None:
+        return []
+
+    cards = cards_xpath(root)
+    if not cards and fallback_xpath is not None:
+        cards = fallback_xpath(root)
+    if limit is not None:
+        cards = cards[:limit]
+
+    field_count = len(selectors.fields)
+    results = []
+    for card in cards:
+        found = {}  # field -> (rank, element)
+        settled = 0  # fields matched by their first rule; nothing can beat those
+        for element in card.iterdescendants(*tags):
+            for field, rank, pattern in rules_by_tag[element.tag]:
+                best = found.get(field)
+                if best is not None and best[0] <= rank:
+                    continue
+                if pattern is None or pattern.search(element.get('class', '')):
+                    found[field] = (rank, element)
+                    if rank == 0:
+                        settled += 1
+            if settled == field_count:
+                break
+        results.append({
+            field: str(text_of(found[field][1])) if field in found else None
+            for field in selectors.fields
+        })
+    return results
@@ -1,179 +1,232 @@
 import os
-import google.generativeai as genai
 import json
-import numpy as np
+from services.inventory_frame import InventoryFrame
+from services.inventory_state import InventoryStateStore
+from services.demand_forecaster import DemandForecaster
+from services.pricing_engine import PricingEngine
+from services.gemini import LazyClient
+from services.llm_cache import LLMResponseCache
+from services.metrics import stage, timed
+from services.single_flight import SingleFlight
 
 class InventoryAnalyzer:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        else:
-            self.model = None
+    # Shared, rate-limited Gemini client, created on first use (None without GEMINI_API_KEY)
+    model = LazyClient()
+    
+    def __init__(self, llm_cache=None, sales_history=None):
+        # Shared prompt cache (see services.llm_cache); TTL in seconds
+        self.llm_cache = llm_cache
+        self.cache_ttl = int(os.getenv('INVENTORY_AI_CACHE_TTL', 300))
+        # Identical prompts already in flight share one Gemini call
+        self.flights = SingleFlight('inventory')
+        # Running per-tenant aggregates for delta updates, shared by worker processes through INVENTORY_STATE_DIR
+        self.tenant_states = InventoryStateStore(
+            max_tenants=int(os.getenv('INVENTORY_STATE_MAX_TENANTS', 1000)),
+            root=os.getenv('INVENTORY_STATE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'inventory_state')) or None,
+            compact_every=int(os.getenv('INVENTORY_STATE_COMPACT_EVERY', 200)),
+            max_age=float(os.getenv('INVENTORY_STATE_MAX_AGE_DAYS', 7)) * 86400
+        )
+        self.forecaster = DemandForecaster(window=int(os.getenv('FORECAST_WINDOW', 90)))
+        # Optional SalesHistoryStore so forecasts can be requested by item id alone
+        self.sales_history = sales_history
+        self.pricing_engine = PricingEngine()
+        self.pricing_page_size = int(os.getenv('PRICING_PAGE_SIZE', 50))
+        self.pricing_max_limit = int(os.getenv('PRICING_MAX_LIMIT', 1000))
         
     def analyze_inventory(self, items, recent_orders):
         """
         Analyze inventory and provide actionable insights
         """
+        # Convert items to columns once; every section reads the shared masks
+        with stage('inventory.frame'):
+            frame = InventoryFrame(items)
+        return self._build_insights(frame, recent_orders)
+    
+    def load_snapshot(self, tenant_id, items):
+        """
+        Reset a tenant's running aggregates from a full item list.
+        Returns (checksum, drift) where drift says whether the previous
+        incremental state disagreed with this snapshot.
+        """
+        previous = self.tenant_states.get(tenant_id)
+        state = self.tenant_states.reset(tenant_id, items)
+        drift = previous is not None and previous.checksum != state.checksum
+        return state.checksum, drift
+    
+    def apply_delta(self, tenant_id, changed, removed, recent_orders, expected_checksum=None):
+        """
+        Update a tenant's aggregates with changed items / removed ids and
+        return (insights, checksum). expected_checksum is the checksum the
+        server last returned for this tenant; it is compared before the
+        delta is applied. Returns (None, None) when there is no state for
+        the tenant or it has drifted from expected_checksum; the caller
+        should send a full snapshot then. Raises ValueError, leaving the
+        state as it was, if a changed item or removed id is invalid.
+        """
+        state = self.tenant_states.get(tenant_id)
+        if state is None:
+            return None, None
+        
+        with state.lock:
+            if not self.tenant_states.apply(tenant_id, state, changed, removed, expected_checksum):
+                print(f"Inventory state drift for tenant {tenant_id}, snapshot required")
+                return None, None
+            
+            return self._build_insights(state, recent_orders), state.checksum
+    
+    def _build_insights(self, frame, recent_orders):
+        """Assemble insights from an InventoryFrame or an InventoryState"""
         insights = {
-            'overview': self._get_overview_insights(items),
-            'alerts': self._get_alerts(items),
-            'opportunities': self._get_opportunities(items),
-            'trends': self._analyze_trends(items, recent_orders),
+            'overview': self._get_overview_insights(frame),
+            'alerts': self._get_alerts(frame),
+            'opportunities': self._get_opportunities(frame),
+            'trends': self._analyze_trends(frame, recent_orders),
             'recommendations': []
         }
         
         # Get AI-powered recommendations
-        if self.model and items:
+        if self.model and frame.size:
             try:
-                ai_recommendations = self._get_ai_recommendations(items, recent_orders)
+                ai_recommendations = self._get_ai_recommendations(frame, recent_orders)
                 insights['recommendations'] = ai_recommendations
             except Exception as e:
                 print(f"AI recommendations failed: {e}")
-                insights['recommendations'] = self._get_rule_based_recommendations(items)
+                insights['recommendations'] = self._get_rule_based_recommendations(frame)
         else:
-            insights['recommendations'] = self._get_rule_based_recommendations(items)
+            insights['recommendations'] = self._get_rule_based_recommendations(frame)
         
         return insights
     
-    def _get_overview_insights(self, items):
+    @timed('inventory.overview')
+    def _get_overview_insights(self, frame):
         """Generate high-level inventory insights"""
-        if not items:
+        if not frame.size:
             return {}
         
-        total_value = sum(item['currentStock'] * item['costPrice'] for item in items)
-        avg_stock_level = np.mean([item['currentStock'] for item in items])
-        
-        low_stock_items = [i for i in items if i['currentStock'] <= i.get('reorderPoint', 0)]
-        high_value_items = sorted(items, key=lambda x: x['currentStock'] * x['costPrice'], reverse=True)[:5]
-        
         return {
-            'totalValue': round(total_value, 2),
-            'averageStockLevel': round(avg_stock_level, 2),
-            'lowStockCount': len(low_stock_items),
-            'highValueItems': [item['name'] for item in high_value_items],
-            'healthScore': self._calculate_health_score(items)
+            'totalValue': round(frame.total_value(), 2),
+            'averageStockLevel': round(frame.mean_stock(), 2),
+            'lowStockCount': frame.count(frame.low_stock),
+            'highValueItems': frame.top_by_value(5),
+            'healthScore': self._calculate_health_score(frame)
         }
     
-    def _calculate_health_score(self, items):
+    def _calculate_health_score(self, frame):
         """Calculate overall inventory health score (0-100)"""
-        if not items:
+        if not frame.size:
             return 0
         
         score = 100
         
         # Penalize for low stock items
-        low_stock_ratio = len([i for i in items if i['currentStock'] <= i.get('reorderPoint', 0)]) / len(items)
+        low_stock_ratio = frame.count(frame.low_stock) / frame.size
         score -= low_stock_ratio * 30
         
         # Penalize for out of stock items
-        out_of_stock_ratio = len([i for i in items if i['currentStock'] == 0]) / len(items)
+        out_of_stock_ratio = frame.count(frame.out_of_stock) / frame.size
         score -= out_of_stock_ratio * 40
         
         # Bonus for good turnover
-        avg_turnover = np.mean([i.get('averageDailySales', 0) for i in items])
+        avg_turnover = frame.mean_daily_sales()
         if avg_turnover > 5:
             score += 10
         
         return max(0, min(100, round(score)))
     
-    def _get_alerts(self, items):
+    @timed('inventory.alerts')
+    def _get_alerts(self, frame):
         """Generate critical alerts"""
         alerts = []
         
         # Critical stock alerts
-        critical_items = [i for i in items if i['currentStock'] == 0]
-        if critical_items:
+        critical_count = frame.count(frame.out_of_stock)
+        if critical_count:
             alerts.append({
                 'level': 'critical',
                 'type': 'out_of_stock',
-                'message': f"{len(critical_items)} items are out of stock",
-                'items': [item['name'] for item in critical_items[:5]]
+                'message': f"{critical_count} items are out of stock",
+                'items': frame.first_names(frame.out_of_stock, 5)
             })
         
         # Low stock warnings
-        low_stock = [i for i in items if 0 < i['currentStock'] <= i.get('reorderPoint', 0)]
-        if low_stock:
+        low_stock_count = frame.count(frame.reorder_soon)
+        if low_stock_count:
             alerts.append({
                 'level': 'warning',
                 'type': 'low_stock',
-                'message': f"{len(low_stock)} items need reordering soon",
-                'items': [item['name'] for item in low_stock[:5]]
+                'message': f"{low_stock_count} items need reordering soon",
+                'items': frame.first_names(frame.reorder_soon, 5)
             })
         
         # Slow moving items
-        slow_moving = [i for i in items if i.get('averageDailySales', 0) < 0.5 and i['currentStock'] > 20]
-        if slow_moving:
+        slow_moving_count = frame.count(frame.slow_moving)
+        if slow_moving_count:
             alerts.append({
                 'level': 'info',
                 'type': 'slow_moving',
-                'message': f"{len(slow_moving)} items are moving slowly",
-                'items': [item['name'] for item in slow_moving[:5]]
+                'message': f"{slow_moving_count} items are moving slowly",
+                'items': frame.first_names(frame.slow_moving, 5)
             })
         
         return alerts
     
-    def _get_opportunities(self, items):
+    @timed('inventory.opportunities')
+    def _get_opportunities(self, frame):
         """Identify business opportunities"""
         opportunities = []
         
         # Fast-moving items that could be promoted
-        fast_moving = [i for i in items if i.get('averageDailySales', 0) > 5]
-        if fast_moving:
+        fast_moving_count = frame.count(frame.fast_moving)
+        if fast_moving_count:
+            top_fast = frame.first_items(frame.fast_moving, 3)
             opportunities.append({
                 'type': 'promotion',
                 'title': 'High Demand Items',
-                'description': f"{len(fast_moving)} items have high demand. Consider bulk purchasing or promotions.",
-                'items': [item['name'] for item in fast_moving[:3]],
-                'potentialSavings': sum(item.get('costPrice', 0) * 10 for item in fast_moving[:3])
+                'description': f"{fast_moving_count} items have high demand. Consider bulk purchasing or promotions.",
+                'items': [item['name'] for item in top_fast],
+                'potentialSavings': sum(item.get('costPrice', 0) * 10 for item in top_fast)
             })
         
         # Items with good profit margins
-        high_margin = [i for i in items if (i.get('sellingPrice', 0) - i.get('costPrice', 0)) / i.get('costPrice', 1) > 0.5]
-        if high_margin:
+        high_margin_count = frame.count(frame.high_margin)
+        if high_margin_count:
             opportunities.append({
                 'type': 'profit',
                 'title': 'High Margin Items',
-                'description': f"{len(high_margin)} items have excellent profit margins. Focus on these.",
-                'items': [item['name'] for item in high_margin[:3]]
+                'description': f"{high_margin_count} items have excellent profit margins. Focus on these.",
+                'items': frame.first_names(frame.high_margin, 3)
             })
         
         return opportunities
     
-    def _analyze_trends(self, items, recent_orders):
+    @timed('inventory.trends')
+    def _analyze_trends(self, frame, recent_orders):
         """Analyze trends in inventory and ordering"""
         trends = {
             'orderFrequency': len(recent_orders),
-            'topCategories': self._get_top_categories(items),
+            'topCategories': self._get_top_categories(frame),
             'seasonalPatterns': 'Analysis requires more historical data'
         }
         
         return trends
     
-    def _get_top_categories(self, items):
+    def _get_top_categories(self, frame):
         """Get top categories by value"""
-        categories = {}
-        for item in items:
-            cat = item.get('category', 'Uncategorized')
-            if cat not in categories:
-                categories[cat] = 0
-            categories[cat] += item['currentStock'] * item['costPrice']
-        
-        return sorted(categories.items(), key=lambda x: x[1], reverse=True)[:5]
+        return sorted(frame.category_totals(), key=lambda x: x[1], reverse=True)[:5]
     
-    def _get_ai_recommendations(self, items, recent_orders):
+    @timed('inventory.ai_recommendations')
+    def _get_ai_recommendations(self, frame, recent_orders):
         """Get AI-powered recommendations using Gemini"""
         prompt = f"""
         Analyze this inventory data and provide 3-5 actionable recommendations for the shop owner.
         
-        Total items: {len(items)}
+        Total items: {frame.size}
         Recent orders: {len(recent_orders)}
         
         Key metrics:
-        - Items out of stock: {len([i for i in items if i['currentStock'] == 0])}
-        - Items low on stock: {len([i for i in items if i['currentStock'] <= i.get('reorderPoint', 0)])}
-        - Average daily sales: {np.mean([i.get('averageDailySales', 0) for i in items]):.2f}
+        - Items out of stock: {frame.count(frame.out_of_stock)}
+        - Items low on stock: {frame.count(frame.low_stock)}
+        - Average daily sales: {frame.mean_daily_sales():.2f}
         
         Provide recommendations as a JSON array with format:
         [
@@ -188,27 +241,40 @@ class InventoryAnalyzer:
         Return ONLY the JSON array, no additional text.
         """
         
-        response = self.model.generate_content(prompt)
-        recommendations_text = response.text
+        return self._call_model(prompt)
+    
+    @timed('inventory.call_model')
+    def _call_model(self, prompt):
+        """Send a prompt to Gemini and parse the JSON in its reply (cached, deduplicated while in flight)"""
+        def generate():
+            response = self.model.generate_content(prompt)
+            response_text = response.text
+            
+            # Clean up the response to extract JSON
+            if '```json' in response_text:
+                response_text = response_text.split('```json')[1].split('```')[0].strip()
+            elif '```' in response_text:
+                response_text = response_text.split('```')[1].split('```')[0].strip()
+            
+            return json.loads(response_text)
         
-        # Clean up the response to extract JSON
-        if '```json' in recommendations_text:
-            recommendations_text = recommendations_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in recommendations_text:
-            recommendations_text = recommendations_text.split('```')[1].split('```')[0].strip()
+        def generate_or_cached():
+            if self.llm_cache is None:
+                return generate()
+            return self.llm_cache.get_or_compute('inventory', prompt, generate, self.cache_ttl)
         
-        recommendations = json.loads(recommendations_text)
-        return recommendations
+        return self.flights.do(LLMResponseCache.make_key('inventory', prompt), generate_or_cached)
     
-    def _get_rule_based_recommendations(self, items):
+    @timed('inventory.rule_recommendations')
+    def _get_rule_based_recommendations(self, frame):
         """Fallback rule-based recommendations"""
         recommendations = []
         
-        low_stock = [i for i in items if i['currentStock'] <= i.get('reorderPoint', 0)]
-        if low_stock:
+        low_stock_count = frame.count(frame.low_stock)
+        if low_stock_count:
             recommendations.append({
                 'title': 'Urgent Restocking Required',
-                'description': f'{len(low_stock)} items need immediate restocking to avoid stockouts.',
+                'description': f'{low_stock_count} items need immediate restocking to avoid stockouts.',
                 'priority': 'high',
                 'impact': 'Prevents lost sales and customer dissatisfaction'
             })
@@ -216,51 +282,42 @@ class InventoryAnalyzer:
         return recommendations
     
     def predict_demand(self, item_id, historical_data):
-        """Predict future demand using simple forecasting"""
-        if not historical_data or len(historical_data) < 7:
-            return {
-                'prediction': 'Insufficient data',
-                'confidence': 'low'
-            }
-        
-        # Simple moving average prediction
-        recent_sales = [d['quantity'] for d in historical_data[-30:]]
-        predicted_demand = np.mean(recent_sales)
-        
-        return {
-            'itemId': item_id,
-            'predictedDailyDemand': round(predicted_demand, 2),
-            'predictedWeeklyDemand': round(predicted_demand * 7, 2),
-            'predictedMonthlyDemand': round(predicted_demand * 30, 2),
-            'confidence': 'medium',
-            'trend': 'stable'
-        }
+        """Predict future demand with exponential smoothing (see DemandForecaster)"""
+        return self.predict_demand_batch([{'itemId': item_id, 'historicalData': historical_data}])[0]
     
-    def optimize_pricing(self, items, market_data):
-        """Suggest optimal pricing strategies"""
-        suggestions = []
-        
-        for item in items[:10]:  # Limit to top 10 for performance
-            current_margin = (item.get('sellingPrice', 0) - item.get('costPrice', 0)) / item.get('costPrice', 1)
-            
-            suggestion = {
-                'itemId': item['id'],
-                'itemName': item['name'],
-                'currentPrice': item.get('sellingPrice', 0),
-                'currentMargin': round(current_margin * 100, 2),
-                'recommendation': 'maintain'
-            }
-            
-            # Simple pricing logic
-            if current_margin < 0.2:
-                suggestion['suggestedPrice'] = item.get('costPrice', 0) * 1.3
-                suggestion['recommendation'] = 'increase'
-                suggestion['reasoning'] = 'Margin too low, recommend 30% markup'
-            elif current_margin > 0.6 and item.get('averageDailySales', 0) < 1:
-                suggestion['suggestedPrice'] = item.get('costPrice', 0) * 1.4
-                suggestion['recommendation'] = 'decrease'
-                suggestion['reasoning'] = 'High margin but slow sales, consider price reduction'
-            
-            suggestions.append(suggestion)
+    @timed('inventory.predict_demand')
+    def predict_demand_batch(self, histories):
+        """
+        Forecast many items in one vectorized pass.
+        Each entry has an itemId and either historicalData ([{quantity}])
+        or quantities (a plain list of numbers), oldest first. Entries with
+        neither are read from the sales history store, if one is configured.
+        """
+        series = [self._history_series(h) for h in histories]
         
-        return suggestions
+        predictions = self.forecaster.forecast(series)
+        for history, prediction in zip(histories, predictions):
+            if 'prediction' not in prediction:
+                prediction['itemId'] = history.get('itemId')
+        return predictions
+    
+    def _history_series(self, history):
+        if 'quantities' in history:
+            return history['quantities']
+        if history.get('historicalData'):
+            return [d['quantity'] for d in history['historicalData']]
+        if self.sales_history is not None:
+            return self.sales_history.series(history.get('itemId'), window=self.forecaster.window)
+        return []
+    
+    @timed('inventory.optimize_pricing')
+    def optimize_pricing(self, items, market_data, offset=0, limit=None, sort_by='impact', recommendation=None):
+        """
+        Suggest optimal pricing strategies for every item.
+        Returns one page of suggestions (highest impact first by default) plus totals.
+        limit is capped at PRICING_MAX_LIMIT.
+        """
+        if limit is None:
+            limit = self.pricing_page_size
+        limit = min(limit, self.pricing_max_limit)
+        return self.pricing_engine.suggest(items, market_data, offset, limit, sort_by, recommendation)
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class InventoryFrame:
+    """
+    Columnar view of an item list for InventoryAnalyzer.
+
+    Items are converted to NumPy columns once, and the stock/sales masks every
+    insight section needs are computed up front so no section re-walks the
+    list. Column dtypes are inferred the same way np.array() would infer them
+    from the original lists, which keeps aggregates identical to the
+    list-based code.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.size = len(items)
+        self.names = [item['name'] for item in items]
+
+        self.stock = np.array([item['currentStock'] for item in items])
+        self.reorder_point = np.array([item.get('reorderPoint', 0) for item in items])
+        self.daily_sales = np.array([item.get('averageDailySales', 0) for item in items])
+        self.selling_price = np.array([item.get('sellingPrice', 0) for item in items])
+        # costPrice is required whenever there are items (overview uses it unguarded)
+        self.cost_price = np.array([item['costPrice'] for item in items])
+        self.values = self.stock * self.cost_price
+        self.int_values = np.array(
+            [isinstance(item['currentStock'], int) and isinstance(item['costPrice'], int) for item in items],
+            dtype=bool
+        )
+
+        # Shared masks
+        self.out_of_stock = self.stock == 0
+        self.low_stock = self.stock <= self.reorder_point
+        self.reorder_soon = (self.stock > 0) & self.low_stock
+        self.slow_moving = (self.daily_sales < 0.5) & (self.stock > 20)
+        self.fast_moving = self.daily_sales > 5
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margins = (self.selling_price - self.cost_price) / self.cost_price
+        self.high_margin = margins > 0.5
+
+        # Category codes in first-appearance order
+        codes = {}
+        self.category_codes = np.array(
+            [codes.setdefault(item.get('category', 'Uncategorized'), len(codes)) for item in items],
+            dtype=np.intp
+        )
+        self.category_names = list(codes)
+
+    def count(self, mask):
+        return int(np.count_nonzero(mask))
+
+    def first_names(self, mask, limit):
+        """Names of the first `limit` items where mask is set, in input order"""
+        return [self.names[i] for i in np.flatnonzero(mask)[:limit]]
+
+    def first_items(self, mask, limit):
+        return [self.items[i] for i in np.flatnonzero(mask)[:limit]]
+
+    def mean_stock(self):
+        return np.mean(self.stock)
+
+    def mean_daily_sales(self):
+        return np.mean(self.daily_sales)
+
+    def total_value(self):
+        # Sequential sum, as the list-based code did, so rounding matches
+        return sum(self.values.tolist())
+
+    def top_by_value(self, limit):
+        """Names of the highest-value items (ties keep input order)"""
+        order = np.argsort(-self.values, kind='stable')[:limit]
+        return [self.names[i] for i in order]
+
+    def category_totals(self):
+        """[(category, total value)] in first-appearance order"""
+        count = len(self.category_names)
+        totals = np.bincount(self.category_codes, weights=self.values, minlength=count).tolist()
+        # A category made only of integer stock x integer cost stays an int
+        has_float = np.bincount(self.category_codes, weights=~self.int_values, minlength=count)
+        return [
+            (name, total if has_float[code] else int(total))
+            for code, (name, total) in enumerate(zip(self.category_names, totals))
+        ]
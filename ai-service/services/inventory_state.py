@@ -0,0 +1,421 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+
+from services.file_lock import FileLock
+
+CHECKSUM_FIELDS = ('id', 'name', 'currentStock', 'reorderPoint', 'averageDailySales',
+                   'costPrice', 'sellingPrice', 'category')
+CHECKSUM_MOD = 2 ** 64
+REQUIRED_NUMBERS = ('currentStock', 'costPrice')
+OPTIONAL_NUMBERS = ('reorderPoint', 'averageDailySales', 'sellingPrice')
+
+
+def validate_item(item):
+    """Raise ValueError unless the item has what the running aggregates read"""
+    if not isinstance(item, dict):
+        raise ValueError('item must be an object')
+    item_id = item.get('id')
+    if item_id is None or isinstance(item_id, (dict, list)):
+        raise ValueError('item id is required')
+    if 'name' not in item:
+        raise ValueError(f'item {item_id}: name is required')
+    for field in REQUIRED_NUMBERS + OPTIONAL_NUMBERS:
+        if field not in item and field in OPTIONAL_NUMBERS:
+            continue
+        value = item.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'item {item_id}: {field} must be a number, got {value!r}')
+
+
+def item_checksum(item):
+    """Stable 64-bit hash of the fields insights depend on"""
+    canonical = json.dumps([item.get(f) for f in CHECKSUM_FIELDS], separators=(',', ':'), default=str)
+    return int.from_bytes(hashlib.sha1(canonical.encode('utf-8')).digest()[:8], 'big')
+
+
+def inventory_checksum(items):
+    """Order-independent checksum of a full item list"""
+    return format(sum(item_checksum(i) for i in items) % CHECKSUM_MOD, '016x')
+
+
+class InventoryState:
+    """
+    Running inventory aggregates for one tenant.
+
+    Exposes the same interface InventoryAnalyzer reads from InventoryFrame
+    (size, masks, count, first_names, ...), but is maintained incrementally:
+    apply() updates it in O(changes). Mask membership is kept as
+    insertion-ordered dicts, so "first N items" lists follow the order items
+    entered the condition rather than catalog order. Float sums can drift
+    slightly over many updates; a full snapshot resets them.
+    """
+
+    # Highest-value candidates kept between full passes
+    TOP_BUFFER = 64
+
+    def __init__(self, items=()):
+        # Held by callers around apply() + reads
+        self.lock = threading.Lock()
+        # Position in the tenant's shared log (see InventoryStateStore)
+        self.log_id = None
+        self.log_offset = 0
+        self.log_deltas = 0
+        self.reset(items)
+
+    def reset(self, items=()):
+        """Replace everything with aggregates of a full item list"""
+        self.items = {}           # id -> item
+        self.size = 0
+        self.stock_sum = 0
+        self.sales_sum = 0
+        self.value_sum = 0
+        self.category_values = {}
+        self.category_counts = {}
+        self.category_floats = {}  # category -> count of non-integer values
+        self.checksum_sum = 0
+
+        self.out_of_stock = {}
+        self.low_stock = {}
+        self.reorder_soon = {}
+        self.slow_moving = {}
+        self.fast_moving = {}
+        self.high_margin = {}
+
+        self._seq = {}            # id -> first-seen sequence, used for tie-breaking
+        self._next_seq = 0
+        # Every item outside _top ranks below _floor; every item inside ranks at or above it
+        self._top = {}            # id -> (-value, seq, id)
+        self._floor = None
+
+        self.apply(changed=items)
+
+    @property
+    def checksum(self):
+        return format(self.checksum_sum % CHECKSUM_MOD, '016x')
+
+    def apply(self, changed=(), removed=()):
+        """
+        Upsert changed items (full item dicts), then drop removed ids.
+        Raises ValueError, changing nothing, if any item or id is invalid.
+        """
+        changed = list(changed)
+        removed = list(removed)
+        for item in changed:
+            validate_item(item)
+        for item_id in removed:
+            if item_id is None or isinstance(item_id, (dict, list)):
+                raise ValueError(f'removed ids must be strings or numbers, got {item_id!r}')
+
+        for item in changed:
+            item_id = item['id']
+            old = self.items.get(item_id)
+            if old is not None:
+                self._retract(item_id, old)
+            else:
+                self._seq[item_id] = self._next_seq
+                self._next_seq += 1
+            self.items[item_id] = item
+            self._add(item_id, item)
+
+        for item_id in removed:
+            old = self.items.pop(item_id, None)
+            if old is not None:
+                self._retract(item_id, old)
+                self._seq.pop(item_id, None)
+
+    def _conditions(self, item):
+        stock = item['currentStock']
+        reorder_point = item.get('reorderPoint', 0)
+        sales = item.get('averageDailySales', 0)
+        cost = item['costPrice']
+        selling = item.get('sellingPrice', 0)
+        if cost:
+            margin_high = (selling - cost) / cost > 0.5
+        else:
+            margin_high = selling > 0  # NumPy gives +inf for a zero cost
+        return (
+            ('out_of_stock', stock == 0),
+            ('low_stock', stock <= reorder_point),
+            ('reorder_soon', 0 < stock <= reorder_point),
+            ('slow_moving', sales < 0.5 and stock > 20),
+            ('fast_moving', sales > 5),
+            ('high_margin', margin_high)
+        )
+
+    def _add(self, item_id, item):
+        value = item['currentStock'] * item['costPrice']
+        category = item.get('category', 'Uncategorized')
+
+        self.size += 1
+        self.stock_sum += item['currentStock']
+        self.sales_sum += item.get('averageDailySales', 0)
+        self.value_sum += value
+        self.category_values[category] = self.category_values.get(category, 0) + value
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        if not isinstance(value, int):
+            self.category_floats[category] = self.category_floats.get(category, 0) + 1
+        self.checksum_sum += item_checksum(item)
+
+        for mask, hit in self._conditions(item):
+            if hit:
+                getattr(self, mask)[item_id] = None
+
+        entry = (-value, self._seq[item_id], item_id)
+        if self._floor is None or entry <= self._floor:
+            self._top[item_id] = entry
+            if len(self._top) > 2 * self.TOP_BUFFER:
+                self._rebuild_top(sorted(self._top.values()))
+
+    def _retract(self, item_id, item):
+        value = item['currentStock'] * item['costPrice']
+        category = item.get('category', 'Uncategorized')
+
+        self.size -= 1
+        self.stock_sum -= item['currentStock']
+        self.sales_sum -= item.get('averageDailySales', 0)
+        self.value_sum -= value
+        self.category_values[category] -= value
+        self.category_counts[category] -= 1
+        if not isinstance(value, int):
+            self.category_floats[category] -= 1
+        if not self.category_counts[category]:
+            del self.category_values[category]
+            del self.category_counts[category]
+            self.category_floats.pop(category, None)
+        self.checksum_sum -= item_checksum(item)
+
+        for mask, hit in self._conditions(item):
+            if hit:
+                getattr(self, mask).pop(item_id, None)
+
+        self._top.pop(item_id, None)
+
+    def _rebuild_top(self, entries):
+        kept = entries[:self.TOP_BUFFER]
+        self._top = {entry[2]: entry for entry in kept}
+        # With everything kept there is nothing outside, so no floor
+        self._floor = kept[-1] if len(kept) < len(entries) else None
+
+    # --- InventoryFrame interface -------------------------------------
+
+    def count(self, mask):
+        return len(mask)
+
+    def first_names(self, mask, limit):
+        return [self.items[i]['name'] for i in islice(mask, limit)]
+
+    def first_items(self, mask, limit):
+        return [self.items[i] for i in islice(mask, limit)]
+
+    def total_value(self):
+        return self.value_sum
+
+    def mean_stock(self):
+        return self.stock_sum / self.size
+
+    def mean_daily_sales(self):
+        return self.sales_sum / self.size
+
+    def top_by_value(self, limit):
+        if len(self._top) < min(limit, self.size):
+            # Too many top items fell out of the buffer; one full pass refills it
+            self._rebuild_top(sorted(
+                (-(i['currentStock'] * i['costPrice']), self._seq[item_id], item_id)
+                for item_id, i in self.items.items()
+            ))
+        return [self.items[entry[2]]['name'] for entry in sorted(self._top.values())[:limit]]
+
+    def category_totals(self):
+        return [
+            (category, total if self.category_floats.get(category) else int(total))
+            for category, total in self.category_values.items()
+        ]
+
+
+class InventoryStateStore:
+    """
+    Per-tenant InventoryState objects, least recently used dropped first.
+
+    With `root`, each tenant also has a JSON-lines log there: the snapshot's
+    items on the first line, then one line per applied delta. Worker
+    processes sharing the directory catch up on each other's deltas before
+    applying their own (under a file lock), so any worker can take a
+    tenant's next delta. A log is rewritten as a new snapshot every
+    `compact_every` deltas, and logs untouched for `max_age` seconds are
+    deleted.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, max_tenants=1000, root=None, compact_every=200, max_age=7 * 86400):
+        self.max_tenants = max_tenants
+        self.root = root
+        self.compact_every = compact_every
+        self.max_age = max_age
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._swept_at = 0.0
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    # --- shared log -------------------------------------------------------
+
+    def _path(self, tenant_id):
+        digest = hashlib.sha1(str(tenant_id).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest + '.jsonl')
+
+    def _file_lock(self, tenant_id):
+        # Striped, so the number of lock files stays fixed however many tenants come and go
+        digest = hashlib.sha1(str(tenant_id).encode('utf-8')).digest()
+        return FileLock(os.path.join(self.root, f'stripe-{digest[0] % self.LOCK_STRIPES:02d}.lock'))
+
+    def _write_snapshot(self, tenant_id, state):
+        path = self._path(tenant_id)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_json_line({'items': list(state.items.values())}))
+            state.log_offset = f.tell()
+        os.replace(tmp, path)
+        state.log_id = os.stat(path).st_ino
+        state.log_deltas = 0
+
+    def _sync(self, tenant_id, state):
+        """
+        Bring state up to date with the tenant's log (caller holds the file
+        lock and state.lock). Returns False if the log is gone.
+        """
+        path = self._path(tenant_id)
+        try:
+            with open(path, 'rb') as f:
+                log_id = os.fstat(f.fileno()).st_ino
+                if log_id != state.log_id:
+                    # Replaced by a snapshot or compaction: start over
+                    state.reset(json.loads(f.readline())['items'])
+                    state.log_id = log_id
+                    state.log_offset = f.tell()
+                    state.log_deltas = 0
+                f.seek(state.log_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    delta = json.loads(line)
+                    state.apply(changed=delta['changed'], removed=delta['removed'])
+                    state.log_offset += len(line)
+                    state.log_deltas += 1
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _load(self, tenant_id):
+        state = InventoryState()
+        with state.lock, self._file_lock(tenant_id).shared():
+            if not self._sync(tenant_id, state):
+                return None
+        return state
+
+    def _sweep(self, interval=3600):
+        now = time.time()
+        if now - self._swept_at < interval:
+            return
+        self._swept_at = now
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if name.endswith(('.jsonl', '.tmp')) and now - os.stat(path).st_mtime > self.max_age:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # --- tenants ----------------------------------------------------------
+
+    def _remember(self, tenant_id, state):
+        with self._lock:
+            self._states[tenant_id] = state
+            self._states.move_to_end(tenant_id)
+            while len(self._states) > self.max_tenants:
+                self._states.popitem(last=False)
+
+    def get(self, tenant_id):
+        """The tenant's state, caught up with the shared log if there is one; None if unknown"""
+        with self._lock:
+            state = self._states.get(tenant_id)
+            if state is not None:
+                self._states.move_to_end(tenant_id)
+        if not self.root:
+            return state
+
+        if state is None:
+            state = self._load(tenant_id)
+            if state is not None:
+                self._remember(tenant_id, state)
+            return state
+        with state.lock, self._file_lock(tenant_id).shared():
+            if self._sync(tenant_id, state):
+                return state
+        with self._lock:
+            self._states.pop(tenant_id, None)
+        return None
+
+    def reset(self, tenant_id, items):
+        state = InventoryState(items)
+        if self.root:
+            with self._file_lock(tenant_id).exclusive():
+                self._write_snapshot(tenant_id, state)
+            self._sweep()
+        self._remember(tenant_id, state)
+        return state
+
+    def apply(self, tenant_id, state, changed, removed, expected_checksum=None):
+        """
+        Apply a delta to a tenant's state (caller holds state.lock). Returns
+        False, and drops the tenant, when its shared log is gone or its
+        checksum is not expected_checksum. Raises ValueError, changing
+        nothing, if the delta is invalid.
+        """
+        if not self.root:
+            if expected_checksum and expected_checksum != state.checksum:
+                self.drop(tenant_id)
+                return False
+            state.apply(changed=changed, removed=removed)
+            return True
+
+        with self._file_lock(tenant_id).exclusive():
+            if not self._sync(tenant_id, state) or (expected_checksum and expected_checksum != state.checksum):
+                self._drop(tenant_id)
+                return False
+            changed, removed = list(changed), list(removed)
+            state.apply(changed=changed, removed=removed)
+            line = _json_line({'changed': changed, 'removed': removed})
+            with open(self._path(tenant_id), 'ab') as f:
+                f.write(line)
+            state.log_offset += len(line)
+            state.log_deltas += 1
+            if state.log_deltas >= self.compact_every:
+                self._write_snapshot(tenant_id, state)
+        return True
+
+    def drop(self, tenant_id):
+        if self.root:
+            with self._file_lock(tenant_id).exclusive():
+                self._drop(tenant_id)
+        else:
+            self._drop(tenant_id)
+
+    def _drop(self, tenant_id):
+        with self._lock:
+            self._states.pop(tenant_id, None)
+        if self.root:
+            try:
+                os.remove(self._path(tenant_id))
+            except FileNotFoundError:
+                pass
+
+
+def _json_line(data):
+    return json.dumps(data, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
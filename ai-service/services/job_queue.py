@@ -0,0 +1,331 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled', 'expired')
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled or passed its deadline"""
+
+
+class QueueFull(Exception):
+    """Raised by JobManager.submit when too many jobs are waiting"""
+
+
+class Job:
+    # Progress is written to the shared store at most this often (seconds)
+    SAVE_INTERVAL = 0.5
+
+    def __init__(self, kind, deadline, store=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = self.created_at + deadline
+        self.progress = {'done': 0, 'total': None}
+        self.result = None
+        self.error = None
+        self.future = None
+        self._cancel_requested = False
+        self._done = threading.Event()
+        self._store = store
+        self._saved_at = 0.0
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def check(self):
+        """Cooperative cancellation point for the job's work function"""
+        if not self._cancel_requested and self._store is not None and self._store.cancel_requested(self.id):
+            # Cancelled through another worker
+            self._cancel_requested = True
+        if self._cancel_requested:
+            raise JobCancelled('Job was cancelled')
+        if time.time() > self.deadline:
+            raise JobCancelled('Job deadline exceeded')
+
+    def report_progress(self, done, total=None):
+        """Progress callback handed to work functions; also a cancellation point"""
+        self.progress = {'done': done, 'total': total}
+        if self._store is not None and time.monotonic() - self._saved_at >= self.SAVE_INTERVAL:
+            self.save()
+        self.check()
+
+    def save(self):
+        """Publish the job's current state to the shared store, if any"""
+        if self._store is not None:
+            self._saved_at = time.monotonic()
+            try:
+                self._store.save(self)
+            except (OSError, TypeError, ValueError) as e:
+                # Other workers see a stale record; this one still has the job
+                print(f"Could not save job {self.id}: {e}")
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        data = {
+            'jobId': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'deadline': self.deadline
+        }
+        if self.status == 'succeeded':
+            data['result'] = self.result
+        elif self.error:
+            data['error'] = self.error
+        return data
+
+
+class StoredJob:
+    """Read-only view of a job another worker is running, as last saved"""
+
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, store, data):
+        self._store = store
+        self._data = data
+        self.id = data['jobId']
+
+    @property
+    def status(self):
+        return self._data['status']
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.finished and time.monotonic() < deadline:
+            time.sleep(min(self.POLL_INTERVAL, max(0, deadline - time.monotonic())))
+            data = self._store.load(self.id)
+            if data is None:
+                break
+            self._data = data
+        return self.finished
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class JobStore:
+    """
+    Job records in a directory every worker can reach, so any worker can
+    report on (and cancel) a job another one is running. Each job is one
+    JSON file, replaced atomically on every save; cancelling a job owned by
+    another worker leaves a marker file its owner checks at job.check().
+    """
+
+    def __init__(self, root, max_age):
+        self.root = root
+        # Files older than this belong to a worker that died before pruning them
+        self.max_age = max_age
+        self._swept_at = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, job_id, suffix='.json'):
+        return os.path.join(self.root, job_id + suffix)
+
+    def save(self, job):
+        tmp = self._path(job.id, f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(job.to_dict(), f)
+        os.replace(tmp, self._path(job.id))
+
+    def load(self, job_id):
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def request_cancel(self, job_id):
+        with open(self._path(job_id, '.cancel'), 'w'):
+            pass
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self._path(job_id, '.cancel'))
+
+    def remove(self, job_id):
+        for suffix in ('.json', '.cancel'):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def sweep(self, interval=60):
+        """Delete records left behind by workers that exited (at most once per `interval` seconds)"""
+        now = time.time()
+        if now - self._swept_at < interval:
+            return
+        self._swept_at = now
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.stat(path).st_mtime > self.max_age:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class JobManager:
+    """
+    Runs long requests in the background on a bounded worker pool.
+
+    At most `max_pending` jobs may be queued or running at once; beyond that
+    submit() raises QueueFull. Deadlines are capped at `max_deadline`
+    seconds. Finished jobs are kept for `result_ttl` seconds, and at most
+    `max_results` of them, the earliest finished dropped first.
+
+    With `root`, jobs are also saved to a JobStore there, so with several
+    worker processes sharing the directory, get() and cancel() work for
+    jobs running in any of them. Queue limits stay per process.
+    """
+
+    def __init__(self, max_workers=4, max_pending=100, max_results=500,
+                 result_ttl=600, default_deadline=120, max_deadline=600, root=None):
+        self.max_pending = max_pending
+        self.max_results = max_results
+        self.result_ttl = result_ttl
+        self.default_deadline = default_deadline
+        self.max_deadline = max_deadline
+        self.store = JobStore(root, max_age=result_ttl + max_deadline) if root else None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()  # job id -> Job, in submission order
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, deadline=None):
+        """
+        Queue fn(job) to run in the background and return the Job.
+        fn should call job.report_progress()/job.check() as it goes.
+        `deadline` is in seconds from now (default_deadline when None).
+        """
+        job = Job(kind, min(deadline or self.default_deadline, self.max_deadline), store=self.store)
+        with self._lock:
+            self._prune()
+            active = sum(1 for j in self._jobs.values() if not j.finished)
+            if active >= self.max_pending:
+                raise QueueFull(f'{active} jobs already pending')
+            self._jobs[job.id] = job
+        job.save()
+        job.future = self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        try:
+            job.check()
+            job.status = 'running'
+            job.started_at = time.time()
+            job.save()
+            job.result = fn(job)
+            job.check()
+            job.status = 'succeeded'
+        except JobCancelled as e:
+            job.status = 'cancelled' if job._cancel_requested else 'expired'
+            job.error = str(e)
+            job.result = None
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.save()
+            job._done.set()
+
+    def get(self, job_id):
+        """The Job if this process runs it, else a StoredJob from the shared store, else None"""
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            data = self.store.load(job_id)
+            if data is not None:
+                job = StoredJob(self.store, data)
+        return job
+
+    def cancel(self, job_id):
+        """Request cancellation; returns the job or None if unknown"""
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if isinstance(job, StoredJob):
+            # Its owner stops it at the next job.check()
+            self.store.request_cancel(job_id)
+            return job
+        job._cancel_requested = True
+        if job.future is not None and job.future.cancel():
+            # Never started: finish it here
+            job.status = 'cancelled'
+            job.error = 'Job was cancelled'
+            job.finished_at = time.time()
+            job.save()
+            job._done.set()
+        return job
+
+    def _prune(self):
+        now = time.time()
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in finished:
+            if now - job.finished_at > self.result_ttl:
+                self._forget(job)
+        finished = sorted((j for j in finished if j.id in self._jobs), key=lambda j: j.finished_at)
+        for job in finished[:max(0, len(finished) - self.max_results)]:
+            self._forget(job)
+        if self.store is not None:
+            self.store.sweep()
+
+    def _forget(self, job):
+        del self._jobs[job.id]
+        if self.store is not None:
+            self.store.remove(job.id)
+
+    def shutdown(self, timeout=None):
+        """
+        Stop taking jobs: queued jobs are cancelled and running ones are
+        given up to `timeout` seconds (default: until done) to finish.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.status == 'queued':
+                self.cancel(job.id)
+        deadline = time.time() + timeout if timeout is not None else None
+        for job in jobs:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            job.wait(remaining)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for j in self._jobs.values() if not j.finished)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                'jobs': len(self._jobs),
+                'byStatus': counts,
+                'maxPending': self.max_pending,
+                'maxResults': self.max_results
+            }
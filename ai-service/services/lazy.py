@@ -0,0 +1,40 @@
+import threading
+
+
+class LazyService:
+    """
+    Stand-in for a service object that is built by `factory` on first
+    attribute access, so importing the app stays cheap. Thread-safe.
+    """
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_lazy_factory', factory)
+        object.__setattr__(self, '_lazy_instance', None)
+        object.__setattr__(self, '_lazy_lock', threading.Lock())
+
+    def __getattr__(self, name):
+        return getattr(resolve(self), name)
+
+    def __setattr__(self, name, value):
+        setattr(resolve(self), name, value)
+
+    def __contains__(self, item):
+        return item in resolve(self)
+
+
+def resolve(service):
+    """The real object behind a LazyService (built now if needed)"""
+    if not isinstance(service, LazyService):
+        return service
+    instance = service._lazy_instance
+    if instance is None:
+        with service._lazy_lock:
+            instance = service._lazy_instance
+            if instance is None:
+                instance = service._lazy_factory()
+                object.__setattr__(service, '_lazy_instance', instance)
+    return instance
+
+
+def is_loaded(service):
+    return not isinstance(service, LazyService) or service._lazy_instance is not None
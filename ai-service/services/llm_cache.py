@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LLMResponseCache:
+    """
+    Prompt-keyed cache for parsed Gemini responses.
+
+    Entries live in an in-memory LRU with per-entry TTL and are written
+    through to a SQLite file so they survive restarts. Only responses that
+    parsed successfully are stored, so a malformed reply is retried next time.
+    """
+
+    def __init__(self, path=None, max_entries=None):
+        if path is None:
+            path = os.getenv('LLM_CACHE_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'llm_cache.sqlite3'))
+        if max_entries is None:
+            max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 512))
+
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+
+        if path:
+            try:
+                if path != ':memory:':
+                    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = self._connect()
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS llm_cache '
+                    '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+                )
+                self._db.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (time.time(),))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"LLM cache disk store unavailable, using memory only: {e}")
+                self._db = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+        if self.path != ':memory:':
+            # Lets forked workers read while another one writes
+            db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def reopen(self):
+        """
+        Open a fresh database connection. Call in each worker after fork:
+        a SQLite connection must not be shared across processes.
+        """
+        self._lock = threading.Lock()
+        if self._db is not None and self.path != ':memory:':
+            try:
+                self._db = self._connect()
+            except sqlite3.Error as e:
+                print(f"LLM cache disk store unavailable after fork, using memory only: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(namespace, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def get(self, key):
+        """Return the cached value or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.stores += 1
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                        (key, json.dumps(value), expires_at)
+                    )
+                    self._db.commit()
+                except (sqlite3.Error, TypeError, ValueError) as e:
+                    print(f"LLM cache write failed: {e}")
+
+    def get_or_compute(self, namespace, prompt, compute, ttl):
+        """
+        Return the cached result for this prompt, or call compute() and cache
+        what it returns. Exceptions from compute() propagate and nothing is stored.
+        """
+        key = self.make_key(namespace, prompt)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = compute()
+        self.put(key, value, ttl)
+        return value
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM llm_cache')
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._memory),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'diskHits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'stores': self.stores,
+                'hitRatio': round(self.hits / lookups, 4) if lookups else 0,
+                'persistent': self._db is not None
+            }
@@ -0,0 +1,145 @@
+import numpy as np
+
+from services.search_cache import normalize_product_name
+
+SORT_KEYS = ('impact', 'margin', 'input')
+
+
+def _market_price(entry):
+    """A marketData value is a price or a dict with price/averagePrice"""
+    if isinstance(entry, dict):
+        entry = entry.get('price', entry.get('averagePrice'))
+    try:
+        return float(entry)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class PricingEngine:
+    """
+    Vectorized price suggestions for a whole catalog.
+
+    Margins and the increase/decrease rules are evaluated as array
+    operations over all items; suggestion dicts are only built for the page
+    that is returned. marketData is turned into an index keyed by item id
+    and normalized item name, and items priced well away from the market
+    get a move toward it when no margin rule applies.
+    """
+
+    def __init__(self, min_margin=0.2, max_margin=0.6, slow_sales=1,
+                 increase_markup=1.3, decrease_markup=1.4, market_band=0.15):
+        self.min_margin = min_margin
+        self.max_margin = max_margin
+        self.slow_sales = slow_sales
+        self.increase_markup = increase_markup
+        self.decrease_markup = decrease_markup
+        self.market_band = market_band
+
+    def _market_index(self, market_data):
+        index = {}
+        for key, entry in (market_data or {}).items():
+            price = _market_price(entry)
+            if not np.isnan(price):
+                index[str(key)] = price
+                index[normalize_product_name(str(key))] = price
+        return index
+
+    def suggest(self, items, market_data=None, offset=0, limit=50, sort_by='impact', recommendation=None):
+        """
+        Returns {suggestions, total, offset, limit, counts}. total counts
+        items after the recommendation filter; counts covers all items.
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"sortBy must be one of {', '.join(SORT_KEYS)}")
+
+        n = len(items)
+        selling = np.array([item.get('sellingPrice', 0) for item in items], dtype=float)
+        # As before: a missing costPrice counts as 0 in the margin numerator and 1 as divisor
+        cost = np.array([item.get('costPrice', 0) for item in items], dtype=float)
+        divisor = np.array([item.get('costPrice', 1) for item in items], dtype=float)
+        sales = np.array([item.get('averageDailySales', 0) for item in items], dtype=float)
+
+        index = self._market_index(market_data)
+        if index:
+            market = np.array([
+                index.get(str(item['id']), index.get(normalize_product_name(item['name']), np.nan))
+                for item in items
+            ], dtype=float)
+        else:
+            market = np.full(n, np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = (selling - cost) / divisor
+        # Zero-cost items have no meaningful margin; they are left alone
+        priced = divisor != 0
+
+        increase = priced & (margin < self.min_margin)
+        decrease = priced & ~increase & (margin > self.max_margin) & (sales < self.slow_sales)
+
+        has_market = priced & ~np.isnan(market)
+        maintain = ~increase & ~decrease
+        with np.errstate(invalid='ignore'):
+            above_market = has_market & maintain & (selling > market * (1 + self.market_band))
+            below_market = has_market & maintain & (selling < market * (1 - self.market_band))
+
+        suggested = np.full(n, np.nan)
+        suggested[increase] = cost[increase] * self.increase_markup
+        suggested[decrease] = cost[decrease] * self.decrease_markup
+        # Move toward the market without dropping below the minimum margin
+        suggested[above_market] = np.maximum(market[above_market], cost[above_market] * (1 + self.min_margin))
+        suggested[below_market] = market[below_market] * (1 - self.market_band / 3)
+
+        label = np.full(n, 'maintain', dtype=object)
+        label[increase | below_market] = 'increase'
+        label[decrease | above_market] = 'decrease'
+
+        # Estimated monthly revenue change at current sales
+        delta = np.nan_to_num(np.abs(suggested - selling))
+        impact = delta * np.maximum(sales, 0) * 30
+
+        selected = np.arange(n)
+        if recommendation:
+            selected = selected[label == recommendation]
+        if sort_by == 'impact':
+            # Ties (e.g. zero sales) fall back to the size of the price change
+            selected = selected[np.lexsort((-delta[selected], -impact[selected]))]
+        elif sort_by == 'margin':
+            selected = selected[np.argsort(np.where(priced, margin, np.inf)[selected], kind='stable')]
+        page = selected[offset:offset + limit] if limit is not None else selected[offset:]
+
+        suggestions = []
+        for i in page.tolist():
+            item = items[i]
+            suggestion = {
+                'itemId': item['id'],
+                'itemName': item['name'],
+                'currentPrice': item.get('sellingPrice', 0),
+                'currentMargin': round(float(margin[i]) * 100, 2) if priced[i] else None,
+                'recommendation': label[i]
+            }
+            if increase[i]:
+                suggestion['reasoning'] = 'Margin too low, recommend 30% markup'
+            elif decrease[i]:
+                suggestion['reasoning'] = 'High margin but slow sales, consider price reduction'
+            elif above_market[i]:
+                suggestion['reasoning'] = f'Priced {round((selling[i] / market[i] - 1) * 100)}% above market'
+            elif below_market[i]:
+                suggestion['reasoning'] = f'Priced {round((1 - selling[i] / market[i]) * 100)}% below market'
+            if label[i] != 'maintain':
+                suggestion['suggestedPrice'] = float(suggested[i]) if (increase[i] or decrease[i]) else round(float(suggested[i]), 2)
+                suggestion['estimatedMonthlyImpact'] = round(float(impact[i]), 2)
+            if has_market[i]:
+                suggestion['marketPrice'] = float(market[i])
+            suggestions.append(suggestion)
+
+        return {
+            'suggestions': suggestions,
+            'total': int(selected.size),
+            'offset': offset,
+            'limit': limit,
+            'counts': {
+                'increase': int(np.count_nonzero(label == 'increase')),
+                'decrease': int(np.count_nonzero(label == 'decrease')),
+                'maintain': int(np.count_nonzero(label == 'maintain'))
+            }
+        }
@@ -0,0 +1,130 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+import uuid
+from collections import deque
+
+from services.metrics import start_trace, end_trace
+
+# cProfile hooks the interpreter (process-wide on 3.12+), so only one
+# request is profiled at a time; others run unprofiled
+_profiler_lock = threading.Lock()
+
+
+def summarize_stages(trace):
+    """(stage, seconds) pairs -> [{stage, count, totalMs, maxMs}], slowest first"""
+    stages = {}
+    for name, seconds in trace:
+        entry = stages.setdefault(name, {'stage': name, 'count': 0, 'totalMs': 0.0, 'maxMs': 0.0})
+        entry['count'] += 1
+        entry['totalMs'] += seconds * 1000
+        entry['maxMs'] = max(entry['maxMs'], seconds * 1000)
+    for entry in stages.values():
+        entry['totalMs'] = round(entry['totalMs'], 3)
+        entry['maxMs'] = round(entry['maxMs'], 3)
+    return sorted(stages.values(), key=lambda s: -s['totalMs'])
+
+
+def server_timing(duration_ms, stages):
+    """Server-Timing header value: total plus one metric per stage"""
+    parts = [f'total;dur={duration_ms:.3f}']
+    for entry in stages:
+        # Metric names are tokens; stage names use dots, which are allowed
+        parts.append(f'{entry["stage"]};dur={entry["totalMs"]:.3f};desc="x{entry["count"]}"')
+    return ', '.join(parts)
+
+
+class RequestProfile:
+    """cProfile plus a stage trace around one request"""
+
+    def __init__(self, route, method, tenant_id=None, top=40):
+        self.id = uuid.uuid4().hex[:12]
+        self.route = route
+        self.method = method
+        self.tenant_id = tenant_id
+        self.top = top
+        self.profiler = cProfile.Profile()
+        self.trace = None
+        self.started = None
+
+    def start(self):
+        self.trace = start_trace()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self, status):
+        """Stop profiling and return the stored record"""
+        self.profiler.disable()
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        end_trace()
+
+        out = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.top)
+        stages = summarize_stages(self.trace)
+        return {
+            'id': self.id,
+            'route': self.route,
+            'method': self.method,
+            'tenantId': self.tenant_id,
+            'status': status,
+            'startedAt': time.time() - duration_ms / 1000,
+            'durationMs': round(duration_ms, 3),
+            'stages': stages,
+            'serverTiming': server_timing(duration_ms, stages),
+            'profile': out.getvalue()
+        }
+
+
+class ProfileStore:
+    """
+    Ring buffer of the last `size` request profiles (per worker process).
+    begin() returns None when another request is already being profiled.
+    """
+
+    def __init__(self, size=20, top=40):
+        self.top = top
+        self._profiles = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def begin(self, route, method, tenant_id=None):
+        if not _profiler_lock.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return None
+        profile = RequestProfile(route, method, tenant_id, self.top)
+        try:
+            profile.start()
+        except Exception:
+            _profiler_lock.release()
+            raise
+        return profile
+
+    def finish(self, profile, status):
+        try:
+            record = profile.stop(status)
+        finally:
+            _profiler_lock.release()
+        with self._lock:
+            self._profiles.append(record)
+        return record
+
+    def list(self):
+        """Newest first, without the profile text"""
+        with self._lock:
+            records = list(self._profiles)
+        return [{k: v for k, v in record.items() if k != 'profile'} for record in reversed(records)]
+
+    def get(self, profile_id):
+        with self._lock:
+            for record in self._profiles:
+                if record['id'] == profile_id:
+                    return record
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {'stored': len(self._profiles), 'capacity': self._profiles.maxlen, 'skipped': self.skipped}
@@ -1,85 +1,50 @@
 import os
-import google.generativeai as genai
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from services.vendor_index import VendorProductIndex
+from services.gemini import LazyClient
+from services.llm_cache import LLMResponseCache
+from services.metrics import in_context, timed
+from services.single_flight import SingleFlight
 
 class RecommendationEngine:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        else:
-            self.model = None
+    # Shared, rate-limited Gemini client, created on first use (None without GEMINI_API_KEY)
+    model = LazyClient()
+    
+    def __init__(self, llm_cache=None):
+        # Shared prompt cache (see services.llm_cache); TTL in seconds
+        self.llm_cache = llm_cache
+        self.cache_ttl = int(os.getenv('RECOMMENDATION_AI_CACHE_TTL', 900))
+        # Identical prompts already in flight share one Gemini call
+        self.flights = SingleFlight('recommendation')
+        # Gemini insight batching
+        self.insight_chunk_size = int(os.getenv('AI_INSIGHT_CHUNK_SIZE', 25))
+        self.insight_max_workers = int(os.getenv('AI_INSIGHT_MAX_WORKERS', 4))
         
-    def generate_recommendations(self, items, vendors):
+    def generate_recommendations(self, items, vendors, vendor_index=None, progress=None):
         """
         Generate smart purchase recommendations using AI with backup vendors
+        
+        progress, if given, is called as progress(done, total) as items are scored.
         """
         recommendations = []
         
-        for item in items:
-            # Find vendors who sell this item
-            matching_vendors = self._find_matching_vendors(item, vendors)
-            
-            if not matching_vendors:
-                continue
-            
-            # Calculate optimal quantity to order
-            optimal_quantity = self._calculate_optimal_quantity(item)
-            
-            # Select TOP 5 vendors (primary + 4 backups) based on multiple factors
-            top_vendors = self._select_top_vendors(item, matching_vendors, optimal_quantity, top_n=5)
+        # Build the product-name index once for the whole batch
+        if vendor_index is None:
+            vendor_index = VendorProductIndex(vendors)
+        
+        for done, item in enumerate(items):
+            if progress:
+                progress(done, len(items))
             
-            if top_vendors and len(top_vendors) > 0:
-                # Primary vendor
-                primary_vendor = top_vendors[0]
-                
-                # Backup vendors (remaining)
-                backup_vendors = []
-                for idx, vendor in enumerate(top_vendors[1:], start=2):
-                    backup_vendors.append({
-                        'priority': idx,
-                        'vendorId': vendor['id'],
-                        'vendorName': vendor['name'],
-                        'vendorSource': vendor.get('source', 'Database'),
-                        'isOnline': vendor.get('isOnline', False),
-                        'country': vendor.get('country', 'N/A'),
-                        'price': vendor['price'],
-                        'totalCost': vendor['price'] * optimal_quantity,
-                        'deliveryTime': vendor.get('deliveryTime', 7),
-                        'rating': vendor.get('rating', 0),
-                        'stockAvailable': vendor.get('stockAvailable', True),
-                        'reliabilityScore': vendor.get('confidence', 0.85),
-                        'savings': vendor.get('savings', 0)
-                    })
-                
-                recommendation = {
-                    'itemId': item['id'],
-                    'itemName': item['name'],
-                    'currentStock': item['currentStock'],
-                    'reorderPoint': item['reorderPoint'],
-                    'recommendedQuantity': optimal_quantity,
-                    # Primary vendor
-                    'vendorId': primary_vendor['id'],
-                    'vendorName': primary_vendor['name'],
-                    'vendorSource': primary_vendor.get('source', 'Database'),
-                    'isOnline': primary_vendor.get('isOnline', False),
-                    'country': primary_vendor.get('country', 'N/A'),
-                    'price': primary_vendor['price'],
-                    'totalCost': primary_vendor['price'] * optimal_quantity,
-                    'estimatedSavings': primary_vendor.get('savings', 0),
-                    'deliveryTime': primary_vendor.get('deliveryTime', 7),
-                    'confidence': primary_vendor.get('confidence', 0.85),
-                    'rating': primary_vendor.get('rating', 0),
-                    'stockAvailable': primary_vendor.get('stockAvailable', True),
-                    'reasoning': self._generate_reasoning(item, primary_vendor, optimal_quantity),
-                    # Backup system
-                    'backupVendors': backup_vendors,
-                    'totalVendorsFound': len(top_vendors),
-                    'hasBackup': len(backup_vendors) > 0
-                }
+            recommendation = self._build_recommendation(item, vendors, vendor_index)
+            if recommendation:
                 recommendations.append(recommendation)
         
+        if progress:
+            progress(len(items), len(items))
+        
         # Get AI-powered insights using Gemini
         if recommendations and self.model:
             try:
@@ -92,28 +57,139 @@ class RecommendationEngine:
         
         return recommendations
     
-    def _find_matching_vendors(self, item, vendors):
+    def stream_recommendations(self, items, vendors, vendor_index=None):
+        """
+        Generate recommendations incrementally
+        
+        Yields ('recommendation', rec) as soon as each item is scored, then
+        ('insight', itemId, text) as Gemini insight chunks complete. Insight
+        chunks are sent while later items are still being scored.
+        """
+        if vendor_index is None:
+            vendor_index = VendorProductIndex(vendors)
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, self.insight_max_workers)) if self.model else None
+        chunk_size = max(1, self.insight_chunk_size)
+        pending = {}
+        chunk = []
+        
+        try:
+            for item in items:
+                recommendation = self._build_recommendation(item, vendors, vendor_index)
+                if not recommendation:
+                    continue
+                
+                yield 'recommendation', recommendation
+                
+                if executor:
+                    chunk.append(recommendation)
+                    if len(chunk) >= chunk_size:
+                        pending[executor.submit(in_context(self._get_chunk_insights), len(items), chunk)] = chunk
+                        chunk = []
+                    
+                    # Emit any insight chunks that finished meanwhile
+                    for future in [f for f in pending if f.done()]:
+                        for item_id, insight in self._chunk_results(pending.pop(future), future):
+                            yield 'insight', item_id, insight
+            
+            if executor and chunk:
+                pending[executor.submit(in_context(self._get_chunk_insights), len(items), chunk)] = chunk
+            
+            for future in as_completed(list(pending)):
+                for item_id, insight in self._chunk_results(pending.pop(future), future):
+                    yield 'insight', item_id, insight
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _build_recommendation(self, item, vendors, vendor_index):
+        """Score vendors for one item; None if no vendor can supply it"""
+        # Find vendors who sell this item
+        matching_vendors = self._find_matching_vendors(item, vendors, vendor_index)
+        
+        if not matching_vendors:
+            return None
+        
+        # Calculate optimal quantity to order
+        optimal_quantity = self._calculate_optimal_quantity(item)
+        
+        # Select TOP 5 vendors (primary + 4 backups) based on multiple factors
+        top_vendors = self._select_top_vendors(item, matching_vendors, optimal_quantity, top_n=5)
+        
+        if top_vendors and len(top_vendors) > 0:
+            # Primary vendor
+            primary_vendor = top_vendors[0]
+            
+            # Backup vendors (remaining)
+            backup_vendors = []
+            for idx, vendor in enumerate(top_vendors[1:], start=2):
+                backup_vendors.append({
+                    'priority': idx,
+                    'vendorId': vendor['id'],
+                    'vendorName': vendor['name'],
+                    'vendorSource': vendor.get('source', 'Database'),
+                    'isOnline': vendor.get('isOnline', False),
+                    'country': vendor.get('country', 'N/A'),
+                    'price': vendor['price'],
+                    'totalCost': vendor['price'] * optimal_quantity,
+                    'deliveryTime': vendor.get('deliveryTime', 7),
+                    'rating': vendor.get('rating', 0),
+                    'stockAvailable': vendor.get('stockAvailable', True),
+                    'reliabilityScore': vendor.get('confidence', 0.85),
+                    'savings': vendor.get('savings', 0)
+                })
+            
+            recommendation = {
+                'itemId': item['id'],
+                'itemName': item['name'],
+                'currentStock': item['currentStock'],
+                'reorderPoint': item['reorderPoint'],
+                'recommendedQuantity': optimal_quantity,
+                # Primary vendor
+                'vendorId': primary_vendor['id'],
+                'vendorName': primary_vendor['name'],
+                'vendorSource': primary_vendor.get('source', 'Database'),
+                'isOnline': primary_vendor.get('isOnline', False),
+                'country': primary_vendor.get('country', 'N/A'),
+                'price': primary_vendor['price'],
+                'totalCost': primary_vendor['price'] * optimal_quantity,
+                'estimatedSavings': primary_vendor.get('savings', 0),
+                'deliveryTime': primary_vendor.get('deliveryTime', 7),
+                'confidence': primary_vendor.get('confidence', 0.85),
+                'rating': primary_vendor.get('rating', 0),
+                'stockAvailable': primary_vendor.get('stockAvailable', True),
+                'reasoning': self._generate_reasoning(item, primary_vendor, optimal_quantity),
+                # Backup system
+                'backupVendors': backup_vendors,
+                'totalVendorsFound': len(top_vendors),
+                'hasBackup': len(backup_vendors) > 0
+            }
+            return recommendation
+        
+        return None
+    
+    @timed('recommendation.find_matching_vendors')
+    def _find_matching_vendors(self, item, vendors, vendor_index=None):
         """Find vendors who sell the item"""
+        if vendor_index is None:
+            vendor_index = VendorProductIndex(vendors)
+        
         matching = []
         
-        for vendor in vendors:
-            for product in vendor.get('products', []):
-                if (product['itemName'].lower() in item['name'].lower() or 
-                    item['name'].lower() in product['itemName'].lower()):
-                    matching.append({
-                        'id': vendor['id'],
-                        'name': vendor['name'],
-                        'price': product['price'],
-                        'moq': product.get('moq', 1),
-                        'leadTime': product.get('leadTime', vendor.get('deliveryTime', 7)),
-                        'rating': vendor.get('rating', 0),
-                        'onTimeDelivery': vendor.get('performance', {}).get('onTimeDelivery', 100),
-                        # Preserve vendor source metadata
-                        'isOnline': vendor.get('isOnline', False),
-                        'source': vendor.get('source', 'Database'),
-                        'country': vendor.get('country', 'N/A')
-                    })
-                    break
+        for vendor, product in vendor_index.lookup(item['name']):
+            matching.append({
+                'id': vendor['id'],
+                'name': vendor['name'],
+                'price': product['price'],
+                'moq': product.get('moq', 1),
+                'leadTime': product.get('leadTime', vendor.get('deliveryTime', 7)),
+                'rating': vendor.get('rating', 0),
+                'onTimeDelivery': vendor.get('performance', {}).get('onTimeDelivery', 100),
+                # Preserve vendor source metadata
+                'isOnline': vendor.get('isOnline', False),
+                'source': vendor.get('source', 'Database'),
+                'country': vendor.get('country', 'N/A')
+            })
         
         return matching
     
@@ -148,6 +224,7 @@ class RecommendationEngine:
         else:
             return round(optimal_quantity / 10) * 10
     
+    @timed('recommendation.select_top_vendors')
     def _select_top_vendors(self, item, vendors, quantity, top_n=5):
         """
         Select top N vendors based on comprehensive scoring system
@@ -158,74 +235,84 @@ class RecommendationEngine:
         
         import random
         
-        scored_vendors = []
-        avg_price = sum(v['price'] for v in vendors) / len(vendors) if vendors else 0
+        # Load the scoring inputs into columns once
+        prices = np.array([v['price'] for v in vendors], dtype=float)
+        moqs = np.array([v.get('moq', 1) for v in vendors], dtype=float)
+        ratings = np.array([v.get('rating', 4.0) for v in vendors], dtype=float)
+        on_time = np.array([v.get('onTimeDelivery', 90) for v in vendors], dtype=float)
+        delivery_times = np.array([v.get('deliveryTime', 7) for v in vendors], dtype=float)
+        domestic = np.array([v.get('country', '').upper() == 'USA' for v in vendors])
         
-        for vendor in vendors:
-            # Check if vendor meets MOQ
-            moq = vendor.get('moq', 1)
-            if quantity < moq:
-                # Skip this vendor but note MOQ issue
-                continue
-            
-            # Multi-factor scoring system
-            # 1. Price Score (40%) - Lower is better
-            price_score = 1 / (vendor['price'] + 1)
-            normalized_price_score = min(price_score / 0.1, 1.0)  # Normalize
-            
-            # 2. Rating Score (25%)
-            rating_score = vendor.get('rating', 4.0) / 5.0
-            
-            # 3. Delivery Reliability (20%)
-            delivery_score = vendor.get('onTimeDelivery', 90) / 100
-            
-            # 4. Delivery Speed (15%) - Faster is better
-            delivery_time = vendor.get('deliveryTime', 7)
-            speed_score = max(0, 1 - (delivery_time / 30))  # 30 days = 0 score
-            
-            # Calculate composite score
-            composite_score = (
-                normalized_price_score * 0.40 +
-                rating_score * 0.25 +
-                delivery_score * 0.20 +
-                speed_score * 0.15
-            )
-            
-            # Add bonus for domestic vendors (faster, less customs issues)
-            if vendor.get('country', '').upper() == 'USA':
-                composite_score += 0.05
-            
-            # Calculate savings
-            savings = (avg_price - vendor['price']) * quantity
-            
-            # Simulate stock availability (90% chance available)
-            stock_available = random.random() < 0.9
-            
-            # Add to scored list
-            scored_vendors.append({
-                **vendor,
-                'score': composite_score,
-                'savings': savings,
-                'confidence': min(composite_score, 0.95),
-                'stockAvailable': stock_available,
-                'priceRank': 0,  # Will be set after sorting
-                'overallRank': 0  # Will be set after sorting
-            })
+        avg_price = sum(v['price'] for v in vendors) / len(vendors)
         
-        # Sort by score (highest first)
-        scored_vendors.sort(key=lambda x: x['score'], reverse=True)
+        # Skip vendors whose MOQ exceeds the order quantity
+        eligible = np.flatnonzero(quantity >= moqs)
+        if eligible.size == 0:
+            return []
+        prices = prices[eligible]
+        
+        # Multi-factor scoring system
+        # 1. Price Score (40%) - Lower is better
+        normalized_price_score = np.minimum((1 / (prices + 1)) / 0.1, 1.0)
+        # 2. Rating Score (25%)
+        rating_score = ratings[eligible] / 5.0
+        # 3. Delivery Reliability (20%)
+        delivery_score = on_time[eligible] / 100
+        # 4. Delivery Speed (15%) - Faster is better, 30 days = 0 score
+        speed_score = np.maximum(0, 1 - (delivery_times[eligible] / 30))
+        
+        scores = (
+            normalized_price_score * 0.40 +
+            rating_score * 0.25 +
+            delivery_score * 0.20 +
+            speed_score * 0.15
+        )
         
-        # Assign ranks
-        for idx, vendor in enumerate(scored_vendors):
-            vendor['overallRank'] = idx + 1
+        # Add bonus for domestic vendors (faster, less customs issues)
+        scores = scores + np.where(domestic[eligible], 0.05, 0.0)
         
-        # Sort by price to assign price ranks
-        price_sorted = sorted(scored_vendors, key=lambda x: x['price'])
-        for idx, vendor in enumerate(price_sorted):
-            vendor['priceRank'] = idx + 1
+        # Partial selection of the top N, then a stable sort of just those
+        # (ties keep input order, as the previous list sort did)
+        count = min(top_n, scores.size)
+        if count <= 0:
+            return []
+        if count < scores.size:
+            top = np.argpartition(-scores, count - 1)[:count]
+            # argpartition may split a tie at the boundary arbitrarily
+            cutoff = scores[top].min()
+            top = np.union1d(top, np.flatnonzero(scores == cutoff))
+        else:
+            top = np.arange(scores.size)
+        top = top[np.lexsort((top, -scores[top]))][:count]
         
-        # Return top N vendors
-        return scored_vendors[:top_n]
+        # Price rank among all eligible vendors; equal prices are broken by
+        # overall rank, which is lower for every winner than any non-winner
+        top_prices = prices[top]
+        cheaper = np.searchsorted(np.sort(prices), top_prices, side='left')
+        ties_ahead = np.array([
+            np.count_nonzero(top_prices[:idx] == price)
+            for idx, price in enumerate(top_prices)
+        ], dtype=int)
+        price_ranks = cheaper + ties_ahead + 1
+        
+        savings = (avg_price - top_prices) * quantity
+        
+        # Materialize dicts only for the winners
+        top_vendors = []
+        for idx, pos in enumerate(top):
+            score = float(scores[pos])
+            top_vendors.append({
+                **vendors[eligible[pos]],
+                'score': score,
+                'savings': float(savings[idx]),
+                'confidence': min(score, 0.95),
+                # Simulate stock availability (90% chance available)
+                'stockAvailable': random.random() < 0.9,
+                'priceRank': int(price_ranks[idx]),
+                'overallRank': idx + 1
+            })
+        
+        return top_vendors
     
     def _select_best_vendor(self, item, vendors, quantity):
         """Legacy method - now uses _select_top_vendors"""
@@ -262,36 +349,86 @@ class RecommendationEngine:
         return " • ".join(reasons)
     
     def _get_ai_insights(self, items, recommendations):
-        """Get AI-powered insights using Gemini"""
+        """
+        Get AI-powered insights using Gemini
+        
+        Recommendations are sent in bounded chunks that run concurrently;
+        a failed chunk falls back to the default insight for its items only.
+        """
+        chunk_size = max(1, self.insight_chunk_size)
+        chunks = [recommendations[i:i + chunk_size] for i in range(0, len(recommendations), chunk_size)]
+        
+        insights_by_item = {}
+        workers = max(1, min(self.insight_max_workers, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(in_context(self._get_chunk_insights), len(items), chunk): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                insights_by_item.update(self._chunk_results(futures[future], future))
+        
+        return [insights_by_item[r['itemId']] for r in recommendations]
+    
+    def _chunk_results(self, chunk, future):
+        """(itemId, insight) pairs for a finished chunk, with fallbacks for gaps"""
         try:
-            prompt = f"""
-            As an AI procurement advisor, analyze these purchase recommendations from both database vendors and online marketplaces.
-            
-            Items needing restock: {len(items)}
-            Recommendations: {json.dumps(recommendations, indent=2)}
-            
-            For each recommendation, provide ONE concise, actionable insight (max 150 characters) considering:
-            - Whether vendor is from database vs online marketplace (check 'isOnline' and 'vendorSource' fields)
-            - Price competitiveness and potential savings
-            - Delivery time and reliability
-            - Any risks (e.g., international shipping, new vendor, market volatility)
-            - Strategic purchasing advice
-            
-            Return ONLY a JSON array of brief insights (one per recommendation).
-            Example: ["Great deal from Alibaba but verify quality standards first", "Trusted vendor with fast delivery - safe choice"]
-            """
-            
+            insights = future.result()
+        except Exception as e:
+            print(f"Error getting AI insights for {len(chunk)} recommendations: {e}")
+            insights = []
+        
+        return [
+            (rec['itemId'], insights[idx] if idx < len(insights) else self._fallback_insight(rec))
+            for idx, rec in enumerate(chunk)
+        ]
+    
+    @timed('recommendation.ai_insights_chunk')
+    def _get_chunk_insights(self, item_count, recommendations):
+        """Ask Gemini for one insight per recommendation in a single chunk"""
+        prompt = f"""
+        As an AI procurement advisor, analyze these purchase recommendations from both database vendors and online marketplaces.
+        
+        Items needing restock: {item_count}
+        Recommendations: {json.dumps(recommendations)}
+        
+        For each recommendation, provide ONE concise, actionable insight (max 150 characters) considering:
+        - Whether vendor is from database vs online marketplace (check 'isOnline' and 'vendorSource' fields)
+        - Price competitiveness and potential savings
+        - Delivery time and reliability
+        - Any risks (e.g., international shipping, new vendor, market volatility)
+        - Strategic purchasing advice
+        
+        Return ONLY a JSON array of brief insights (one per recommendation, in the same order).
+        Example: ["Great deal from Alibaba but verify quality standards first", "Trusted vendor with fast delivery - safe choice"]
+        """
+        
+        insights = self._call_model(prompt)
+        if not isinstance(insights, list):
+            raise ValueError("Expected a JSON array of insights")
+        return insights
+    
+    @timed('recommendation.call_model')
+    def _call_model(self, prompt):
+        """Send a prompt to Gemini and parse the JSON in its reply (cached, deduplicated while in flight)"""
+        def generate():
             response = self.model.generate_content(prompt)
-            insights_text = response.text
+            response_text = response.text
             
             # Clean up the response to extract JSON
-            if '```json' in insights_text:
-                insights_text = insights_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in insights_text:
-                insights_text = insights_text.split('```')[1].split('```')[0].strip()
+            if '```json' in response_text:
+                response_text = response_text.split('```json')[1].split('```')[0].strip()
+            elif '```' in response_text:
+                response_text = response_text.split('```')[1].split('```')[0].strip()
             
-            insights = json.loads(insights_text)
-            return insights
-        except Exception as e:
-            print(f"Error getting AI insights: {e}")
-            return [f"AI-recommended purchase from {r['vendorName']}" for r in recommendations]
+            return json.loads(response_text)
+        
+        def generate_or_cached():
+            if self.llm_cache is None:
+                return generate()
+            return self.llm_cache.get_or_compute('recommendation', prompt, generate, self.cache_ttl)
+        
+        return self.flights.do(LLMResponseCache.make_key('recommendation', prompt), generate_or_cached)
+    
+    def _fallback_insight(self, recommendation):
+        return f"AI-recommended purchase from {recommendation['vendorName']}"
@@ -0,0 +1,302 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from services.file_lock import FileLock
+
+SEGMENT_DTYPE = np.dtype([('item', np.int32), ('day', np.int32), ('quantity', np.float64)])
+
+
+def _parse_records(records):
+    """
+    Item ids, day numbers and quantities for a batch of records.
+    Raises ValueError naming the first bad record.
+    """
+    item_ids = []
+    for idx, r in enumerate(records):
+        if not isinstance(r, dict) or r.get('itemId') is None:
+            raise ValueError(f'record {idx}: itemId is required')
+        item_ids.append(str(r['itemId']))
+
+    days = np.empty(len(records), dtype='datetime64[D]')
+    qty = np.empty(len(records), dtype=np.float64)
+    for idx, r in enumerate(records):
+        try:
+            days[idx] = np.datetime64(str(r.get('date'))[:10], 'D')
+        except ValueError:
+            raise ValueError(f"record {idx}: date must be YYYY-MM-DD or an ISO timestamp, got {r.get('date')!r}")
+        value = r.get('quantity')
+        try:
+            if isinstance(value, bool):
+                raise TypeError
+            qty[idx] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'record {idx}: quantity must be a number, got {value!r}')
+    if np.isnat(days).any():
+        raise ValueError(f'record {int(np.flatnonzero(np.isnat(days))[0])}: date is missing')
+    if not np.isfinite(qty).all():
+        raise ValueError(f'record {int(np.flatnonzero(~np.isfinite(qty))[0])}: quantity must be finite')
+    return item_ids, days.astype(np.int32), qty
+
+
+class SalesHistoryStore:
+    """
+    Append-only, per-item daily sales history on local disk.
+
+    Ingested records land in small immutable segment files. Compaction
+    merges them into a base generation laid out as columns sorted by
+    (item, day) with an offsets index, summing duplicate days and dropping
+    days outside the retention window. Base columns are memory-mapped, so
+    an item's window is a slice of the mapped file; only records that
+    arrived since the last compaction are read from segments.
+
+    Several processes may share one directory: ingest and compaction hold a
+    file lock, and readers reload the manifest when another process has
+    replaced it.
+
+    Series run up to the newest day recorded for any item, so an item that
+    stopped selling ends in zeros rather than at its last sale.
+    """
+
+    def __init__(self, root=None, retention_days=None, compact_segments=None):
+        if root is None:
+            root = os.getenv('SALES_HISTORY_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'sales_history'))
+        if retention_days is None:
+            retention_days = int(os.getenv('SALES_HISTORY_RETENTION_DAYS', 365))
+        if compact_segments is None:
+            compact_segments = int(os.getenv('SALES_HISTORY_COMPACT_SEGMENTS', 16))
+
+        self.root = root
+        self.retention_days = retention_days
+        self.compact_segments = compact_segments
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._file_lock = FileLock(self._path('.lock'))
+
+        self._manifest_id = None
+        with self._file_lock.shared():
+            self._reload()
+
+    # --- persistence ----------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _read_json(self, name, default):
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name, data):
+        tmp = self._path(name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self._path(name))
+
+    def _manifest_stat(self):
+        try:
+            stat = os.stat(self._path('manifest.json'))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _reload(self):
+        """Read the manifest and item ids from disk (caller holds the file lock)"""
+        self._manifest_id = self._manifest_stat()
+        self._manifest = self._read_json('manifest.json', {'generation': 0, 'segments': [], 'nextSegment': 0})
+        item_ids = self._read_json('items.json', [])
+        self._codes = {item_id: code for code, item_id in enumerate(item_ids)}
+        self._item_ids = item_ids
+        self._load()
+
+    def _refresh(self):
+        """Pick up a manifest written by another process"""
+        if self._manifest_stat() == self._manifest_id:
+            return
+        with self._lock, self._file_lock.shared():
+            if self._manifest_stat() != self._manifest_id:
+                self._reload()
+
+    def _load(self):
+        """Map the current base generation and read pending segments"""
+        generation = self._manifest['generation']
+        if generation:
+            prefix = self._path(f'base-{generation:06d}')
+            days = np.load(prefix + '-days.npy', mmap_mode='r')
+            qty = np.load(prefix + '-qty.npy', mmap_mode='r')
+            offsets = np.load(prefix + '-offsets.npy', mmap_mode='r')
+        else:
+            days = np.zeros(0, dtype=np.int32)
+            qty = np.zeros(0, dtype=np.float64)
+            offsets = np.zeros(1, dtype=np.int64)
+        segments = tuple(np.load(self._path(name), mmap_mode='r') for name in self._manifest['segments'])
+        # Newest day recorded for any item; every series runs up to it
+        newest = [int(days.max())] if days.size else []
+        newest += [int(s['day'].max()) for s in segments if s.size]
+        # Readers take this tuple once, so they never mix generations
+        self._view = (days, qty, offsets, segments, max(newest, default=None))
+
+    # --- ingest / compaction -------------------------------------------
+
+    def ingest(self, records):
+        """
+        Append records ({itemId, date, quantity}; date as YYYY-MM-DD or an
+        ISO timestamp) as a new segment. Returns the number stored. Raises
+        ValueError, storing nothing, if any record is invalid.
+        """
+        if not records:
+            return 0
+        item_ids, record_days, quantities = _parse_records(records)
+
+        with self._lock, self._file_lock.exclusive():
+            if self._manifest_stat() != self._manifest_id:
+                self._reload()
+            new_items = False
+            codes = []
+            for item_id in item_ids:
+                code = self._codes.get(item_id)
+                if code is None:
+                    code = self._codes[item_id] = len(self._item_ids)
+                    self._item_ids.append(item_id)
+                    new_items = True
+                codes.append(code)
+
+            segment = np.empty(len(records), dtype=SEGMENT_DTYPE)
+            segment['item'] = codes
+            segment['day'] = record_days
+            segment['quantity'] = quantities
+
+            if new_items:
+                self._write_json('items.json', self._item_ids)
+
+            name = f"segment-{self._manifest['nextSegment']:06d}.npy"
+            np.save(self._path(name), segment)
+            self._manifest['segments'].append(name)
+            self._manifest['nextSegment'] += 1
+            self._write_json('manifest.json', self._manifest)
+            self._manifest_id = self._manifest_stat()
+            days, qty, offsets, segments, last_day = self._view
+            newest = int(record_days.max())
+            self._view = (days, qty, offsets, segments + (np.load(self._path(name), mmap_mode='r'),),
+                          newest if last_day is None else max(last_day, newest))
+
+            if len(self._view[3]) >= self.compact_segments:
+                self._compact()
+
+        return len(records)
+
+    def compact(self):
+        with self._lock, self._file_lock.exclusive():
+            if self._manifest_stat() != self._manifest_id:
+                self._reload()
+            self._compact()
+
+    def _compact(self):
+        item_count = len(self._item_ids)
+        base_days, base_qty, base_offsets, segments, _ = self._view
+        base_items = np.repeat(
+            np.arange(len(base_offsets) - 1, dtype=np.int32),
+            np.diff(base_offsets)
+        )
+        items = np.concatenate([base_items] + [s['item'] for s in segments])
+        days = np.concatenate([np.asarray(base_days)] + [s['day'] for s in segments])
+        qty = np.concatenate([np.asarray(base_qty)] + [s['quantity'] for s in segments])
+
+        # Retention relative to the newest day in the store
+        if days.size and self.retention_days > 0:
+            keep = days > days.max() - self.retention_days
+            items, days, qty = items[keep], days[keep], qty[keep]
+
+        # Sort by (item, day) and sum duplicate days
+        order = np.lexsort((days, items))
+        items, days, qty = items[order], days[order], qty[order]
+        if items.size:
+            boundary = np.ones(items.size, dtype=bool)
+            boundary[1:] = (items[1:] != items[:-1]) | (days[1:] != days[:-1])
+            starts = np.flatnonzero(boundary)
+            qty = np.add.reduceat(qty, starts)
+            items, days = items[starts], days[starts]
+
+        offsets = np.zeros(item_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(items, minlength=item_count), out=offsets[1:])
+
+        generation = self._manifest['generation'] + 1
+        prefix = self._path(f'base-{generation:06d}')
+        np.save(prefix + '-days.npy', days.astype(np.int32))
+        np.save(prefix + '-qty.npy', qty.astype(np.float64))
+        np.save(prefix + '-offsets.npy', offsets)
+
+        old_generation = self._manifest['generation']
+        old_segments = self._manifest['segments']
+        self._manifest['generation'] = generation
+        self._manifest['segments'] = []
+        self._write_json('manifest.json', self._manifest)
+        self._manifest_id = self._manifest_stat()
+        self._load()
+
+        # Open maps of the old files stay valid until released
+        for name in old_segments:
+            os.remove(self._path(name))
+        if old_generation:
+            for suffix in ('-days.npy', '-qty.npy', '-offsets.npy'):
+                os.remove(self._path(f'base-{old_generation:06d}{suffix}'))
+
+    # --- reads ----------------------------------------------------------
+
+    def __contains__(self, item_id):
+        self._refresh()
+        return str(item_id) in self._codes
+
+    def series(self, item_id, window=None):
+        """
+        Daily quantities for an item, oldest first, up to the store's newest
+        day, with missing days as 0. Returns a read-only view of the mapped
+        base file when the item has no pending records, no gaps and sales on
+        the newest day; otherwise a dense copy.
+        """
+        self._refresh()
+        code = self._codes.get(str(item_id))
+        if code is None:
+            return np.zeros(0)
+
+        base_days, base_qty, offsets, segments, last_day = self._view
+        if code + 1 < len(offsets):
+            lo, hi = int(offsets[code]), int(offsets[code + 1])
+        else:
+            lo = hi = 0
+        days = base_days[lo:hi]
+        qty = base_qty[lo:hi]
+
+        pending = [s[s['item'] == code] for s in segments]
+        pending = [p for p in pending if p.size]
+
+        if not pending:
+            if days.size and days[-1] - days[0] + 1 == days.size and days[-1] == last_day:
+                # Contiguous daily history up to the newest day: zero-copy slice
+                return qty[-window:] if window else qty
+            if not days.size:
+                return np.zeros(0)
+
+        all_days = np.concatenate([np.asarray(days)] + [p['day'] for p in pending])
+        all_qty = np.concatenate([np.asarray(qty)] + [p['quantity'] for p in pending])
+        first = int(all_days.min())
+        dense = np.zeros(last_day - first + 1)
+        np.add.at(dense, all_days - first, all_qty)
+        return dense[-window:] if window else dense
+
+    def stats(self):
+        self._refresh()
+        base_days, _, _, segments, _ = self._view
+        return {
+            'items': len(self._item_ids),
+            'baseRecords': int(base_days.size),
+            'pendingSegments': len(segments),
+            'pendingRecords': int(sum(s.size for s in segments)),
+            'generation': self._manifest['generation'],
+            'retentionDays': self.retention_days,
+            'compactAfterSegments': self.compact_segments
+        }
@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_product_name(product_name):
+    return ' '.join(product_name.lower().split())
+
+
+def quantity_bucket(quantity):
+    """Group quantities by order of magnitude (1-9, 10-99, ...)"""
+    try:
+        quantity = float(quantity)
+    except (TypeError, ValueError):
+        return 0
+    if quantity < 1:
+        return 0
+    return int(math.log10(quantity)) + 1
+
+
+class SearchResultCache:
+    """
+    LRU cache with stale-while-revalidate semantics for vendor searches.
+
+    An entry is fresh for `ttl` seconds. After that it may still be served
+    as stale until `stale_ttl` seconds have passed, while the caller refreshes
+    it in the background; past that it is treated as a miss.
+    """
+
+    def __init__(self, ttl=900, stale_ttl=3600, max_entries=1000):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> {'value', 'storedAt', 'ttl'}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def make_key(product_name, quantity):
+        return (normalize_product_name(product_name), quantity_bucket(quantity))
+
+    def get(self, key):
+        """Return (value, is_stale), or (None, False) on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            age = now - entry['storedAt']
+            if age >= self.stale_ttl or (age >= entry['ttl'] and entry['ttl'] < self.ttl):
+                # Too old to serve (short-lived entries are never served stale)
+                del self._entries[key]
+                self.misses += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            if age < entry['ttl']:
+                self.hits += 1
+                return entry['value'], False
+            self.stale_hits += 1
+            return entry['value'], True
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = {
+                'value': value,
+                'storedAt': time.time(),
+                'ttl': self.ttl if ttl is None else ttl
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def start_refresh(self, key):
+        """Claim the background refresh for a key; False if one is running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def finish_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def purge(self, product_name=None):
+        """Drop every entry, or only those for one product name"""
+        with self._lock:
+            if product_name is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            name = normalize_product_name(product_name)
+            keys = [k for k in self._entries if k[0] == name]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def entries(self):
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    'productName': key[0],
+                    'quantityBucket': key[1],
+                    'ageSeconds': round(now - entry['storedAt'], 1),
+                    'stale': now - entry['storedAt'] >= entry['ttl'],
+                    'vendorCount': len(entry['value']),
+                    'refreshing': key in self._refreshing
+                }
+                for key, entry in self._entries.items()
+            ]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'maxEntries': self.max_entries,
+                'hits': self.hits,
+                'staleHits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'refreshes': self.refreshes,
+                'hitRatio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0
+            }
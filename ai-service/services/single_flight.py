@@ -0,0 +1,66 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one computation.
+
+    The first caller for a key (the leader) runs the function; callers
+    arriving while it runs wait and get the same result, or the same
+    exception. Nothing is kept once the call finishes, so this only
+    deduplicates work that is in flight at the same time; caching is left
+    to the caller.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.collapsed = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn(*args, **kwargs)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            calls = self.leaders + self.collapsed
+            return {
+                'name': self.name,
+                'inFlight': len(self._calls),
+                'leaders': self.leaders,
+                'collapsed': self.collapsed,
+                'collapseRatio': round(self.collapsed / calls, 4) if calls else 0
+            }
@@ -1,29 +1,48 @@
 import os
-import google.generativeai as genai
 import json
 from datetime import datetime
+import numpy as np
+from services.gemini import LazyClient
+from services.llm_cache import LLMResponseCache
+from services.metrics import timed
+from services.single_flight import SingleFlight
 
 class VendorAnalyzer:
-    def __init__(self):
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        else:
-            self.model = None
+    # Shared, rate-limited Gemini client, created on first use (None without GEMINI_API_KEY)
+    model = LazyClient()
+    
+    def __init__(self, llm_cache=None, vendor_metrics=None):
+        # Shared prompt cache (see services.llm_cache); TTL in seconds
+        self.llm_cache = llm_cache
+        self.cache_ttl = int(os.getenv('VENDOR_AI_CACHE_TTL', 3600))
+        # Identical prompts already in flight share one Gemini call
+        self.flights = SingleFlight('vendor')
+        # Rolling order aggregates (see services.vendor_metrics), used when no orders are sent
+        self.vendor_metrics = vendor_metrics
     
-    def analyze_vendor(self, vendor, orders):
+    def analyze_vendor(self, vendor, orders=None):
         """
-        Comprehensive vendor performance analysis
+        Comprehensive vendor performance analysis.
+        With orders=None, metrics come from the rolling vendor_metrics store.
         """
+        if orders is None:
+            orders = []
+            if self.vendor_metrics is not None:
+                metrics = self.vendor_metrics.metrics(vendor)
+            else:
+                metrics = self._calculate_performance_metrics(vendor, orders)
+        else:
+            metrics = self._calculate_performance_metrics(vendor, orders)
+        order_count = metrics['totalOrders']
+        
         analysis = {
             'vendorId': vendor['id'],
             'vendorName': vendor['name'],
-            'performanceMetrics': self._calculate_performance_metrics(vendor, orders),
-            'strengths': self._identify_strengths(vendor, orders),
-            'weaknesses': self._identify_weaknesses(vendor, orders),
+            'performanceMetrics': metrics,
+            'strengths': self._identify_strengths(vendor, order_count),
+            'weaknesses': self._identify_weaknesses(vendor),
             'recommendations': [],
-            'score': self._calculate_vendor_score(vendor, orders)
+            'score': self._calculate_vendor_score(vendor, order_count)
         }
         
         # Get AI-powered insights
@@ -34,12 +53,112 @@ class VendorAnalyzer:
                 analysis['recommendations'] = ai_insights.get('recommendations', [])
             except Exception as e:
                 print(f"AI insights failed: {e}")
-                analysis['recommendations'] = self._get_rule_based_recommendations(vendor, orders)
+                analysis['recommendations'] = self._get_rule_based_recommendations(vendor, order_count)
         else:
-            analysis['recommendations'] = self._get_rule_based_recommendations(vendor, orders)
+            analysis['recommendations'] = self._get_rule_based_recommendations(vendor, order_count)
         
         return analysis
     
+    def analyze_vendors(self, vendors, orders=None):
+        """
+        Rule-based analysis for many vendors at once.
+        orders is one flat table; each order carries a vendorId.
+        With orders=None, metrics come from the rolling vendor_metrics store.
+        """
+        if orders is None and self.vendor_metrics is not None:
+            metrics = [self.vendor_metrics.metrics(vendor) for vendor in vendors]
+        else:
+            metrics = self._batch_performance_metrics(vendors, orders or [])
+        order_counts = [m['totalOrders'] for m in metrics]
+        scores = self._batch_vendor_scores(vendors, order_counts)
+        
+        return [
+            {
+                'vendorId': vendor['id'],
+                'vendorName': vendor['name'],
+                'performanceMetrics': vendor_metrics,
+                'strengths': self._identify_strengths(vendor, order_count),
+                'weaknesses': self._identify_weaknesses(vendor),
+                'recommendations': self._get_rule_based_recommendations(vendor, order_count),
+                'score': score
+            }
+            for vendor, vendor_metrics, order_count, score in zip(vendors, metrics, order_counts, scores)
+        ]
+    
+    @timed('vendor.batch_performance_metrics')
+    def _batch_performance_metrics(self, vendors, orders):
+        """
+        _calculate_performance_metrics for every vendor in one pass:
+        delivery timestamps are parsed in bulk and orders are grouped by vendor
+        """
+        grouped = None
+        if orders:
+            import pandas as pd  # only needed here; kept off the import path
+            
+            table = pd.DataFrame({
+                'vendorId': [str(o.get('vendorId')) for o in orders],
+                'total': [o['total'] for o in orders],
+                'completed': [o['status'] == 'received' for o in orders]
+            })
+            expected = pd.to_datetime([o.get('expectedDelivery') for o in orders], utc=True, errors='coerce', format='ISO8601')
+            actual = pd.to_datetime([o.get('actualDelivery') for o in orders], utc=True, errors='coerce', format='ISO8601')
+            # NaT compares False, so orders missing either date never count as on time
+            table['onTime'] = table['completed'].to_numpy() & np.asarray(actual <= expected)
+            
+            grouped = table.groupby('vendorId', sort=False).agg(
+                totalOrders=('total', 'size'),
+                orderValue=('total', 'sum'),
+                completedOrders=('completed', 'sum'),
+                onTime=('onTime', 'sum')
+            )
+        
+        metrics = []
+        for vendor in vendors:
+            vendor_id = str(vendor['id'])
+            if grouped is None or vendor_id not in grouped.index:
+                metrics.append({
+                    'totalOrders': 0,
+                    'onTimeDeliveryRate': vendor.get('performance', {}).get('onTimeDelivery', 0),
+                    'averageOrderValue': 0,
+                    'deliveryAccuracy': 0
+                })
+                continue
+            
+            row = grouped.loc[vendor_id]
+            total_orders = int(row['totalOrders'])
+            completed = int(row['completedOrders'])
+            on_time_rate = (int(row['onTime']) / completed * 100) if completed else 0
+            
+            metrics.append({
+                'totalOrders': total_orders,
+                'completedOrders': completed,
+                'onTimeDeliveryRate': round(on_time_rate, 2),
+                'averageOrderValue': round(float(row['orderValue']) / total_orders, 2),
+                'rating': vendor.get('rating', 0),
+                'responseTime': vendor.get('performance', {}).get('responseTime', 0)
+            })
+        
+        return metrics
+    
+    def _batch_vendor_scores(self, vendors, order_counts):
+        """_calculate_vendor_score for every vendor as array arithmetic"""
+        if not vendors:
+            return []
+        
+        rating = np.array([v.get('rating', 0) for v in vendors], dtype=float)
+        on_time = np.array([v.get('performance', {}).get('onTimeDelivery', 0) for v in vendors], dtype=float)
+        response_time = np.array([v.get('performance', {}).get('responseTime', 24) for v in vendors], dtype=float)
+        counts = np.array(order_counts, dtype=float)
+        
+        score = np.zeros(len(vendors))
+        score += (rating / 5) * 30
+        score += (on_time / 100) * 30
+        score += np.minimum(counts / 20, 1) * 20
+        score += np.maximum(0, (48 - response_time) / 48) * 20
+        
+        return [round(s, 2) for s in score.tolist()]
+    
+    @timed('vendor.performance_metrics')
     def _calculate_performance_metrics(self, vendor, orders):
         """Calculate key performance metrics"""
         if not orders:
@@ -76,7 +195,7 @@ class VendorAnalyzer:
             'responseTime': vendor.get('performance', {}).get('responseTime', 0)
         }
     
-    def _identify_strengths(self, vendor, orders):
+    def _identify_strengths(self, vendor, order_count):
         """Identify vendor strengths"""
         strengths = []
         
@@ -94,16 +213,16 @@ class VendorAnalyzer:
                 'impact': 'high'
             })
         
-        if len(orders) > 10:
+        if order_count > 10:
             strengths.append({
                 'category': 'Relationship',
-                'description': f'Established relationship with {len(orders)} orders',
+                'description': f'Established relationship with {order_count} orders',
                 'impact': 'medium'
             })
         
         return strengths
     
-    def _identify_weaknesses(self, vendor, orders):
+    def _identify_weaknesses(self, vendor):
         """Identify areas for improvement"""
         weaknesses = []
         
@@ -130,7 +249,7 @@ class VendorAnalyzer:
         
         return weaknesses
     
-    def _calculate_vendor_score(self, vendor, orders):
+    def _calculate_vendor_score(self, vendor, order_count):
         """Calculate overall vendor score (0-100)"""
         score = 0
         
@@ -141,7 +260,7 @@ class VendorAnalyzer:
         score += (vendor.get('performance', {}).get('onTimeDelivery', 0) / 100) * 30
         
         # Order history (20%)
-        order_score = min(len(orders) / 20, 1) * 20  # Max score at 20+ orders
+        order_score = min(order_count / 20, 1) * 20  # Max score at 20+ orders
         score += order_score
         
         # Response time (20%)
@@ -175,19 +294,31 @@ class VendorAnalyzer:
         Return ONLY the JSON object, no additional text.
         """
         
-        response = self.model.generate_content(prompt)
-        insights_text = response.text
+        return self._call_model(prompt)
+    
+    @timed('vendor.call_model')
+    def _call_model(self, prompt):
+        """Send a prompt to Gemini and parse the JSON in its reply (cached, deduplicated while in flight)"""
+        def generate():
+            response = self.model.generate_content(prompt)
+            response_text = response.text
+            
+            # Clean up the response to extract JSON
+            if '```json' in response_text:
+                response_text = response_text.split('```json')[1].split('```')[0].strip()
+            elif '```' in response_text:
+                response_text = response_text.split('```')[1].split('```')[0].strip()
+            
+            return json.loads(response_text)
         
-        # Clean up the response to extract JSON
-        if '```json' in insights_text:
-            insights_text = insights_text.split('```json')[1].split('```')[0].strip()
-        elif '```' in insights_text:
-            insights_text = insights_text.split('```')[1].split('```')[0].strip()
+        def generate_or_cached():
+            if self.llm_cache is None:
+                return generate()
+            return self.llm_cache.get_or_compute('vendor', prompt, generate, self.cache_ttl)
         
-        insights = json.loads(insights_text)
-        return insights
+        return self.flights.do(LLMResponseCache.make_key('vendor', prompt), generate_or_cached)
     
-    def _get_rule_based_recommendations(self, vendor, orders):
+    def _get_rule_based_recommendations(self, vendor, order_count):
         """Fallback rule-based recommendations"""
         recommendations = []
         
@@ -197,7 +328,7 @@ class VendorAnalyzer:
         if vendor.get('performance', {}).get('onTimeDelivery', 100) < 80:
             recommendations.append("Discuss delivery improvements or add buffer time to orders")
         
-        if len(orders) > 0:
+        if order_count > 0:
             recommendations.append("Continue monitoring performance and adjust order frequency")
         else:
             recommendations.append("Start with small trial orders to assess reliability")
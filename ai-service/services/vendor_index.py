@@ -0,0 +1,139 @@
+import time
+
+
+class VendorProductIndex:
+    """
+    Inverted index over vendor product names.
+
+    Answers the same question as the old nested scan in
+    RecommendationEngine._find_matching_vendors (is the product name a
+    substring of the item name, or the item name a substring of the product
+    name?) without touching every vendor x product pair for every item.
+    Build it once per vendor list and reuse it for every item.
+    """
+
+    GRAM = 3
+
+    def __init__(self, vendors):
+        start = time.perf_counter()
+
+        self.vendors = vendors
+        # Postings are (vendor_idx, product_idx) pairs
+        self._names = {}          # normalized product name -> [posting]
+        self._lengths = set()     # distinct product name lengths
+        self._short_names = set() # names shorter than GRAM (they have no trigrams)
+        self._grams = {}          # trigram -> [name]
+        self.product_count = 0
+
+        for v_idx, vendor in enumerate(vendors):
+            for p_idx, product in enumerate(vendor.get('products', [])):
+                name = product['itemName'].lower()
+                self.product_count += 1
+
+                postings = self._names.get(name)
+                if postings is not None:
+                    postings.append((v_idx, p_idx))
+                    continue
+                self._names[name] = [(v_idx, p_idx)]
+                self._lengths.add(len(name))
+                if len(name) < self.GRAM:
+                    self._short_names.add(name)
+
+                for gram in self._trigrams(name):
+                    names = self._grams.get(gram)
+                    if names is None:
+                        self._grams[gram] = [name]
+                    else:
+                        names.append(name)
+
+        # Longest first, so lengths beyond the item name are skipped cheaply
+        self._lengths = sorted(self._lengths, reverse=True)
+        self.build_time_ms = (time.perf_counter() - start) * 1000
+        self.queries = 0
+        self.candidates_checked = 0
+        self.hits = 0
+
+    def _trigrams(self, text):
+        return {text[i:i + self.GRAM] for i in range(len(text) - self.GRAM + 1)}
+
+    def _names_within(self, item_name):
+        """
+        Product names that are substrings of the item name: every substring
+        of the item whose length is some product name's length is looked up
+        in the name table, so the cost depends on the item name's length,
+        not on how many product names share its words.
+        """
+        found = set()
+        size = len(item_name)
+        for length in self._lengths:
+            if length > size:
+                continue
+            if length == 0:
+                found.add('')
+                continue
+            for i in range(size - length + 1):
+                sub = item_name[i:i + length]
+                self.candidates_checked += 1
+                if sub in self._names:
+                    found.add(sub)
+        return found
+
+    def _names_containing(self, item_name, item_grams):
+        """Product names that contain the item name"""
+        if len(item_name) < self.GRAM:
+            # Every name under a trigram that contains the item name matches;
+            # only names too short to have trigrams need checking
+            found = {name for name in self._short_names if item_name in name}
+            self.candidates_checked += len(self._short_names)
+            for gram, names in self._grams.items():
+                if item_name in gram:
+                    found.update(names)
+            return found
+
+        # A containing name has every trigram of the item; check the rarest one's names
+        candidates = min((self._grams.get(g, ()) for g in item_grams), key=len)
+
+        found = set()
+        for name in candidates:
+            self.candidates_checked += 1
+            if item_name in name:
+                found.add(name)
+        return found
+
+    def lookup(self, item_name):
+        """
+        Return (vendor, product) pairs matching the item name, one per vendor
+        (the vendor's first matching product), in vendor order.
+        """
+        self.queries += 1
+        item_name = item_name.lower()
+        item_grams = self._trigrams(item_name)
+
+        names = self._names_within(item_name)
+        names |= self._names_containing(item_name, item_grams)
+
+        first_product = {}
+        for name in names:
+            for v_idx, p_idx in self._names[name]:
+                if p_idx < first_product.get(v_idx, p_idx + 1):
+                    first_product[v_idx] = p_idx
+
+        matches = []
+        for v_idx in sorted(first_product):
+            vendor = self.vendors[v_idx]
+            matches.append((vendor, vendor['products'][first_product[v_idx]]))
+
+        self.hits += len(matches)
+        return matches
+
+    def stats(self):
+        """Build time and lookup counters"""
+        return {
+            'vendors': len(self.vendors),
+            'products': self.product_count,
+            'distinctNames': len(self._names),
+            'buildTimeMs': round(self.build_time_ms, 3),
+            'queries': self.queries,
+            'candidatesChecked': self.candidates_checked,
+            'hits': self.hits
+        }
@@ -0,0 +1,336 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime, timezone
+
+from services.file_lock import FileLock
+
+EVENT_TYPES = ('placed', 'received')
+
+
+def _parse_time(value):
+    """ISO timestamp as an aware UTC datetime (naive ones are taken as UTC); None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _utc_field(event, field):
+    """Optional ISO timestamp field, normalized to UTC; raises ValueError if present but invalid"""
+    value = event.get(field)
+    if value is None:
+        return None
+    parsed = _parse_time(value)
+    if parsed is None:
+        raise ValueError(f'{field} must be an ISO timestamp, got {value!r}')
+    return parsed.isoformat()
+
+
+def _number(event, field):
+    value = event.get(field)
+    if isinstance(value, bool):
+        value = None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a number, got {value!r}')
+    if not math.isfinite(number):
+        raise ValueError(f'{field} must be finite, got {value!r}')
+    return number
+
+
+def validate_event(event):
+    """Check one order event and return it normalized; raises ValueError if invalid"""
+    if not isinstance(event, dict):
+        raise ValueError('event must be an object')
+    if event.get('vendorId') is None:
+        raise ValueError('vendorId is required')
+    kind = event.get('type')
+    if kind not in EVENT_TYPES:
+        raise ValueError(f"type must be one of {', '.join(EVENT_TYPES)}, got {kind!r}")
+
+    normalized = dict(event)
+    if kind == 'placed':
+        normalized['total'] = _number(event, 'total')
+    else:
+        normalized['expectedDelivery'] = _utc_field(event, 'expectedDelivery')
+        normalized['actualDelivery'] = _utc_field(event, 'actualDelivery')
+    if event.get('responseTime') is not None:
+        normalized['responseTime'] = _number(event, 'responseTime')
+    # When the event happened; replays use this instead of the replay time
+    normalized['timestamp'] = _utc_field(event, 'timestamp') or datetime.now(timezone.utc).isoformat()
+    return normalized
+
+
+class VendorMetricsStore:
+    """
+    Rolling per-vendor order aggregates fed by order events.
+
+    Events are appended to a JSON-lines log and folded into per-vendor
+    counters (orders, order value, completed and on-time deliveries, a
+    response-time EWMA), so reading a vendor's metrics is O(1) however many
+    orders it has. The counters are snapshotted to disk every
+    `snapshot_every` events together with the log offset they cover; on
+    start-up the snapshot is loaded and only the log tail is replayed.
+    rebuild() recomputes everything from the full log, or from a supplied
+    order list.
+
+    Several processes may share one directory: writes hold a file lock, and
+    each reader catches up on the log tail (or replays a replaced log)
+    before answering.
+
+    Event types:
+      placed   {vendorId, total}
+      received {vendorId, expectedDelivery, actualDelivery}
+    Any event may carry responseTime (hours) to update the EWMA and an ISO
+    timestamp (defaults to ingest time). Times are stored in UTC; naive
+    ones are taken as UTC.
+    """
+
+    def __init__(self, root=None, ewma_alpha=None, snapshot_every=None):
+        if root is None:
+            root = os.getenv('VENDOR_METRICS_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'vendor_metrics'))
+        if ewma_alpha is None:
+            ewma_alpha = float(os.getenv('VENDOR_METRICS_EWMA_ALPHA', 0.2))
+        if snapshot_every is None:
+            snapshot_every = int(os.getenv('VENDOR_METRICS_SNAPSHOT_EVERY', 500))
+
+        self.root = root
+        self.ewma_alpha = ewma_alpha
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(root, '.lock'))
+
+        self.log_path = os.path.join(root, 'events.jsonl')
+        self.snapshot_path = os.path.join(root, 'snapshot.json')
+        self._vendors = {}
+        self._offset = 0              # log bytes folded into _vendors
+        self._log_id = None           # inode of the log _offset refers to
+        self._since_snapshot = 0
+        self.replay_errors = 0
+        self._load()
+
+    # --- persistence ----------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self._vendors = snapshot['vendors']
+            self._offset = snapshot['offset']
+            self._log_id = snapshot['logId']
+        except (FileNotFoundError, ValueError, KeyError):
+            self._vendors = {}
+            self._offset = 0
+        self._sync()
+
+    def _sync(self):
+        """Catch up with events other processes appended, or replay a replaced log"""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._log_id:
+            self._vendors = {}
+            self._replay(0)
+        elif stat.st_size > self._offset:
+            self._replay(self._offset)
+
+    def _replay(self, offset):
+        """Fold log events after `offset` into the counters"""
+        try:
+            with open(self.log_path, 'rb') as f:
+                self._log_id = os.fstat(f.fileno()).st_ino
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Still being written; picked up on the next sync
+                        break
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError) as e:
+                        # Only a torn or hand-edited line gets here: ingest validates events
+                        self.replay_errors += 1
+                        print(f"Vendor metrics: skipping bad event at byte {offset} of {self.log_path}: {e}")
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        self._offset = offset
+
+    def _write_snapshot(self):
+        tmp = f'{self.snapshot_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'offset': self._offset, 'logId': self._log_id, 'vendors': self._vendors}, f)
+        os.replace(tmp, self.snapshot_path)
+        self._since_snapshot = 0
+
+    # --- updates ----------------------------------------------------------
+
+    def _apply(self, event):
+        # Read and convert every field first so a bad event changes nothing
+        vendor_id = str(event['vendorId'])
+        kind = event.get('type')
+        total = float(event['total']) if kind == 'placed' else 0
+        on_time = False
+        if kind == 'received':
+            actual = _parse_time(event.get('actualDelivery'))
+            expected = _parse_time(event.get('expectedDelivery'))
+            on_time = bool(actual and expected and actual <= expected)
+        response_time = event.get('responseTime')
+        if response_time is not None:
+            response_time = float(response_time)
+        happened = _parse_time(event.get('timestamp'))
+
+        state = self._vendors.get(vendor_id)
+        if state is None:
+            state = self._vendors[vendor_id] = {
+                'totalOrders': 0,
+                'orderValue': 0,
+                'completedOrders': 0,
+                'onTimeOrders': 0,
+                'responseTime': None,
+                'updatedAt': None
+            }
+
+        if kind == 'placed':
+            state['totalOrders'] += 1
+            state['orderValue'] += total
+        elif kind == 'received':
+            state['completedOrders'] += 1
+            if on_time:
+                state['onTimeOrders'] += 1
+
+        if response_time is not None:
+            previous = state['responseTime']
+            state['responseTime'] = response_time if previous is None else (
+                self.ewma_alpha * response_time + (1 - self.ewma_alpha) * previous
+            )
+        if happened is not None:
+            state['updatedAt'] = max(state['updatedAt'] or 0, happened.timestamp())
+
+    def ingest(self, events):
+        """
+        Append events to the log and fold them in; returns the number
+        applied. Raises ValueError, storing nothing, if any event is invalid.
+        """
+        events = [validate_event(e) for e in events]
+        if not events:
+            return 0
+
+        lines = b''.join(json.dumps(e, separators=(',', ':')).encode('utf-8') + b'\n' for e in events)
+        with self._lock, self._file_lock.exclusive():
+            self._sync()
+            with open(self.log_path, 'ab') as f:
+                if f.tell() > self._offset:
+                    # Terminate a torn line left by a crashed writer
+                    lines = b'\n' + lines
+                f.write(lines)
+            self._replay(self._offset)
+            self._since_snapshot += len(events)
+            if self._since_snapshot >= self.snapshot_every:
+                self._write_snapshot()
+        return len(events)
+
+    def rebuild(self, orders=None):
+        """
+        Recompute all counters. With no orders, replays the full event log;
+        with an order list ({vendorId, total, status, createdAt,
+        expectedDelivery, actualDelivery}), replaces the log with events derived from it;
+        raises ValueError, leaving the log as it was, if an order is invalid.
+        """
+        with self._lock, self._file_lock.exclusive():
+            if orders is not None:
+                events = []
+                for order in orders:
+                    if order.get('vendorId') is None:
+                        continue
+                    events.append(validate_event({
+                        'type': 'placed',
+                        'vendorId': order['vendorId'],
+                        'total': order.get('total'),
+                        'timestamp': order.get('createdAt')
+                    }))
+                    if order.get('status') == 'received':
+                        events.append(validate_event({
+                            'type': 'received',
+                            'vendorId': order['vendorId'],
+                            'expectedDelivery': order.get('expectedDelivery'),
+                            'actualDelivery': order.get('actualDelivery'),
+                            'timestamp': order.get('actualDelivery')
+                        }))
+                tmp = f'{self.log_path}.{os.getpid()}.tmp'
+                with open(tmp, 'wb') as f:
+                    for event in events:
+                        f.write(json.dumps(event, separators=(',', ':')).encode('utf-8') + b'\n')
+                os.replace(tmp, self.log_path)
+
+            self._vendors = {}
+            self._replay(0)
+            self._write_snapshot()
+            return len(self._vendors)
+
+    # --- reads ----------------------------------------------------------
+
+    def _refresh(self):
+        with self._lock:
+            self._sync()
+
+    def __contains__(self, vendor_id):
+        self._refresh()
+        return str(vendor_id) in self._vendors
+
+    def metrics(self, vendor):
+        """
+        Performance metrics for a vendor dict, in the shape of
+        VendorAnalyzer._calculate_performance_metrics
+        """
+        self._refresh()
+        state = self._vendors.get(str(vendor['id']))
+        if state is None or not state['totalOrders']:
+            return {
+                'totalOrders': 0,
+                'onTimeDeliveryRate': vendor.get('performance', {}).get('onTimeDelivery', 0),
+                'averageOrderValue': 0,
+                'deliveryAccuracy': 0
+            }
+
+        completed = state['completedOrders']
+        on_time_rate = (state['onTimeOrders'] / completed * 100) if completed else 0
+        response_time = state['responseTime']
+        if response_time is None:
+            response_time = vendor.get('performance', {}).get('responseTime', 0)
+        else:
+            response_time = round(response_time, 2)
+
+        return {
+            'totalOrders': state['totalOrders'],
+            'completedOrders': completed,
+            'onTimeDeliveryRate': round(on_time_rate, 2),
+            'averageOrderValue': round(state['orderValue'] / state['totalOrders'], 2),
+            'rating': vendor.get('rating', 0),
+            'responseTime': response_time
+        }
+
+    def vendor_state(self, vendor_id):
+        self._refresh()
+        state = self._vendors.get(str(vendor_id))
+        return dict(state) if state is not None else None
+
+    def stats(self):
+        self._refresh()
+        return {
+            'vendors': len(self._vendors),
+            'logBytes': self._offset,
+            'eventsSinceSnapshot': self._since_snapshot,
+            'replayErrors': self.replay_errors,
+            'ewmaAlpha': self.ewma_alpha,
+            'snapshotEvery': self.snapshot_every
+        }
@@ -1,131 +1,165 @@
-import requests
-from bs4 import BeautifulSoup
-from fake_useragent import UserAgent
-import json
-import re
+import os
 import time
 import random
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from services.circuit_breaker import PROBE
+from services.marketplace_sources import GoogleShoppingSource
+from services.search_cache import SearchResultCache
+from services.single_flight import SingleFlight
+from services.user_agents import random_user_agent
+from services.metrics import in_context, timed
 
 class VendorScraper:
-    def __init__(self):
-        self.ua = UserAgent()
-        self.session = requests.Session()
+    def __init__(self, sources=None, deadline=None):
+        # Marketplace adapters, searched concurrently
+        self.sources = sources if sources is not None else [GoogleShoppingSource()]
+        # Overall time budget for one search across all sources (seconds)
+        self.deadline = deadline if deadline is not None else float(os.getenv('SCRAPER_DEADLINE', 8))
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SCRAPER_MAX_WORKERS', 8)),
+            thread_name_prefix='scraper'
+        )
+        # Recent results per (product, quantity bucket), served stale while refreshing
+        self.cache = SearchResultCache(
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', 900)),
+            stale_ttl=float(os.getenv('SEARCH_CACHE_STALE_TTL', 3600)),
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 1000))
+        )
+        # Simulated fallback results are only kept briefly
+        self.fallback_ttl = float(os.getenv('SEARCH_CACHE_FALLBACK_TTL', 60))
+        self.refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='scraper-refresh')
+        # Concurrent misses for the same cache key share one search
+        self.flights = SingleFlight('vendor_search')
+    
+    def shutdown(self):
+        """Drop queued background refreshes and stop the worker pools"""
+        self.refresh_executor.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
     
     def search_vendors(self, product_name, quantity=10):
         """
         Search multiple marketplaces for real vendors
         Returns a list of vendors with real data
         """
+        key = self.cache.make_key(product_name, quantity)
+        vendors, stale = self.cache.get(key)
+        
+        if vendors is None:
+            return self.flights.do(key, self._search_and_cache, key, product_name, quantity)
+        
+        if stale and self.cache.start_refresh(key):
+            self.refresh_executor.submit(self._refresh, key, product_name, quantity)
+        return vendors
+    
+    def _refresh(self, key, product_name, quantity):
+        try:
+            self.flights.do(key, self._search_and_cache, key, product_name, quantity)
+        except Exception as e:
+            print(f"Background vendor search refresh failed for {product_name}: {e}")
+        finally:
+            self.cache.finish_refresh(key)
+    
+    def _search_and_cache(self, key, product_name, quantity):
+        vendors, real_count = self._search_sources(product_name, quantity)
+        # A source can answer without any parsable listing; only real vendors earn the full TTL
+        self.cache.put(key, vendors, ttl=None if real_count else self.fallback_ttl)
+        return vendors
+    
+    def _search_sources(self, product_name, quantity):
+        """
+        Search every marketplace source concurrently.
+        Returns (vendors, number of them that came from a marketplace).
+        """
         all_vendors = []
+        succeeded = 0
+        deadline = time.monotonic() + self.deadline
         
-        # Search Google Shopping
-        google_vendors = self._search_google_shopping(product_name, quantity)
-        all_vendors.extend(google_vendors)
+        futures = {
+            self.executor.submit(in_context(self._search_source), source, product_name, quantity, deadline): source
+            for source in self.sources
+        }
+        
+        # Merge results as sources finish; stop waiting at the deadline
+        try:
+            for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                source = futures[future]
+                try:
+                    vendors = future.result()
+                except Exception as e:
+                    print(f"Error scraping {source.name}: {e}")
+                    continue
+                if vendors is None:
+                    continue
+                succeeded += 1
+                all_vendors.extend(vendors)
+        except FuturesTimeout:
+            slow = [futures[f].name for f in futures if not f.done()]
+            print(f"Vendor search deadline reached, skipping: {', '.join(slow)}")
         
-        # Add small delay to avoid rate limiting
-        time.sleep(random.uniform(0.5, 1.5))
+        # If we didn't get enough real results, add some from our enhanced simulation
+        real_count = len(all_vendors)
+        if not succeeded:
+            all_vendors = self._get_enhanced_realistic_vendors(product_name, 5)
+        elif len(all_vendors) < 5:
+            print(f"Limited real results ({len(all_vendors)} found), adding enhanced realistic vendors...")
+            all_vendors.extend(self._get_enhanced_realistic_vendors(product_name, max(7 - len(all_vendors), 3)))
         
-        return all_vendors
+        return all_vendors, real_count
     
-    def _search_google_shopping(self, product_name, quantity):
+    @timed('scraper.source')
+    def _search_source(self, source, product_name, quantity, deadline):
         """
-        Scrape Google Shopping for real product listings
+        Run one source within the shared deadline. Returns None when the
+        source's circuit breaker is open or its rate limit has no free slot
+        right now; the search goes on with the other sources.
         """
-        vendors = []
+        permit = source.breaker.allow()
+        if permit is None:
+            print(f"Circuit open: skipping {source.name}")
+            return None
         
-        try:
-            # Google Shopping search URL
-            search_query = product_name.replace(' ', '+')
-            url = f"https://www.google.com/search?q={search_query}&tbm=shop"
-            
-            headers = {
-                'User-Agent': self.ua.random,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-            }
-            
-            response = self.session.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'lxml')
-                
-                # Find product listings (Google Shopping structure)
-                # Note: Google's HTML structure changes frequently, so we'll use multiple selectors
-                product_cards = soup.find_all('div', {'class': re.compile(r'sh-dgr__content|sh-dlr__content')})
-                
-                if not product_cards:
-                    # Try alternative selector
-                    product_cards = soup.find_all('div', {'data-docid': True})[:10]
-                
-                for idx, card in enumerate(product_cards[:10]):  # Limit to 10 results
-                    try:
-                        # Extract vendor name
-                        vendor_elem = card.find('div', {'class': re.compile(r'merchant|store')})
-                        if not vendor_elem:
-                            vendor_elem = card.find('a', {'class': re.compile(r'merchant|shntl')})
-                        vendor_name = vendor_elem.text.strip() if vendor_elem else f"Verified Seller {idx+1}"
-                        
-                        # Extract price
-                        price_elem = card.find('span', {'class': re.compile(r'price|a8Pemb')})
-                        if not price_elem:
-                            price_elem = card.find('b')
-                        
-                        price_text = price_elem.text if price_elem else "$0"
-                        # Extract numeric price
-                        price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                        price = float(price_match.group()) if price_match else 0.0
-                        
-                        # Extract product title
-                        title_elem = card.find('h3') or card.find('div', {'class': re.compile(r'title')})
-                        product_title = title_elem.text.strip() if title_elem else product_name
-                        
-                        # Extract rating (if available)
-                        rating_elem = card.find('span', {'class': re.compile(r'rating|star')})
-                        rating = 4.0 + random.uniform(0, 1)  # Default rating if not found
-                        if rating_elem:
-                            rating_text = rating_elem.text
-                            rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                            if rating_match:
-                                rating = float(rating_match.group(1))
-                        
-                        if price > 0:  # Only add if we found a valid price
-                            vendors.append({
-                                'id': f'google_shopping_{idx}',
-                                'name': vendor_name,
-                                'source': 'Google Shopping',
-                                'country': 'USA',
-                                'rating': min(rating, 5.0),
-                                'deliveryTime': random.randint(2, 10),
-                                'isOnline': True,
-                                'products': [{
-                                    'itemName': product_title,
-                                    'price': price,
-                                    'moq': 1,
-                                    'discount': 0
-                                }],
-                                'performance': {
-                                    'onTimeDelivery': random.randint(85, 100)
-                                },
-                                'verified': True
-                            })
-                    except Exception as e:
-                        print(f"Error parsing product card: {e}")
-                        continue
-            
-            # If we didn't get enough real results, add some from our enhanced simulation
-            if len(vendors) < 5:
-                print(f"Limited real results ({len(vendors)} found), adding enhanced realistic vendors...")
-                vendors.extend(self._get_enhanced_realistic_vendors(product_name, max(7 - len(vendors), 3)))
+        if not source.scheduler.acquire():
+            source.breaker.release(permit)
+            print(f"Rate limit: no free slot for {source.name}, skipping")
+            return None
         
+        # A half-open probe gets the full timeout so a source that merely
+        # slowed down can close its breaker again
+        if permit == PROBE:
+            limit = source.timeouts.max_timeout
+        else:
+            limit = source.timeouts.current()
+        timeout = min(limit, max(0.1, deadline - time.monotonic()))
+        started = time.monotonic()
+        try:
+            vendors = source.search(product_name, quantity, random_user_agent(), timeout)
         except Exception as e:
-            print(f"Error scraping Google Shopping: {e}")
-            # Fallback to enhanced realistic simulation
-            vendors = self._get_enhanced_realistic_vendors(product_name, 5)
-        
+            if timeout < limit and isinstance(e, requests.Timeout):
+                # Cut short by this search's deadline: no verdict on the source
+                source.breaker.release(permit)
+            else:
+                if isinstance(e, requests.Timeout):
+                    source.timeouts.observe_timeout(timeout)
+                source.breaker.record_failure(e)
+            raise
+        source.breaker.record_success()
+        source.timeouts.observe(time.monotonic() - started)
         return vendors
     
+    def source_stats(self):
+        """Circuit breaker and timeout state for every marketplace source"""
+        return [source.stats() for source in self.sources]
+    
+    def reset_source(self, name=None):
+        """Close the circuit breaker of one source (by name) or of all; returns the names reset"""
+        reset = []
+        for source in self.sources:
+            if name is None or source.name == name:
+                source.breaker.reset()
+                reset.append(source.name)
+        return reset
+    
     def _get_enhanced_realistic_vendors(self, product_name, count):
         """
         Enhanced realistic vendor simulation with real company names
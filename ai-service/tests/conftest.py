@@ -0,0 +1,15 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+AI_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AI_SERVICE_DIR)
+
+# Keep the app's on-disk stores out of the working tree
+STORE_DIR = tempfile.mkdtemp(prefix='ai-tests-')
+atexit.register(shutil.rmtree, STORE_DIR, ignore_errors=True)
+for name in ('SALES_HISTORY_DIR', 'VENDOR_METRICS_DIR', 'JOB_STORE_DIR', 'INVENTORY_STATE_DIR'):
+    os.environ.setdefault(name, os.path.join(STORE_DIR, name.lower()))
+os.environ.setdefault('LLM_CACHE_PATH', '')
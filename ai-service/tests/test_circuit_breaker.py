@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from services.circuit_breaker import CALL, PROBE, AdaptiveTimeout, CircuitBreaker
+from services.marketplace_sources import MarketplaceSource
+from services.vendor_scraper import VendorScraper
+
+
+class SlowSource(MarketplaceSource):
+    """Answers after `latency` seconds, or times out if that exceeds the call's timeout"""
+
+    name = 'slow'
+
+    def __init__(self, latency, **kwargs):
+        super().__init__(min_interval=0, jitter=0, **kwargs)
+        self.latency = latency
+        self.timeouts_seen = []
+
+    def search(self, product_name, quantity, user_agent, timeout):
+        self.timeouts_seen.append(timeout)
+        time.sleep(0.05)
+        if self.latency > timeout:
+            raise requests.Timeout(f'no answer within {timeout}s')
+        return [{'vendorName': 'Slow Vendor'}]
+
+
+def test_timeouts_widen_the_adapted_timeout():
+    timeouts = AdaptiveTimeout(max_timeout=10, min_timeout=1, min_samples=5, window=10)
+    for _ in range(10):
+        timeouts.observe(0.1)
+    assert timeouts.current() == 1
+
+    timeouts.observe_timeout(1)
+    timeouts.observe_timeout(1)
+    assert timeouts.current() == 2
+
+
+def test_half_open_probe_uses_the_full_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    timeouts = AdaptiveTimeout(max_timeout=5, min_timeout=1, min_samples=1)
+    timeouts.observe(0.1)
+    source = SlowSource(latency=2, breaker=breaker, timeouts=timeouts)
+    scraper = VendorScraper(sources=[source])
+    deadline = time.monotonic() + 60
+
+    try:
+        # Upstream is now slower than the adapted 1s timeout: the call fails and trips the breaker
+        with pytest.raises(requests.Timeout):
+            scraper._search_source(source, 'widget', 1, deadline)
+        assert breaker.stats()['state'] == 'open'
+
+        # The probe waits up to max_timeout, succeeds, and closes the breaker
+        assert scraper._search_source(source, 'widget', 1, deadline) == [{'vendorName': 'Slow Vendor'}]
+        assert source.timeouts_seen == [1, 5]
+        assert breaker.stats()['state'] == 'closed'
+    finally:
+        scraper.shutdown()
+
+
+def test_only_one_concurrent_caller_gets_the_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    start = threading.Barrier(16)
+
+    def call(_):
+        start.wait()
+        return breaker.allow()
+
+    with ThreadPoolExecutor(16) as pool:
+        permits = list(pool.map(call, range(16)))
+    assert permits.count(PROBE) == 1
+    assert permits.count(None) == 15
+
+    # Releasing an ordinary permit must not free the probe slot
+    breaker.release(CALL)
+    assert breaker.allow() is None
+    breaker.release(PROBE)
+    assert breaker.allow() == PROBE
+
+
+def test_concurrent_searches_send_one_probe_with_the_full_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    timeouts = AdaptiveTimeout(max_timeout=5, min_timeout=1, min_samples=1)
+    timeouts.observe(0.1)
+    source = SlowSource(latency=0, breaker=breaker, timeouts=timeouts)
+    scraper = VendorScraper(sources=[source])
+    deadline = time.monotonic() + 60
+    start = threading.Barrier(8)
+
+    def search(_):
+        start.wait()
+        return scraper._search_source(source, 'widget', 1, deadline)
+
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(search, range(8)))
+        assert sum(r is not None for r in results) == 1
+        assert source.timeouts_seen == [5]
+        assert breaker.stats()['state'] == 'closed'
+    finally:
+        scraper.shutdown()
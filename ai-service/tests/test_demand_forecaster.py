@@ -0,0 +1,31 @@
+from services.demand_forecaster import DemandForecaster
+
+
+def test_flat_series_forecasts_its_level_exactly():
+    result = DemandForecaster().forecast([[100] * 28])[0]
+
+    assert result['predictedDailyDemand'] == 100.0
+    assert result['predictedWeeklyDemand'] == 700.0
+    assert result['predictedMonthlyDemand'] == 3000.0
+    assert result['trend'] == 'stable'
+    assert result['confidenceInterval']['daily'] == [100.0, 100.0]
+    assert result['confidenceInterval']['weekly'] == [700.0, 700.0]
+    assert result['confidenceInterval']['monthly'] == [3000.0, 3000.0]
+
+
+def test_periodic_series_repeats_its_season_exactly():
+    week = [10, 20, 30, 40, 50, 60, 70]
+    result = DemandForecaster().forecast([week * 4])[0]
+
+    assert result['predictedDailyDemand'] == 40.0
+    assert result['predictedWeeklyDemand'] == 280.0
+    # Four full weeks plus the next two days of the cycle
+    assert result['predictedMonthlyDemand'] == 4 * 280.0 + 10 + 20
+    assert result['confidenceInterval']['daily'] == [40.0, 40.0]
+    assert result['confidenceInterval']['monthly'] == [1150.0, 1150.0]
+
+
+def test_short_series_reports_insufficient_data():
+    result = DemandForecaster().forecast([[5] * 6])[0]
+
+    assert result == {'prediction': 'Insufficient data', 'confidence': 'low'}
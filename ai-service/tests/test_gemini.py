@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+
+import pytest
+
+from services import gemini
+from services.gemini import GeminiClient, LLMThrottled, LLMTimeout, TokenBucket
+from services.vendor_analyzer import VendorAnalyzer
+
+
+class ResourceExhausted(Exception):
+    """Stands in for google.api_core's 429 (classified by name)"""
+
+
+class InternalServerError(Exception):
+    """Stands in for google.api_core's 500"""
+
+
+class Reply:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """generate_content() plays `script` in order: an exception is raised, a number is a delay before replying"""
+
+    def __init__(self, *script, text='{}'):
+        self.script = list(script)
+        self.text = text
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        with self._lock:
+            self.prompts.append(prompt)
+            step = self.script.pop(0) if self.script else 0
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        return Reply(self.text)
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """Records the jitter range of each backoff and skips the sleep"""
+    seen = []
+
+    def uniform(low, high):
+        seen.append((low, high))
+        return 0
+
+    monkeypatch.setattr(gemini.random, 'uniform', uniform)
+    return seen
+
+
+def test_token_bucket_waits_for_its_share():
+    bucket = TokenBucket(per_minute=60)
+    now = bucket.updated
+    assert bucket.wait_for(60, now) == 0
+    bucket.take(61)
+    assert bucket.wait_for(1, now) == pytest.approx(2)
+    # Refills at one token per second, capped at a minute's worth
+    assert bucket.wait_for(1, now + 2) == pytest.approx(0)
+    assert bucket.wait_for(61, now + 600) == pytest.approx(1)
+
+
+def test_requests_over_the_limit_are_throttled_without_calling_the_model():
+    model = FakeModel()
+    client = GeminiClient(model=model, requests_per_minute=2, max_wait=0.5)
+    try:
+        client.generate_content('a')
+        client.generate_content('b')
+        with pytest.raises(LLMThrottled):
+            client.generate_content('c')
+        assert model.prompts == ['a', 'b']
+        assert client.stats()['throttled'] == 1
+    finally:
+        client.executor.shutdown()
+
+
+def test_caller_waits_for_capacity_within_max_wait():
+    model = FakeModel()
+    client = GeminiClient(model=model, requests_per_minute=600, max_wait=1)
+    client.requests.tokens = 0
+    try:
+        started = time.monotonic()
+        client.generate_content('a')
+        assert time.monotonic() - started >= 0.09
+        assert client.stats()['rateLimitWaitSeconds'] == pytest.approx(0.1, abs=0.01)
+    finally:
+        client.executor.shutdown()
+
+
+def test_token_limit_counts_prompt_and_expected_output():
+    model = FakeModel()
+    client = GeminiClient(model=model, tokens_per_minute=1000, expected_output_tokens=400, max_wait=0)
+    try:
+        client.generate_content('x' * 800)
+        with pytest.raises(LLMThrottled):
+            client.generate_content('x' * 800)
+        assert len(model.prompts) == 1
+    finally:
+        client.executor.shutdown()
+
+
+@pytest.mark.parametrize('error', [ResourceExhausted, InternalServerError])
+def test_retryable_errors_back_off_with_jitter(error, backoffs):
+    model = FakeModel(error('busy'), error('busy'), text='ok')
+    client = GeminiClient(model=model, backoff_base=0.5, backoff_max=8)
+    try:
+        assert client.generate_content('a').text == 'ok'
+        assert len(model.prompts) == 3
+        # Full jitter over an exponentially growing range
+        assert backoffs == [(0, 1.0), (0, 2.0)]
+        stats = client.stats()
+        assert (stats['retries'], stats['succeeded'], stats['failed']) == (2, 1, 0)
+    finally:
+        client.executor.shutdown()
+
+
+def test_backoff_is_capped_and_retries_run_out(backoffs):
+    model = FakeModel(*[ResourceExhausted('busy')] * 5)
+    client = GeminiClient(model=model, max_retries=4, backoff_base=1, backoff_max=3)
+    try:
+        with pytest.raises(ResourceExhausted):
+            client.generate_content('a')
+        assert len(model.prompts) == 5
+        assert backoffs == [(0, 2), (0, 3), (0, 3), (0, 3)]
+        assert client.stats()['failed'] == 1
+    finally:
+        client.executor.shutdown()
+
+
+def test_other_errors_are_not_retried(backoffs):
+    model = FakeModel(ValueError('bad prompt'))
+    client = GeminiClient(model=model)
+    try:
+        with pytest.raises(ValueError):
+            client.generate_content('a')
+        assert len(model.prompts) == 1
+        assert backoffs == []
+    finally:
+        client.executor.shutdown()
+
+
+def test_slow_calls_time_out_and_are_retried(backoffs):
+    model = FakeModel(1.0, text='ok')
+    client = GeminiClient(model=model, timeout=0.1, max_retries=1)
+    try:
+        started = time.monotonic()
+        assert client.generate_content('a').text == 'ok'
+        assert time.monotonic() - started < 0.5
+        stats = client.stats()
+        assert (stats['timeouts'], stats['retries']) == (1, 1)
+    finally:
+        client.executor.shutdown(wait=False)
+
+
+def test_timeout_without_retries_raises():
+    model = FakeModel(1.0)
+    client = GeminiClient(model=model, timeout=0.05, max_retries=0)
+    try:
+        with pytest.raises(LLMTimeout):
+            client.generate_content('a')
+    finally:
+        client.executor.shutdown(wait=False)
+
+
+def test_analyzer_falls_back_to_rules_after_max_wait(monkeypatch):
+    model = FakeModel(text=json.dumps({'recommendations': ['Ask the model']}))
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setenv('GEMINI_REQUESTS_PER_MINUTE', '1')
+    monkeypatch.setenv('GEMINI_MAX_WAIT', '0.5')
+    monkeypatch.setattr(gemini, '_client', None)
+    monkeypatch.setattr(gemini, '_client_built', False)
+    monkeypatch.setattr(gemini, '_build_model', lambda name: model)
+
+    client = gemini.get_client()
+    assert client.max_wait == 0.5
+    analyzer = VendorAnalyzer()
+    vendor = {'id': 'v1', 'name': 'Acme', 'rating': 2}
+    orders = [{'status': 'pending', 'total': 10}]
+    try:
+        assert analyzer.model is client
+        assert analyzer.analyze_vendor(vendor, orders)['recommendations'] == ['Ask the model']
+
+        # The next request slot is a minute away: past GEMINI_MAX_WAIT, so rules answer at once
+        started = time.monotonic()
+        analysis = analyzer.analyze_vendor(vendor, orders)
+        assert time.monotonic() - started < 0.5
+        assert 'aiInsights' not in analysis
+        assert analysis['recommendations'][0] == 'Consider finding alternative vendors with better ratings'
+        assert len(model.prompts) == 1
+        assert client.stats()['throttled'] == 1
+    finally:
+        client.executor.shutdown()
@@ -0,0 +1,78 @@
+import pytest
+
+import app as service
+
+
+ITEMS = [
+    {'id': 'a', 'name': 'Widget', 'currentStock': 40, 'reorderPoint': 10,
+     'averageDailySales': 2, 'costPrice': 1e-07, 'sellingPrice': 3.5, 'category': 'Parts'},
+    {'id': 'b', 'name': 'Gadget', 'currentStock': 5, 'reorderPoint': 8,
+     'averageDailySales': 6, 'costPrice': 12.25, 'sellingPrice': 20, 'category': 'Tools'}
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    return service.app.test_client()
+
+
+def snapshot(client, tenant_id):
+    response = client.post('/api/inventory-insights', json={'tenantId': tenant_id, 'items': ITEMS})
+    assert response.status_code == 200
+    return response.get_json()['checksum']
+
+
+def test_delta_accepts_the_checksum_the_server_returned(client):
+    checksum = snapshot(client, 'roundtrip')
+
+    for stock in (3, 0, 25):
+        changed = dict(ITEMS[1], currentStock=stock)
+        response = client.post('/api/inventory-insights/delta', json={
+            'tenantId': 'roundtrip', 'changed': [changed], 'checksum': checksum
+        })
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['checksum'] != checksum
+        checksum = body['checksum']
+
+
+def test_delta_with_a_stale_checksum_requires_a_snapshot(client):
+    stale = snapshot(client, 'stale')
+    client.post('/api/inventory-insights/delta', json={
+        'tenantId': 'stale', 'changed': [dict(ITEMS[0], currentStock=1)], 'checksum': stale
+    })
+
+    response = client.post('/api/inventory-insights/delta', json={
+        'tenantId': 'stale', 'changed': [dict(ITEMS[0], currentStock=2)], 'checksum': stale
+    })
+    assert response.status_code == 409
+    assert response.get_json()['snapshotRequired'] is True
+
+
+@pytest.mark.parametrize('bad', [
+    {'id': 'c', 'name': 'Gizmo', 'currentStock': 3},
+    {'id': 'c', 'name': 'Gizmo', 'currentStock': '3', 'costPrice': 2},
+    {'id': 'c', 'name': 'Gizmo', 'currentStock': 3, 'costPrice': 2, 'sellingPrice': None},
+    {'name': 'Gizmo', 'currentStock': 3, 'costPrice': 2}
+])
+def test_rejected_delta_leaves_state_equal_to_a_full_analysis(client, bad):
+    checksum = snapshot(client, 'rejected')
+    changed = dict(ITEMS[1], currentStock=7)
+
+    response = client.post('/api/inventory-insights/delta', json={
+        'tenantId': 'rejected', 'changed': [changed, bad], 'removed': ['a'], 'checksum': checksum
+    })
+    assert response.status_code == 400
+    assert 'Invalid delta' in response.get_json()['error']
+
+    # The state still matches the snapshot, so the same checksum is accepted
+    response = client.post('/api/inventory-insights/delta', json={
+        'tenantId': 'rejected', 'changed': [changed], 'checksum': checksum
+    })
+    assert response.status_code == 200
+    delta = response.get_json()
+
+    full = client.post('/api/inventory-insights', json={'tenantId': 'full', 'items': [ITEMS[0], changed]}).get_json()
+    assert delta['checksum'] == full['checksum']
+    assert delta['insights'] == full['insights']
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+import app as service
+from services.job_queue import JobManager
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=2, max_results=2, default_deadline=120, max_deadline=300)
+    yield manager
+    manager.shutdown(timeout=1)
+
+
+def test_deadline_is_capped_at_the_maximum(manager):
+    job = manager.submit('test', lambda job: None, deadline=10 ** 9)
+    assert job.deadline - job.created_at == 300
+
+
+def test_pruning_drops_the_earliest_finished_jobs(manager):
+    release = threading.Event()
+    slow = manager.submit('slow', lambda job: release.wait(5))
+    fast = [manager.submit('fast', lambda job: None) for _ in range(2)]
+    for job in fast:
+        job.wait(5)
+    release.set()
+    slow.wait(5)
+    time.sleep(0.01)
+
+    # Submitted first but finished last, so it outlives the first fast job
+    manager.submit('next', lambda job: None).wait(5)
+    assert manager.get(slow.id) is not None
+    assert manager.get(fast[0].id) is None
+
+
+@pytest.mark.parametrize('deadline', ['abc', -5, 0, [1], True, 'nan'])
+def test_invalid_deadline_is_rejected(deadline):
+    client = service.app.test_client()
+    response = client.post('/api/search-vendors', json={
+        'productName': 'widget', 'async': True, 'deadline': deadline
+    })
+    assert response.status_code == 400
+    assert 'Invalid deadline' in response.get_json()['error']
+
+
+def test_search_job_reports_progress(monkeypatch):
+    monkeypatch.setattr(service.vendor_scraper, 'search_vendors', lambda name, quantity: [{'vendorName': 'A'}])
+    client = service.app.test_client()
+    response = client.post('/api/search-vendors', json={'productName': 'widget', 'async': True, 'deadline': '30'})
+    assert response.status_code == 202
+
+    job = client.get(f"{response.get_json()['statusUrl']}?wait=5").get_json()['job']
+    assert job['status'] == 'succeeded'
+    assert job['progress'] == {'done': 1, 'total': 1}
+    assert job['result']['count'] == 1
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+
+import pytest
+
+from services.marketplace_sources import GoogleShoppingSource
+from services.vendor_scraper import VendorScraper
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from fakes import FakeShoppingServer  # noqa: E402
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = FakeShoppingServer(cards=4, padding_kb=1, seed=1, **kwargs).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def shopping_source(monkeypatch, server, name='Google Shopping', min_interval=0):
+    monkeypatch.setenv('GOOGLE_SHOPPING_URL', server.url)
+    source = GoogleShoppingSource(min_interval=min_interval, jitter=0)
+    source.name = name
+    return source
+
+
+def search(sources, deadline=5):
+    scraper = VendorScraper(sources=sources, deadline=deadline)
+    try:
+        started = time.monotonic()
+        vendors, real_count = scraper._search_sources('usb cable', 10)
+        return vendors, real_count, time.monotonic() - started
+    finally:
+        scraper.shutdown()
+
+
+def test_results_from_every_source_are_merged(monkeypatch, servers):
+    first, second = servers(), servers()
+    sources = [shopping_source(monkeypatch, first, 'Shop A'), shopping_source(monkeypatch, second, 'Shop B')]
+
+    vendors, real_count, _ = search(sources)
+
+    assert real_count == 8
+    assert len(vendors) == 8
+    assert all(vendor['source'] == 'Google Shopping' and vendor['products'][0]['price'] > 0 for vendor in vendors)
+    assert first.stats()['requests'] == second.stats()['requests'] == 1
+
+
+def test_slow_source_is_cut_off_at_the_deadline(monkeypatch, servers):
+    fast, slow = servers(), servers(latency_ms=5000)
+    sources = [shopping_source(monkeypatch, fast, 'Fast'), shopping_source(monkeypatch, slow, 'Slow')]
+
+    vendors, real_count, elapsed = search(sources, deadline=0.5)
+
+    assert elapsed < 1.5
+    assert real_count == 4
+    assert slow.stats()['requests'] == 1
+
+
+def test_blocked_source_falls_back_to_simulated_vendors(monkeypatch, servers):
+    server = servers(failure_rate=1.0, failure_status=429)
+    source = shopping_source(monkeypatch, server)
+
+    vendors, real_count, _ = search([source])
+
+    assert real_count == 0
+    assert len(vendors) == 5
+    assert source.breaker.stats()['failures'] == 1
+
+
+def test_rate_limited_source_is_skipped_without_waiting(monkeypatch, servers):
+    server = servers()
+    source = shopping_source(monkeypatch, server, min_interval=30)
+
+    assert search([source])[1] == 4
+    # The next slot is 30s away: skip the source instead of holding a pool thread
+    vendors, real_count, elapsed = search([source])
+
+    assert elapsed < 0.5
+    assert real_count == 0
+    assert len(vendors) == 5
+    assert server.stats()['requests'] == 1
+    assert source.stats()['rateLimited'] == 1
+    # Skipping is not the source's fault: its breaker is untouched
+    assert source.breaker.stats()['failures'] == 0
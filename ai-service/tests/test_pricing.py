@@ -0,0 +1,124 @@
+import pytest
+
+import app as service
+from services.lazy import resolve
+from services.pricing_engine import PricingEngine
+
+
+ITEMS = [
+    # margin 10%: below the minimum
+    {'id': 'low', 'name': 'Low Margin', 'costPrice': 10, 'sellingPrice': 11, 'averageDailySales': 2},
+    # margin 100% on a slow seller
+    {'id': 'slow', 'name': 'Slow Seller', 'costPrice': 10, 'sellingPrice': 20, 'averageDailySales': 0.5},
+    # same margin but selling well; its market entry is unusable
+    {'id': 'fast', 'name': 'Fast Seller', 'costPrice': 10, 'sellingPrice': 20, 'averageDailySales': 3},
+    # healthy margin, 25% above the market price keyed by id
+    {'id': 'above', 'name': 'Pricey Mug', 'costPrice': 10, 'sellingPrice': 15, 'averageDailySales': 1},
+    # healthy margin, 25% below the market price keyed by normalized name
+    {'id': 'below', 'name': '  Blue  MUG ', 'costPrice': 10, 'sellingPrice': 15, 'averageDailySales': 2},
+    # no cost: no margin to judge
+    {'id': 'free', 'name': 'Freebie', 'costPrice': 0, 'sellingPrice': 5, 'averageDailySales': 4}
+]
+
+MARKET = {'above': 12, 'blue mug': {'price': 20}, 'fast': 'n/a'}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    return service.app.test_client()
+
+
+def by_id(result):
+    return {s['itemId']: s for s in result['suggestions']}
+
+
+def test_margin_rules():
+    suggestions = by_id(PricingEngine().suggest(ITEMS))
+
+    assert suggestions['low']['recommendation'] == 'increase'
+    assert suggestions['low']['suggestedPrice'] == pytest.approx(13)
+    assert suggestions['low']['estimatedMonthlyImpact'] == 120
+    assert suggestions['slow']['recommendation'] == 'decrease'
+    assert suggestions['slow']['suggestedPrice'] == pytest.approx(14)
+    assert suggestions['fast']['recommendation'] == 'maintain'
+    assert 'suggestedPrice' not in suggestions['fast']
+    assert suggestions['free']['recommendation'] == 'maintain'
+    assert suggestions['free']['currentMargin'] is None
+
+
+def test_market_index_by_id_and_normalized_name():
+    suggestions = by_id(PricingEngine().suggest(ITEMS, MARKET))
+
+    above = suggestions['above']
+    assert above['recommendation'] == 'decrease'
+    assert above['suggestedPrice'] == 12
+    assert above['marketPrice'] == 12
+    assert above['reasoning'] == 'Priced 25% above market'
+
+    below = suggestions['below']
+    assert below['recommendation'] == 'increase'
+    assert below['suggestedPrice'] == 19
+    assert below['marketPrice'] == 20
+    assert below['reasoning'] == 'Priced 25% below market'
+
+    # Unparseable market entries are ignored; margin rules still win over the market
+    assert 'marketPrice' not in suggestions['fast']
+    assert suggestions['low']['reasoning'] == 'Margin too low, recommend 30% markup'
+
+
+def test_market_move_keeps_the_minimum_margin():
+    item = {'id': 'x', 'name': 'X', 'costPrice': 10, 'sellingPrice': 15, 'averageDailySales': 1}
+    suggestion = PricingEngine().suggest([item], {'x': 8})['suggestions'][0]
+    assert suggestion['recommendation'] == 'decrease'
+    assert suggestion['suggestedPrice'] == 12
+
+
+def test_pagination_sorting_and_filter():
+    engine = PricingEngine()
+    everything = engine.suggest(ITEMS, MARKET, limit=None)
+    # Highest impact first; equal impact falls back to the larger price change
+    assert [s['itemId'] for s in everything['suggestions']] == ['below', 'low', 'slow', 'above', 'fast', 'free']
+    assert everything['counts'] == {'increase': 2, 'decrease': 2, 'maintain': 2}
+
+    page = engine.suggest(ITEMS, MARKET, offset=1, limit=2)
+    assert [s['itemId'] for s in page['suggestions']] == ['low', 'slow']
+    assert (page['total'], page['offset'], page['limit']) == (6, 1, 2)
+    assert engine.suggest(ITEMS, MARKET, offset=6, limit=2)['suggestions'] == []
+
+    decreases = engine.suggest(ITEMS, MARKET, recommendation='decrease')
+    assert [s['itemId'] for s in decreases['suggestions']] == ['slow', 'above']
+    assert decreases['total'] == 2
+    assert decreases['counts'] == everything['counts']
+
+    by_margin = engine.suggest(ITEMS, sort_by='margin')
+    assert [s['itemId'] for s in by_margin['suggestions']][:2] == ['low', 'above']
+    assert by_margin['suggestions'][-1]['itemId'] == 'free'
+
+
+def test_route_pages_and_caps_limit(client, monkeypatch):
+    monkeypatch.setattr(resolve(service.inventory_analyzer), 'pricing_max_limit', 3)
+
+    response = client.post('/api/optimize-pricing', json={'items': ITEMS, 'marketData': MARKET, 'offset': '1', 'limit': 2})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [s['itemId'] for s in body['suggestions']] == ['low', 'slow']
+
+    body = client.post('/api/optimize-pricing', json={'items': ITEMS, 'limit': 100}).get_json()
+    assert body['limit'] == 3
+    assert len(body['suggestions']) == 3
+
+
+@pytest.mark.parametrize('field, value', [
+    ('offset', -1), ('offset', 1.5), ('offset', None), ('offset', '1.5'),
+    ('limit', 0), ('limit', -5), ('limit', None), ('limit', True), ('limit', 'ten'), ('limit', [2])
+])
+def test_route_rejects_bad_paging(client, field, value):
+    response = client.post('/api/optimize-pricing', json={'items': ITEMS, field: value})
+    assert response.status_code == 400
+    assert field in response.get_json()['error']
+
+
+def test_route_rejects_unknown_sort(client):
+    response = client.post('/api/optimize-pricing', json={'items': ITEMS, 'sortBy': 'price'})
+    assert response.status_code == 400
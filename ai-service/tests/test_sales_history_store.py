@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import app as service
+from services.sales_history_store import SalesHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SalesHistoryStore(root=str(tmp_path), compact_segments=100)
+
+
+@pytest.mark.parametrize('bad', [
+    {'itemId': 'new', 'date': 'not-a-date', 'quantity': 1},
+    {'itemId': 'new', 'quantity': 1},
+    {'itemId': 'new', 'date': '2024-01-03', 'quantity': 'many'},
+    {'itemId': 'new', 'date': '2024-01-03', 'quantity': float('inf')},
+    {'date': '2024-01-03', 'quantity': 1}
+])
+def test_bad_record_stores_nothing(store, bad):
+    store.ingest([{'itemId': 'a', 'date': '2024-01-01', 'quantity': 2}])
+
+    with pytest.raises(ValueError):
+        store.ingest([{'itemId': 'other', 'date': '2024-01-02', 'quantity': 3}, bad])
+    assert 'other' not in store and 'new' not in store
+
+    # Ids added later are persisted and survive compaction and a restart
+    store.ingest([{'itemId': 'other', 'date': '2024-01-02', 'quantity': 3}])
+    store.compact()
+    reopened = SalesHistoryStore(root=store.root)
+    assert reopened.series('other').tolist() == [3]
+    assert reopened.series('a').tolist() == [2, 0]
+
+
+def test_series_runs_to_the_newest_day_in_the_store(store):
+    store.ingest([
+        {'itemId': 'stopped', 'date': '2024-01-01', 'quantity': 5},
+        {'itemId': 'stopped', 'date': '2024-01-03', 'quantity': 5},
+        {'itemId': 'selling', 'date': '2024-01-05T10:00:00Z', 'quantity': 1}
+    ])
+
+    assert store.series('stopped').tolist() == [5, 0, 5, 0, 0]
+    assert store.series('stopped', window=3).tolist() == [5, 0, 0]
+    store.compact()
+    assert store.series('stopped').tolist() == [5, 0, 5, 0, 0]
+    assert isinstance(store.series('selling'), np.ndarray)
+    assert store.series('selling').tolist() == [1]
+
+
+def test_ingest_route_returns_400_for_bad_records(monkeypatch, tmp_path):
+    monkeypatch.setattr(service, 'sales_history', SalesHistoryStore(root=str(tmp_path)))
+    client = service.app.test_client()
+
+    response = client.post('/api/sales-history/ingest', json={
+        'records': [{'itemId': 'a', 'date': 'yesterday', 'quantity': 1}]
+    })
+    assert response.status_code == 400
+    assert 'record 0' in response.get_json()['error']
@@ -0,0 +1,74 @@
+"""Two managers / analyzers on one directory stand in for two worker processes"""
+import threading
+
+import pytest
+
+from services.inventory_analyzer import InventoryAnalyzer
+from services.job_queue import JobManager
+
+ITEMS = [
+    {'id': 'a', 'name': 'Widget', 'currentStock': 40, 'reorderPoint': 10,
+     'averageDailySales': 2, 'costPrice': 1.5, 'sellingPrice': 3.5, 'category': 'Parts'},
+    {'id': 'b', 'name': 'Gadget', 'currentStock': 5, 'reorderPoint': 8,
+     'averageDailySales': 6, 'costPrice': 12.25, 'sellingPrice': 20, 'category': 'Tools'}
+]
+
+
+@pytest.fixture
+def managers(tmp_path):
+    pair = [JobManager(max_workers=2, root=str(tmp_path)) for _ in range(2)]
+    yield pair
+    for manager in pair:
+        manager.shutdown(timeout=1)
+
+
+def test_any_worker_reports_a_finished_job(managers):
+    owner, other = managers
+    job = owner.submit('test', lambda job: {'answer': 42})
+    job.wait(5)
+
+    seen = other.get(job.id)
+    assert seen.finished
+    assert seen.to_dict()['result'] == {'answer': 42}
+    assert other.get('0' * 32) is None
+    assert other.get('../../etc/passwd') is None
+
+
+def test_another_worker_can_wait_for_and_cancel_a_job(managers):
+    owner, other = managers
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while True:
+            job.report_progress(1, 2)
+
+    job = owner.submit('test', work)
+    started.wait(5)
+
+    assert other.get(job.id).to_dict()['status'] == 'running'
+    other.cancel(job.id)
+    seen = other.get(job.id)
+    assert seen.wait(5)
+    assert seen.to_dict()['status'] == 'cancelled'
+
+
+def test_any_worker_takes_the_next_delta(tmp_path, monkeypatch):
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    monkeypatch.setenv('INVENTORY_STATE_DIR', str(tmp_path))
+    monkeypatch.setenv('INVENTORY_STATE_COMPACT_EVERY', '3')
+    first, second = InventoryAnalyzer(llm_cache=None), InventoryAnalyzer(llm_cache=None)
+
+    checksum, _ = first.load_snapshot('tenant', ITEMS)
+    items = {item['id']: item for item in ITEMS}
+    for step in range(7):
+        analyzer = (first, second)[step % 2]
+        changed = dict(items['b'], currentStock=step)
+        items['b'] = changed
+        insights, checksum = analyzer.apply_delta('tenant', [changed], [], [], expected_checksum=checksum)
+        assert insights is not None, f'delta {step} rejected'
+
+    expected = first.analyze_inventory(list(items.values()), [])
+    assert first.apply_delta('tenant', [], [], [], expected_checksum=checksum)[0] == expected
+    # A fresh worker loads the tenant from the shared log
+    assert InventoryAnalyzer(llm_cache=None).apply_delta('tenant', [], [], [], expected_checksum=checksum)[1] == checksum
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from services.vendor_index import VendorProductIndex
+
+
+def scan(vendors, item_name):
+    """The original nested scan: first matching product per vendor, in vendor order"""
+    matches = []
+    for vendor in vendors:
+        for product in vendor.get('products', []):
+            if (product['itemName'].lower() in item_name.lower() or
+                    item_name.lower() in product['itemName'].lower()):
+                matches.append((vendor, product))
+                break
+    return matches
+
+
+def vendor(vendor_id, *names):
+    return {'id': vendor_id, 'products': [{'itemName': n, 'price': 1} for n in names]}
+
+
+VENDORS = [
+    vendor('v0', 'USB Cable', 'Laptop - Dell XPS 15'),
+    vendor('v1', 'TV', 'Office Chair'),
+    vendor('v2', 'laptop', 'LAPTOP - DELL XPS 15 (2024)'),
+    vendor('v3', 'Pc', 'x'),
+    vendor('v4'),
+    vendor('v5', 'Desk Lamp', 'Desk')
+]
+
+
+@pytest.mark.parametrize('item_name', [
+    'Laptop - Dell XPS 15',        # exact, case-folded and longer product names
+    'LAPTOP',                      # item inside several product names
+    'TV Stand',                    # two-character product name inside the item
+    'tv',                          # item shorter than a trigram
+    'pc',
+    'X',                           # one character, matches 'x' and names containing it
+    'Standing Desk Lamp',          # several names of one vendor: first one wins
+    'Coffee Maker',                # no match
+    ''                             # empty item name is inside every product name
+])
+def test_lookup_matches_the_nested_scan(item_name):
+    index = VendorProductIndex(VENDORS)
+    assert index.lookup(item_name) == scan(VENDORS, item_name)
+
+
+def test_lookup_matches_the_nested_scan_on_random_catalogs():
+    rng = random.Random(7)
+    words = ['Laptop', 'Dell', 'XPS', 'Pro', 'Mouse', 'USB', 'C', 'Hub', 'tv', '15', '-']
+    vendors = [
+        vendor(f'v{v}', *(' '.join(rng.choices(words, k=rng.randint(1, 4))) for _ in range(rng.randint(0, 6))))
+        for v in range(40)
+    ]
+    index = VendorProductIndex(vendors)
+    for _ in range(300):
+        item_name = ' '.join(rng.choices(words, k=rng.randint(1, 5)))
+        if rng.random() < 0.3:
+            item_name = item_name.upper()
+        assert index.lookup(item_name) == scan(vendors, item_name)
+
+
+def test_shared_prefixes_do_not_become_candidates():
+    vendors = [vendor(f'v{v}', f'Laptop - Model {v}') for v in range(5000)]
+    index = VendorProductIndex(vendors)
+
+    assert index.lookup('Laptop - Model 42 Pro') == scan(vendors, 'Laptop - Model 42 Pro')
+    # Bounded by the item name's substrings, not by the 5000 names sharing its prefix
+    assert index.stats()['candidatesChecked'] < 500
@@ -0,0 +1,93 @@
+import pytest
+
+import app as service
+from services.vendor_metrics import VendorMetricsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return VendorMetricsStore(root=str(tmp_path), snapshot_every=1000)
+
+
+@pytest.mark.parametrize('event', [
+    {'type': 'placed', 'vendorId': 'v1'},
+    {'type': 'placed', 'vendorId': 'v1', 'total': 'lots'},
+    {'type': 'placed', 'vendorId': 'v1', 'total': float('nan')},
+    {'type': 'received', 'vendorId': 'v1', 'responseTime': 'slow'},
+    {'type': 'shipped', 'vendorId': 'v1'},
+    {'type': 'placed', 'total': 10}
+])
+def test_invalid_event_rejects_the_whole_batch(store, event):
+    store.ingest([{'type': 'placed', 'vendorId': 'v1', 'total': 100}])
+
+    with pytest.raises(ValueError):
+        store.ingest([{'type': 'placed', 'vendorId': 'v1', 'total': 50}, event])
+
+    assert store.metrics({'id': 'v1'})['averageOrderValue'] == 100
+    assert store.vendor_state('v1')['totalOrders'] == 1
+
+
+def test_numeric_strings_are_normalized(store):
+    store.ingest([
+        {'type': 'placed', 'vendorId': 'v1', 'total': '100.5'},
+        {'type': 'placed', 'vendorId': 'v1', 'total': 50, 'responseTime': '4'}
+    ])
+
+    assert store.metrics({'id': 'v1'})['averageOrderValue'] == 75.25
+    assert store.metrics({'id': 'v1'})['responseTime'] == 4
+    # Replaying the log gives the same counters
+    assert VendorMetricsStore(root=store.root).vendor_state('v1')['orderValue'] == 150.5
+
+
+def test_ingest_route_returns_400_for_bad_events(monkeypatch, tmp_path):
+    monkeypatch.setattr(service, 'vendor_metrics', VendorMetricsStore(root=str(tmp_path)))
+    client = service.app.test_client()
+
+    response = client.post('/api/vendor-metrics/events', json={
+        'events': [{'type': 'placed', 'vendorId': 'v1', 'total': None}]
+    })
+    assert response.status_code == 400
+    assert 'total' in response.get_json()['error']
+
+
+def test_naive_and_aware_delivery_times_are_compared_in_utc(store):
+    store.ingest([
+        {'type': 'placed', 'vendorId': 'v1', 'total': 10},
+        {'type': 'received', 'vendorId': 'v1',
+         'expectedDelivery': '2024-03-05T12:00:00', 'actualDelivery': '2024-03-05T13:00:00+02:00'},
+        {'type': 'received', 'vendorId': 'v1',
+         'expectedDelivery': '2024-03-05T12:00:00Z', 'actualDelivery': '2024-03-05T12:30:00'}
+    ])
+
+    state = store.vendor_state('v1')
+    assert state['completedOrders'] == 2
+    assert state['onTimeOrders'] == 1
+    assert store.stats()['replayErrors'] == 0
+
+
+@pytest.mark.parametrize('field', ['expectedDelivery', 'actualDelivery', 'timestamp'])
+def test_invalid_times_are_rejected(store, field):
+    with pytest.raises(ValueError, match=field):
+        store.ingest([{'type': 'received', 'vendorId': 'v1', field: 'next tuesday'}])
+    assert 'v1' not in store
+
+
+def test_updated_at_comes_from_the_event(store):
+    store.ingest([
+        {'type': 'placed', 'vendorId': 'v1', 'total': 10, 'timestamp': '2024-03-05T12:00:00Z'},
+        {'type': 'placed', 'vendorId': 'v1', 'total': 10, 'timestamp': '2024-03-01T12:00:00Z'}
+    ])
+
+    expected = 1709640000.0  # 2024-03-05T12:00:00Z, the newest event
+    assert store.vendor_state('v1')['updatedAt'] == expected
+    assert store.rebuild() == 1
+    assert store.vendor_state('v1')['updatedAt'] == expected
+
+
+def test_replay_counts_events_it_cannot_apply(store):
+    with open(store.log_path, 'ab') as f:
+        f.write(b'{"type":"placed","vendorId":"v1"}\n')
+
+    assert store.rebuild() == 0
+    assert store.stats()['replayErrors'] == 1
+    assert 'v1' not in store
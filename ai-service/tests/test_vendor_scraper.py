@@ -0,0 +1,35 @@
+from services.marketplace_sources import MarketplaceSource
+from services.vendor_scraper import VendorScraper
+
+
+class FixedSource(MarketplaceSource):
+    """Answers every search with the same vendors"""
+
+    name = 'fixed'
+
+    def __init__(self, vendors):
+        super().__init__(min_interval=0, jitter=0)
+        self.vendors = vendors
+
+    def search(self, product_name, quantity, user_agent, timeout):
+        return list(self.vendors)
+
+
+def cached_ttl(vendors):
+    scraper = VendorScraper(sources=[FixedSource(vendors)])
+    try:
+        scraper.search_vendors('widget', 10)
+        key = scraper.cache.make_key('widget', 10)
+        return scraper, scraper.cache._entries[key]['ttl']
+    finally:
+        scraper.shutdown()
+
+
+def test_answer_without_listings_is_cached_as_fallback():
+    scraper, ttl = cached_ttl([])
+    assert ttl == scraper.fallback_ttl
+
+
+def test_real_vendors_get_the_full_ttl():
+    scraper, ttl = cached_ttl([{'vendorName': 'Real Vendor', 'source': 'fixed'}])
+    assert ttl == scraper.cache.ttl